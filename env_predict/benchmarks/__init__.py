@@ -0,0 +1,6 @@
+"""
+Created by lrh at 2026-10-18.
+Description: 性能基准脚本
+    - 在 env_predict 目录下运行: python -m benchmarks.<脚本名>
+Changelog: all notable changes to this file will be documented
+"""
@@ -0,0 +1,145 @@
+"""
+Created by lrh at 2026-10-18.
+Description: 模型冷启动耗时: 旧的 state_dict 加载方式与模型包(mmap)加载方式对比
+    - 运行: python -m benchmarks.bench_cold_start --runs 5
+    - 每次在新进程中测量: 导入耗时, 加载模型耗时, 首次前向耗时, 加载前后常驻内存增量
+    - state_dict: 随机初始化 CNNGRU 后 torch.load 整个文件再 load_state_dict (旧方式)
+    - bundle: ModelBundle.load(mmap) 后在 meta 设备上构建并直接挂载权重
+    - registry: ModelRegistry.warm_up(), 即服务启动时的完整加载与预热
+Changelog: all notable changes to this file will be documented
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+SEQUENCE_LENGTH = 72
+MODES = ("state_dict", "bundle", "registry")
+
+
+def current_rss_kb() -> int:
+    """当前进程的常驻内存(KB), 读取 /proc/self/status, 仅支持Linux"""
+    with open("/proc/self/status", "r", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def run_child(mode: str, state_dict_path: str):
+    """子进程入口: 输出一次冷启动各阶段的耗时(毫秒)和内存增量(MB)"""
+    start = time.perf_counter()
+    import torch
+
+    from src.AQI_display.model_registry import ModelRegistry
+    from src.AQI_display.models.bundle import ModelBundle
+    from src.AQI_display.models.cnn_gru import CNNGRU
+    from src.config import Config
+
+    import_ms = (time.perf_counter() - start) * 1000
+    baseline = current_rss_kb()
+
+    start = time.perf_counter()
+    if mode == "state_dict":
+        with open(state_dict_path + ".json", "r", encoding="utf-8") as f:
+            config = json.load(f)
+        model = CNNGRU(**config)
+        model.load_state_dict(torch.load(state_dict_path, map_location="cpu"))
+        model.eval()
+    elif mode == "bundle":
+        model = ModelBundle.load(Config.MODEL_PATH).build_model()
+    else:
+        registry = ModelRegistry(
+            Config.MODEL_PATH, Config.PREDICT_DATA_PATH, Config.SCALER_PATH
+        )
+        registry.get_model()
+    load_ms = (time.perf_counter() - start) * 1000
+
+    forward_ms = 0.0
+    if mode != "registry":
+        # registry 在加载时已完成预热前向
+        windows = torch.zeros(1, SEQUENCE_LENGTH, model.input_channels)
+        start = time.perf_counter()
+        with torch.no_grad():
+            model(windows)
+        forward_ms = (time.perf_counter() - start) * 1000
+
+    print(
+        json.dumps(
+            {
+                "import_ms": import_ms,
+                "load_ms": load_ms,
+                "forward_ms": forward_ms,
+                "rss_mb": (current_rss_kb() - baseline) / 1024,
+            }
+        )
+    )
+
+
+def measure(mode: str, state_dict_path: str) -> dict:
+    output = subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "benchmarks.bench_cold_start",
+            "--child",
+            mode,
+            state_dict_path,
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def write_state_dict(path: str):
+    """由模型包导出旧格式: 只含权重的 state_dict, 构造参数另存为json"""
+    import torch
+
+    from src.AQI_display.models.bundle import ModelBundle
+    from src.config import Config
+
+    bundle = ModelBundle.load(Config.MODEL_PATH)
+    torch.save(bundle.state_dict, path)
+    with open(path + ".json", "w", encoding="utf-8") as f:
+        json.dump(bundle.config, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模型冷启动基准")
+    parser.add_argument("--runs", type=int, default=5, help="每种方式的新进程次数")
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(*args.child)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        state_dict_path = os.path.join(tmp_dir, "state_dict.pth")
+        write_state_dict(state_dict_path)
+
+        print(
+            f"{'mode':>11} {'import(ms)':>11} {'load(ms)':>9} "
+            f"{'forward(ms)':>12} {'ΔRSS(MB)':>9}"
+        )
+        for mode in MODES:
+            runs = [measure(mode, state_dict_path) for _ in range(args.runs)]
+            median = {
+                key: float(np.median([run[key] for run in runs])) for key in runs[0]
+            }
+            print(
+                f"{mode:>11} {median['import_ms']:>11.1f} {median['load_ms']:>9.2f} "
+                f"{median['forward_ms']:>12.2f} {median['rss_mb']:>9.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
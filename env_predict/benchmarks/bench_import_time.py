@@ -0,0 +1,104 @@
+"""
+Created by lrh at 2026-10-18.
+Description: Web 进程启动导入耗时报告, 用于发现启动耗时回退
+    - 运行: python -m benchmarks.bench_import_time --runs 3 --max-ms 1500
+    - 每次在新进程中以 python -X importtime 导入目标模块, 取总耗时中位数
+    - 输出按顶层包汇总的自身导入耗时, 以及导入时加载的重型依赖(torch/pandas/sklearn等)
+    - 启动路径(views.bp_api)加载了重型依赖或超过 --max-ms 时以非0状态退出
+Changelog: all notable changes to this file will be documented
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+from collections import defaultdict
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# views 中同时使用 src.xxx 和 xxx 两种导入方式, 与 gunicorn 启动时的路径一致
+PYTHONPATH = os.pathsep.join([ROOT_DIR, os.path.join(ROOT_DIR, "src")])
+
+# 启动路径(只导入蓝图)不应加载的模块, 应在第一次使用或后台预热时导入
+HEAVY_MODULES = ("torch", "pandas", "sklearn", "onnxruntime", "scipy")
+BOOT_TARGET = "views.bp_api"
+DEFAULT_TARGETS = (
+    BOOT_TARGET,
+    "src.AQI_display.model_registry",
+    "src.AQI_display.multi_city",
+)
+
+
+def profile_import(target: str) -> list:
+    """在新进程中导入目标模块, 返回 [(模块名, 自身耗时us, 累计耗时us)]"""
+    env = dict(os.environ, PYTHONPATH=PYTHONPATH)
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=ROOT_DIR,
+        env=env,
+    )
+    records = []
+    for line in output.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        records.append((name.strip(), int(self_us), int(cumulative_us)))
+    return records
+
+
+def summarize(records: list, target: str) -> dict:
+    total_us = next(cum for name, _, cum in records if name == target)
+    per_package = defaultdict(int)
+    for name, self_us, _ in records:
+        per_package[name.split(".")[0]] += self_us
+    loaded = {name.split(".")[0] for name, _, _ in records}
+    return {
+        "total_ms": total_us / 1000,
+        "per_package_ms": {k: v / 1000 for k, v in per_package.items()},
+        "heavy": [module for module in HEAVY_MODULES if module in loaded],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导入耗时报告")
+    parser.add_argument("--targets", nargs="+", default=list(DEFAULT_TARGETS))
+    parser.add_argument("--runs", type=int, default=3, help="每个目标的新进程次数")
+    parser.add_argument("--top", type=int, default=8, help="输出耗时最多的顶层包数")
+    parser.add_argument(
+        "--max-ms", type=float, default=None, help="启动路径的导入耗时上限(毫秒)"
+    )
+    args = parser.parse_args()
+
+    failures = []
+    for target in args.targets:
+        runs = [summarize(profile_import(target), target) for _ in range(args.runs)]
+        total_ms = float(np.median([run["total_ms"] for run in runs]))
+        per_package = runs[-1]["per_package_ms"]
+        heavy = runs[-1]["heavy"]
+
+        print(f"{target}: {total_ms:.1f} ms (median of {args.runs})")
+        top = sorted(per_package.items(), key=lambda item: item[1], reverse=True)
+        for package, package_ms in top[: args.top]:
+            print(f"    {package:<24} {package_ms:>9.1f} ms")
+        print(f"    heavy modules: {', '.join(heavy) or '-'}")
+
+        if target == BOOT_TARGET:
+            if heavy:
+                failures.append(f"{target} imports {', '.join(heavy)} at startup")
+            if args.max_ms is not None and total_ms > args.max_ms:
+                failures.append(
+                    f"{target} import took {total_ms:.1f} ms > {args.max_ms:.1f} ms"
+                )
+
+    for failure in failures:
+        print(f"REGRESSION: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Created by lrh at 2026-10-18.
+Description: MC dropout 不确定性预测: 复制输入一次前向与逐次前向的耗时对比
+    - 运行: python -m benchmarks.bench_mc_dropout --samples 10 50 100
+    - 输入为最近72小时窗口, 对比 N 次 batch=1 前向与一次 batch=N 前向
+    - 同时给出一次点预测的耗时作为参照
+Changelog: all notable changes to this file will be documented
+"""
+
+import argparse
+import time
+
+import torch
+
+from src.AQI_display.models.mc_dropout import (
+    DEFAULT_QUANTILES,
+    mc_dropout_copy,
+    predict_quantiles,
+)
+from src.AQI_display.predict import load_model
+from src.AQI_display.utils.data_processor import DataProcessor
+from src.AQI_display.utils.scaler_store import load_scaler_store
+from src.config import Config
+
+SEQUENCE_LENGTH = 72
+
+
+def best_time_ms(fn, repeat: int) -> float:
+    fn()
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, (time.perf_counter() - start) * 1000)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MC dropout 基准")
+    parser.add_argument("--samples", type=int, nargs="+", default=[10, 50, 100])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    model = load_model(Config.MODEL_PATH, torch.device("cpu"))
+    mc_model = mc_dropout_copy(model)
+    data_processor = DataProcessor(
+        Config.PREDICT_DATA_PATH, scaler_store=load_scaler_store(Config.SCALER_PATH)
+    )
+    window = torch.from_numpy(data_processor.get_last_sequence()).float()[None]
+
+    def point():
+        with torch.no_grad():
+            model(window)
+
+    point_ms = best_time_ms(point, args.repeat)
+    print(f"point forecast: {point_ms:.2f} ms\n")
+
+    print(f"{'samples':>8} {'looped(ms)':>11} {'batched(ms)':>12} {'speedup':>8}")
+    for num_samples in args.samples:
+
+        def looped():
+            with torch.no_grad():
+                samples = torch.stack([mc_model(window) for _ in range(num_samples)])
+            q = torch.tensor(DEFAULT_QUANTILES)
+            return torch.quantile(samples, q, dim=0)
+
+        def batched():
+            return predict_quantiles(mc_model, window, num_samples)
+
+        looped_ms = best_time_ms(looped, args.repeat)
+        batched_ms = best_time_ms(batched, args.repeat)
+        print(
+            f"{num_samples:>8} {looped_ms:>11.2f} {batched_ms:>12.2f} "
+            f"{looped_ms / batched_ms:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
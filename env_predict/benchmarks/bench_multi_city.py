@@ -0,0 +1,112 @@
+"""
+Created by lrh at 2026-10-18.
+Description: 多城市预测: 逐城市前向与合并为一个batch前向的对比
+    - 运行: python -m benchmarks.bench_multi_city --cities 1 8 32 64 128
+    - 各城市使用惠州历史数据的不同时段, 数据放在内存中, 只比较推理与后处理耗时
+    - 正确性: 合并前向的每个城市结果与逐城市 ModelRegistry.forecast 一致
+Changelog: all notable changes to this file will be documented
+"""
+
+import argparse
+import os
+import time
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.AQI_display.model_registry import SEQUENCE_LENGTH, ModelRegistry
+from src.AQI_display.multi_city import MultiCityPredictor
+from src.AQI_display.utils.data_processor import DataProcessor
+from src.AQI_display.utils.sequence_source import SequenceSource
+from src.config import Config
+
+
+class ArraySequenceSource(SequenceSource):
+    """内存中的原始值序列"""
+
+    def __init__(self, values):
+        self.values = values
+
+    def get_last_window(self, sequence_length, feature_order):
+        return self.values[-sequence_length:]
+
+
+def load_raw_series(feature_order):
+    """读取全部历史数据的原始值, [N, n_features]"""
+    data_processor = DataProcessor(
+        os.path.join(Config.AQI_DIR, "data", "d_aqi_huizhou.json")
+    )
+    return np.ascontiguousarray(data_processor.df[feature_order].values, np.float32)
+
+
+def best_time_ms(fn, repeat: int) -> float:
+    fn()
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, (time.perf_counter() - start) * 1000)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多城市批量预测基准")
+    parser.add_argument("--cities", type=int, nargs="+", default=[1, 8, 32, 64, 128])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--backend", default="torch")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(
+        model_path=Config.MODEL_PATH,
+        data_path=Config.PREDICT_DATA_PATH,
+        scaler_path=Config.SCALER_PATH,
+        backend=args.backend,
+        onnx_path=Config.ONNX_MODEL_PATH,
+    )
+    registry.warm_up()
+    series = load_raw_series(registry.get_scaler_store().feature_order)
+    current_time = datetime(2025, 5, 1)
+
+    # 每个城市取不同的结束时间, 相当于不同城市的最近窗口
+    max_cities = max(args.cities)
+    ends = np.linspace(SEQUENCE_LENGTH, len(series), max_cities).astype(int)
+    sources = {
+        f"city{i:03d}": ArraySequenceSource(series[end - SEQUENCE_LENGTH : end])
+        for i, end in enumerate(ends)
+    }
+
+    print(f"{'cities':>7} {'per-city(ms)':>13} {'batched(ms)':>12} {'speedup':>8}")
+    for num_cities in args.cities:
+        citycodes = list(sources)[:num_cities]
+        predictor = MultiCityPredictor(
+            registry, {citycode: sources[citycode] for citycode in citycodes}
+        )
+
+        def per_city():
+            results = {}
+            for citycode in citycodes:
+                registry.sequence_source = sources[citycode]
+                results[citycode] = registry.forecast(current_time=current_time)
+            return results
+
+        def batched():
+            return predictor.forecast(current_time=current_time)
+
+        expected, actual = per_city(), batched()
+        for citycode in citycodes:
+            pd.testing.assert_frame_equal(
+                expected[citycode], actual[citycode], check_exact=False, atol=1e-3
+            )
+
+        per_city_ms = best_time_ms(per_city, args.repeat)
+        batched_ms = best_time_ms(batched, args.repeat)
+        print(
+            f"{num_cities:>7} {per_city_ms:>13.2f} {batched_ms:>12.2f} "
+            f"{per_city_ms / batched_ms:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Created by lrh at 2026-10-18.
+Description: PyTorch eager 与 ONNX Runtime CPU 推理后端的延迟对比
+    - 运行前先导出: cd src/AQI_display && python main.py --mode export
+    - 运行: python -m benchmarks.bench_onnx_backend --batch-sizes 1 32 512
+    - 另外对比两种后端的冷启动导入耗时(独立子进程)
+Changelog: all notable changes to this file will be documented
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+
+import numpy as np
+import torch
+
+from src.AQI_display.models.onnx_backend import OnnxForecaster
+from src.AQI_display.models.torch_backend import TorchForecaster
+from src.AQI_display.predict import load_model
+from src.AQI_display.utils.postprocess import FEATURE_NAMES
+from src.config import Config
+
+SEQUENCE_LENGTH = 72
+
+
+def latency(fn, repeat: int, warmup: int = 3):
+    """返回 (p50, p95) 延迟(毫秒)"""
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return np.percentile(times, 50), np.percentile(times, 95)
+
+
+def import_time(module: str) -> float:
+    """在新进程中导入模块的耗时(秒)"""
+    code = f"import time; s = time.perf_counter(); import {module}; print(time.perf_counter() - s)"
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    return float(output.stdout.strip())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ONNX Runtime 推理后端基准")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 32, 512])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    model = load_model(Config.MODEL_PATH, torch.device("cpu"))
+    torch_forecaster = TorchForecaster(model)
+    onnx_forecaster = OnnxForecaster(Config.ONNX_MODEL_PATH, num_threads=args.threads)
+
+    print(
+        f"{'batch':>6} {'torch p50':>10} {'torch p95':>10} "
+        f"{'onnx p50':>10} {'onnx p95':>10} {'speedup':>8} {'max diff':>10}"
+    )
+    rng = np.random.default_rng(42)
+    for batch_size in args.batch_sizes:
+        windows = rng.random(
+            (batch_size, SEQUENCE_LENGTH, len(FEATURE_NAMES)), dtype=np.float32
+        )
+        max_diff = np.abs(
+            torch_forecaster.predict(windows) - onnx_forecaster.predict(windows)
+        ).max()
+        torch_p50, torch_p95 = latency(
+            lambda: torch_forecaster.predict(windows, batch_size), args.repeat
+        )
+        onnx_p50, onnx_p95 = latency(
+            lambda: onnx_forecaster.predict(windows, batch_size), args.repeat
+        )
+        print(
+            f"{batch_size:>6} {torch_p50:>10.3f} {torch_p95:>10.3f} "
+            f"{onnx_p50:>10.3f} {onnx_p95:>10.3f} "
+            f"{torch_p50 / onnx_p50:>7.1f}x {max_diff:>10.2e}"
+        )
+
+    print(f"\nimport torch: {import_time('torch'):.3f}s")
+    print(f"import onnxruntime: {import_time('onnxruntime'):.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Created by lrh at 2026-10-18.
+Description: CNNGRU 逐步解码头(autoregressive)与直接多时效头(direct)的对比
+    - 运行: python -m benchmarks.bench_output_head --batch-sizes 1 32 512 --epochs 30
+    - 速度: 各批大小下的前向(推理)以及前向+反向(训练)耗时
+    - 精度: 相同数据划分/种子/训练轮数下分别训练, 比较测试集损失和各特征 MAE
+Changelog: all notable changes to this file will be documented
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from src.AQI_display.models.cnn_gru import HEADS, CNNGRU
+from src.AQI_display.utils.data_processor import DataProcessor
+from src.AQI_display.utils.postprocess import FEATURE_NAMES
+from src.AQI_display.utils.scaler_store import load_scaler_store
+from src.config import Config
+
+SEQUENCE_LENGTH = 72
+PREDICTION_LENGTH = 24
+
+
+def build(head: str, seed: int = 42):
+    torch.manual_seed(seed)
+    return CNNGRU(
+        input_channels=len(FEATURE_NAMES),
+        sequence_length=SEQUENCE_LENGTH,
+        hidden_dim=64,
+        num_layers=2,
+        output_dim=len(FEATURE_NAMES),
+        prediction_length=PREDICTION_LENGTH,
+        head=head,
+    )
+
+
+def best_time_ms(fn, repeat: int, warmup: int = 2) -> float:
+    for _ in range(warmup):
+        fn()
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, (time.perf_counter() - start) * 1000)
+    return best
+
+
+def speed_report(batch_sizes, repeat: int):
+    """前向与前向+反向耗时(毫秒, 取最快一次)"""
+    print(f"{'batch':>6} {'head':>15} {'forward':>10} {'fwd+bwd':>10} {'params':>8}")
+    for batch_size in batch_sizes:
+        x = torch.rand(batch_size, SEQUENCE_LENGTH, len(FEATURE_NAMES))
+        for head in HEADS:
+            model = build(head)
+
+            def forward():
+                with torch.no_grad():
+                    model(x)
+
+            def forward_backward():
+                model.zero_grad()
+                model(x).mean().backward()
+
+            model.eval()
+            forward_ms = best_time_ms(forward, repeat)
+            model.train()
+            train_ms = best_time_ms(forward_backward, repeat)
+            params = sum(p.numel() for p in model.parameters())
+            print(
+                f"{batch_size:>6} {head:>15} {forward_ms:>10.3f} "
+                f"{train_ms:>10.3f} {params:>8}"
+            )
+
+
+def train_head(head, X_train, y_train, X_test, y_test, epochs, batch_size=32):
+    """与 train.py 相同的优化器设置训练指定轮数, 返回测试集上的预测"""
+    model = build(head)
+    optimizer = torch.optim.AdamW(model.parameters(), lr=0.0005, weight_decay=1e-4)
+    mse, mae = nn.MSELoss(), nn.L1Loss()
+    features, targets = torch.from_numpy(X_train), torch.from_numpy(y_train)
+    generator = torch.Generator().manual_seed(42)
+
+    start = time.perf_counter()
+    for _ in range(epochs):
+        model.train()
+        for idx in torch.randperm(len(features), generator=generator).split(batch_size):
+            optimizer.zero_grad()
+            outputs = model(features[idx])
+            # 与 train.py 的 CombinedLoss(alpha=0.7) 一致的 MSE/MAE 组合
+            loss = 0.7 * mse(outputs, targets[idx]) + 0.3 * mae(outputs, targets[idx])
+            loss.backward()
+            torch.nn.utils.clip_grad_norm_(model.parameters(), max_norm=0.5)
+            optimizer.step()
+    train_seconds = time.perf_counter() - start
+
+    model.eval()
+    with torch.no_grad():
+        predictions = model(torch.from_numpy(X_test)).numpy()
+    test_loss = 0.7 * np.mean((predictions - y_test) ** 2) + 0.3 * np.mean(
+        np.abs(predictions - y_test)
+    )
+    return predictions, test_loss, train_seconds
+
+
+def accuracy_report(epochs: int):
+    """在 test.py 的数据划分上分别训练两种输出头, 比较反归一化后的 MAE"""
+    data_processor = DataProcessor(
+        os.path.join(Config.AQI_DIR, "data", "d_aqi_huizhou.json"),
+        scaler_store=load_scaler_store(Config.SCALER_PATH),
+    )
+    X_train, X_test, y_train, y_test = data_processor.prepare_data()
+    scaler_store = data_processor.scaler_store
+    y_true = scaler_store.inverse_transform(y_test)
+
+    results = {}
+    for head in HEADS:
+        predictions, test_loss, train_seconds = train_head(
+            head, X_train, y_train, X_test, y_test, epochs
+        )
+        results[head] = scaler_store.inverse_transform(predictions)
+        print(
+            f"{head:>15}: test loss {test_loss:.4f}, "
+            f"train {train_seconds:.1f}s for {epochs} epochs"
+        )
+
+    print(f"\n{'feature':>8} " + " ".join(f"{head:>15}" for head in HEADS))
+    for i, feature in enumerate(scaler_store.feature_order):
+        maes = [np.abs(results[head][..., i] - y_true[..., i]).mean() for head in HEADS]
+        print(f"{feature:>8} " + " ".join(f"{mae:>15.4f}" for mae in maes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CNNGRU 输出头基准")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 32, 512])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--epochs", type=int, default=30)
+    args = parser.parse_args()
+
+    speed_report(args.batch_sizes, args.repeat)
+    if args.epochs > 0:
+        print()
+        accuracy_report(args.epochs)
+
+
+if __name__ == "__main__":
+    main()
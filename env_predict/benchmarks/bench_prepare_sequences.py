@@ -0,0 +1,96 @@
+"""
+Created by lrh at 2026-10-18.
+Description: DataProcessor.prepare_sequences 向量化前后的耗时对比
+    - 运行: python -m benchmarks.bench_prepare_sequences --rows 10000 100000 1000000
+    - 逐窗口循环版本在大数据量下耗时过长, 超过 --loop-max-rows 时跳过
+Changelog: all notable changes to this file will be documented
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.AQI_display.utils.data_processor import DataProcessor
+
+FEATURE_COLUMNS = ["AQI", "PM2_5", "PM10", "SO2", "NO2", "CO", "O3", "hap", "Quality"]
+
+
+def make_processor(rows: int, nan_ratio: float = 0.001, seed: int = 42):
+    """构造已归一化的合成数据, 跳过文件读取"""
+    rng = np.random.default_rng(seed)
+    values = rng.random((rows, len(FEATURE_COLUMNS)), dtype=np.float32)
+    values[rng.random(rows) < nan_ratio, 0] = np.nan
+
+    data_processor = DataProcessor.__new__(DataProcessor)
+    data_processor.numeric_columns = FEATURE_COLUMNS[:-1]
+    data_processor.scaler_store = None
+    data_processor.is_scaled = True
+    data_processor.df = pd.DataFrame(values, columns=FEATURE_COLUMNS)
+    return data_processor
+
+
+def prepare_sequences_loop(df, sequence_length=72, prediction_length=24):
+    """向量化之前的逐窗口实现, 作为对照"""
+    features = []
+    targets = []
+    for i in range(len(df) - sequence_length - prediction_length + 1):
+        feature_seq = df[FEATURE_COLUMNS].iloc[i : i + sequence_length].values
+        target_seq = (
+            df[FEATURE_COLUMNS]
+            .iloc[i + sequence_length : i + sequence_length + prediction_length]
+            .values
+        )
+        if np.isnan(feature_seq).any() or np.isnan(target_seq).any():
+            continue
+        features.append(feature_seq)
+        targets.append(target_seq)
+    return np.array(features, dtype=np.float32), np.array(targets, dtype=np.float32)
+
+
+def timeit(fn, repeat: int):
+    """返回最快一次的耗时(秒)和最后一次的结果"""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="prepare_sequences 基准")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--loop-max-rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(
+        f"{'rows':>10} {'windows':>10} {'loop(s)':>10} {'vector(s)':>10} {'speedup':>8}"
+    )
+    for rows in args.rows:
+        data_processor = make_processor(rows)
+        vector_time, (features, targets) = timeit(
+            data_processor.prepare_sequences, args.repeat
+        )
+
+        loop_time = None
+        if rows <= args.loop_max_rows:
+            loop_time, (loop_features, loop_targets) = timeit(
+                lambda df=data_processor.df: prepare_sequences_loop(df), 1
+            )
+            assert np.array_equal(features, loop_features)
+            assert np.array_equal(targets, loop_targets)
+
+        speedup = f"{loop_time / vector_time:.1f}x" if loop_time else "-"
+        loop_str = f"{loop_time:.3f}" if loop_time else "skipped"
+        print(
+            f"{rows:>10} {len(features):>10} {loop_str:>10} "
+            f"{vector_time:>10.3f} {speedup:>8}"
+        )
+        del features, targets, data_processor
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Created by lrh at 2026-10-18.
+Description: 动态int8量化(GRU/Linear)与fp32模型的精度和性能对比
+    - 运行: python -m benchmarks.bench_quantization --batch-sizes 1 32 512
+    - 精度: 在 test.py 相同的测试集划分上, 按特征比较反归一化后的 MAE
+    - 性能: 各批大小的推理延迟, 模型大小, 以及独立子进程中加载+推理后的常驻内存增量
+Changelog: all notable changes to this file will be documented
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+import torch
+
+from src.AQI_display.models.quantization import model_size_bytes
+from src.AQI_display.models.torch_backend import TorchForecaster
+from src.AQI_display.predict import load_model, load_quantized_model
+from src.AQI_display.utils.data_processor import DataProcessor
+from src.AQI_display.utils.postprocess import FEATURE_NAMES
+from src.AQI_display.utils.scaler_store import load_scaler_store
+from src.config import Config
+
+SEQUENCE_LENGTH = 72
+VARIANTS = ("fp32", "int8")
+
+
+def load_variant(variant: str):
+    """按名称加载fp32或量化模型, 均在CPU上运行"""
+    if variant == "int8":
+        return load_quantized_model(Config.MODEL_PATH)
+    return load_model(Config.MODEL_PATH, torch.device("cpu"))
+
+
+def latency(fn, repeat: int, warmup: int = 3):
+    """返回 (p50, p95) 延迟(毫秒)"""
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return np.percentile(times, 50), np.percentile(times, 95)
+
+
+def peak_rss_mb(variant: str, batch_size: int) -> float:
+    """在新进程中加载模型并推理一次, 返回相对导入完成时的常驻内存增量(MB)"""
+    output = subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "benchmarks.bench_quantization",
+            "--child",
+            variant,
+            str(batch_size),
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def current_rss_kb() -> int:
+    """当前进程的常驻内存(KB), 读取 /proc/self/status, 仅支持Linux"""
+    with open("/proc/self/status", "r", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def run_child(variant: str, batch_size: int):
+    """子进程入口: 推理一次后输出常驻内存增量(MB), 排除 torch 等依赖的导入开销"""
+    baseline = current_rss_kb()
+    forecaster = TorchForecaster(load_variant(variant))
+    windows = np.random.default_rng(42).random(
+        (batch_size, SEQUENCE_LENGTH, len(FEATURE_NAMES)), dtype=np.float32
+    )
+    forecaster.predict(windows, batch_size)
+    print((current_rss_kb() - baseline) / 1024)
+
+
+def accuracy_report(forecasters: dict):
+    """在 test.py 的测试集上按特征比较反归一化后的 MAE"""
+    scaler_store = load_scaler_store(Config.SCALER_PATH)
+    data_processor = DataProcessor(
+        os.path.join(Config.AQI_DIR, "data", "d_aqi_huizhou.json"),
+        scaler_store=scaler_store,
+    )
+    _, X_test, _, y_test = data_processor.prepare_data()
+    scaler_store = data_processor.scaler_store
+    y_true = scaler_store.inverse_transform(y_test)
+
+    y_pred = {
+        variant: scaler_store.inverse_transform(forecaster.predict(X_test))
+        for variant, forecaster in forecasters.items()
+    }
+    print(f"test windows: {len(X_test)}")
+    print(
+        f"{'feature':>8} {'fp32 MAE':>10} {'int8 MAE':>10} "
+        f"{'drift':>10} {'drift %':>8} {'|int8-fp32|':>12}"
+    )
+    for i, feature in enumerate(scaler_store.feature_order):
+        fp32_mae = np.abs(y_pred["fp32"][..., i] - y_true[..., i]).mean()
+        int8_mae = np.abs(y_pred["int8"][..., i] - y_true[..., i]).mean()
+        output_diff = np.abs(y_pred["int8"][..., i] - y_pred["fp32"][..., i]).mean()
+        drift = int8_mae - fp32_mae
+        drift_pct = drift / fp32_mae * 100 if fp32_mae else 0.0
+        print(
+            f"{feature:>8} {fp32_mae:>10.4f} {int8_mae:>10.4f} "
+            f"{drift:>+10.4f} {drift_pct:>+7.2f}% {output_diff:>12.4f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="动态int8量化基准")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 32, 512])
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--child", nargs=2, metavar=("VARIANT", "BATCH_SIZE"))
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child[0], int(args.child[1]))
+        return
+
+    models = {variant: load_variant(variant) for variant in VARIANTS}
+    forecasters = {variant: TorchForecaster(model) for variant, model in models.items()}
+
+    accuracy_report(forecasters)
+
+    print("\nmodel size:")
+    for variant, model in models.items():
+        print(f"{variant:>8} {model_size_bytes(model) / 1024:>10.1f} KB")
+
+    print(
+        f"\n{'batch':>6} {'fp32 p50':>10} {'int8 p50':>10} {'speedup':>8} "
+        f"{'fp32 ΔRSS':>10} {'int8 ΔRSS':>10}"
+    )
+    rng = np.random.default_rng(42)
+    for batch_size in args.batch_sizes:
+        windows = rng.random(
+            (batch_size, SEQUENCE_LENGTH, len(FEATURE_NAMES)), dtype=np.float32
+        )
+        p50 = {
+            variant: latency(
+                lambda: forecaster.predict(windows, batch_size), args.repeat
+            )[0]
+            for variant, forecaster in forecasters.items()
+        }
+        rss = {variant: peak_rss_mb(variant, batch_size) for variant in VARIANTS}
+        print(
+            f"{batch_size:>6} {p50['fp32']:>10.3f} {p50['int8']:>10.3f} "
+            f"{p50['fp32'] / p50['int8']:>7.2f}x "
+            f"{rss['fp32']:>8.1f}MB {rss['int8']:>8.1f}MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
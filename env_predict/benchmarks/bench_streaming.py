@@ -0,0 +1,116 @@
+"""
+Created by lrh at 2026-10-18.
+Description: CNNGRU 增量推理引擎的正确性校验与耗时对比
+    - 运行: python -m benchmarks.bench_streaming --steps 72 --atol 1e-3
+    - 正确性: 用完整窗口初始化后逐小时推进, 每一步与最新72小时窗口的整窗重算比较
+    - 耗时: 每新增一小时的增量推理与整窗重算的耗时
+Changelog: all notable changes to this file will be documented
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import torch
+
+from src.AQI_display.models.streaming import StreamingCNNGRU
+from src.AQI_display.predict import load_model
+from src.AQI_display.utils.data_processor import DataProcessor
+from src.AQI_display.utils.scaler_store import load_scaler_store
+from src.config import Config
+
+SEQUENCE_LENGTH = 72
+
+
+def load_series():
+    """读取全部历史数据并归一化, 返回 [N, n_features] 的float32数组"""
+    data_processor = DataProcessor(
+        os.path.join(Config.AQI_DIR, "data", "d_aqi_huizhou.json"),
+        scaler_store=load_scaler_store(Config.SCALER_PATH),
+    )
+    data_processor.ensure_scaled()
+    feature_order = data_processor.scaler_store.feature_order
+    return np.ascontiguousarray(
+        data_processor.df[feature_order].values, dtype=np.float32
+    )
+
+
+def check_correctness(model, engine, series, steps, num_starts):
+    """
+    从多个起点初始化后逐小时推进, 返回每一步的最大绝对误差
+    :return: [steps + 1] 第0项为初始化后与整窗前向的误差
+    """
+    starts = np.linspace(0, len(series) - SEQUENCE_LENGTH - steps, num_starts)
+    starts = starts.astype(int)
+    # 各起点组成一个batch, 同时验证按序列独立维护状态
+    windows = np.stack([series[s : s + SEQUENCE_LENGTH] for s in starts])
+    state = engine.prime(torch.from_numpy(windows))
+
+    max_diffs = []
+    for k in range(steps + 1):
+        if k > 0:
+            observation = series[starts + SEQUENCE_LENGTH + k - 1]
+            state = engine.step(state, torch.from_numpy(observation))
+        windows = np.stack([series[s + k : s + k + SEQUENCE_LENGTH] for s in starts])
+        with torch.no_grad():
+            expected = model(torch.from_numpy(windows))
+        max_diffs.append(float((engine.forecast(state) - expected).abs().max()))
+    return max_diffs
+
+
+def best_time_ms(fn, repeat: int) -> float:
+    fn()
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, (time.perf_counter() - start) * 1000)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="增量推理引擎校验")
+    parser.add_argument("--steps", type=int, default=72, help="初始化后推进的小时数")
+    parser.add_argument("--starts", type=int, default=32, help="校验的起点数量")
+    parser.add_argument("--atol", type=float, default=1e-3, help="归一化空间的容差")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 64])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    model = load_model(Config.MODEL_PATH, torch.device("cpu"))
+    engine = StreamingCNNGRU(model)
+    series = load_series()
+
+    max_diffs = check_correctness(model, engine, series, args.steps, args.starts)
+    print(f"{'step':>5} {'max abs diff':>14}")
+    for k, max_diff in enumerate(max_diffs):
+        print(f"{k:>5} {max_diff:>14.2e}")
+    assert max(max_diffs) <= args.atol, f"incremental drift exceeds {args.atol}"
+    print(f"Incremental forecasts match full re-encoding (atol={args.atol})\n")
+
+    print(f"{'batch':>6} {'full(ms)':>10} {'step+forecast(ms)':>18} {'speedup':>8}")
+    for batch_size in args.batch_sizes:
+        windows = torch.from_numpy(
+            np.stack([series[i : i + SEQUENCE_LENGTH] for i in range(batch_size)])
+        )
+        observation = torch.from_numpy(series[SEQUENCE_LENGTH : SEQUENCE_LENGTH + 1])
+        observation = observation.expand(batch_size, -1)
+        state = engine.prime(windows)
+
+        def full():
+            with torch.no_grad():
+                model(windows)
+
+        full_ms = best_time_ms(full, args.repeat)
+        step_ms = best_time_ms(
+            lambda: engine.forecast(engine.step(state, observation)), args.repeat
+        )
+        print(
+            f"{batch_size:>6} {full_ms:>10.3f} {step_ms:>18.3f} "
+            f"{full_ms / step_ms:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
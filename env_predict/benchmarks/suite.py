@@ -0,0 +1,371 @@
+"""
+Created by lrh at 2026-10-18.
+Description: 热点函数的基准套件, 结果保存为JSON并与保存的基线比较
+    - 运行: python -m benchmarks.suite --output benchmarks/results/latest.json
+    - 与基线比较: python -m benchmarks.suite --compare benchmarks/baseline.json
+    - 更新基线: python -m benchmarks.suite --update-baseline benchmarks/baseline.json
+    - 中位数耗时超过 基线 * (1 + threshold) 视为回退, 以非0状态退出;
+      threshold 取基线中该项的 threshold, 没有时取基线的默认值或 --threshold
+    - mongodb_find_by_page 默认使用内存中的集合替身, 指定 --mongo-uri 时使用本地 mongod
+    - 基线与运行机器有关, 更换机器后需要重新生成
+Changelog: all notable changes to this file will be documented
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+from datetime import datetime
+
+import numpy as np
+import torch
+
+from src.AQI_display import predict
+from src.AQI_display.models.bundle import ModelBundle
+from src.AQI_display.utils.column_store import write_column_store
+from src.AQI_display.utils.data_processor import DataProcessor
+from src.collector.env_huizhou_bak import GetHuiZhouAQISpider, merge_data
+from src.config import Config
+from src.databases import mongodb_find_by_page
+
+HOUR_SECONDS = 3600
+FORWARD_BATCH_SIZES = (1, 32, 256)
+DEFAULT_THRESHOLD = 0.5
+
+
+class InMemoryCursor:
+    """内存集合的游标, 支持 mongodb_find_by_page 用到的 sort/skip/limit"""
+
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, sorted_list):
+        # 与 MongoDB 一致, 排在前面的键优先级更高, 因此从最后一个键开始稳定排序
+        for key, direction in reversed(sorted_list):
+            self.documents = sorted(
+                self.documents, key=lambda doc: doc.get(key), reverse=direction < 0
+            )
+        return self
+
+    def skip(self, count):
+        self.documents = self.documents[count:]
+        return self
+
+    def limit(self, count):
+        if count:
+            self.documents = self.documents[:count]
+        return self
+
+    def __iter__(self):
+        return iter(self.documents)
+
+
+class InMemoryCollection:
+    """
+    没有 mongod 时使用的集合替身, 只支持等值和 $gt/$gte/$lt/$lte 条件以及包含式投影,
+    衡量的是分页查询在 Python 侧的开销, 不代表真实数据库的耗时
+    """
+
+    OPERATORS = {
+        "$gt": lambda value, bound: value > bound,
+        "$gte": lambda value, bound: value >= bound,
+        "$lt": lambda value, bound: value < bound,
+        "$lte": lambda value, bound: value <= bound,
+    }
+
+    def __init__(self, documents):
+        self.documents = list(documents)
+
+    def _match(self, document, filter_dict):
+        for key, condition in filter_dict.items():
+            value = document.get(key)
+            if isinstance(condition, dict):
+                if value is None or not all(
+                    self.OPERATORS[op](value, bound) for op, bound in condition.items()
+                ):
+                    return False
+            elif value != condition:
+                return False
+        return True
+
+    def find(self, filter_dict, projection=None):
+        documents = [
+            document
+            for document in self.documents
+            if self._match(document, filter_dict)
+        ]
+        if projection:
+            keys = [key for key, keep in projection.items() if keep]
+            documents = [{key: doc.get(key) for key in keys} for doc in documents]
+        return InMemoryCursor(documents)
+
+    def count_documents(self, filter_dict):
+        return sum(
+            1 for document in self.documents if self._match(document, filter_dict)
+        )
+
+
+def load_records():
+    with open(Config.PREDICT_DATA_PATH, "r", encoding="utf-8") as f:
+        records = json.load(f)
+    for record in records:
+        record.pop("_id", None)
+    return records
+
+
+def tile_records(records, rows):
+    """重复历史记录到 rows 行, time_point 按小时连续递增"""
+    start = records[0]["time_point"]
+    tiled = []
+    for i in range(rows):
+        record = dict(records[i % len(records)])
+        record["time_point"] = start + i * HOUR_SECONDS
+        record["id"] = i
+        tiled.append(record)
+    return tiled
+
+
+def raw_api_items(records):
+    """还原为中国环境监测总站接口的原始格式, 供 process_air_quality_data 使用"""
+    return [
+        {
+            "Id": record["id"],
+            "TimePoint": f"/Date({record['time_point'] * 1000})/",
+            "TimePointStr": record["time_point_str"],
+            "AQI": record["AQI"],
+            "CO": record["CO"],
+            "NO2": record["NO2"],
+            "O3": record["O3"],
+            "PM10": record["PM10"],
+            "PM2_5": record["PM2_5"],
+            "SO2": record["SO2"],
+            "Quality": record["Quality"],
+            "PrimaryPollutant": record["primarypollutant"],
+            "Measure": record["measure"],
+            "Unheathful": record["unheathful"],
+        }
+        for record in records
+    ]
+
+
+@contextlib.contextmanager
+def preserved_file(path):
+    """predict.main 会覆盖仓库中的预测结果文件, 运行后恢复原内容"""
+    backup = None
+    if os.path.exists(path):
+        backup = path + ".bench"
+        shutil.copyfile(path, backup)
+    try:
+        yield
+    finally:
+        if backup:
+            os.replace(backup, path)
+
+
+def build_cases(args, tmp_dir):
+    """返回 [(名称, 无参函数)], 数据准备不计入耗时"""
+    records = load_records()
+    tiled = tile_records(records, args.rows)
+    data_path = os.path.join(tmp_dir, "data.json")
+    with open(data_path, "w", encoding="utf-8") as f:
+        json.dump(tiled, f, ensure_ascii=False, indent=4)
+
+    column_store_path = os.path.join(tmp_dir, "columns")
+    write_column_store(column_store_path, tiled)
+
+    processor = DataProcessor(data_path)
+    column_processor = DataProcessor(column_store_path)
+    bundle = ModelBundle.load(Config.MODEL_PATH)
+    model = bundle.build_model(torch.device("cpu"))
+    sequence_length = bundle.config["sequence_length"]
+
+    cases = [
+        (f"load_and_process_data[{args.rows}]", processor.load_and_process_data),
+        (
+            f"load_and_process_data[columns,{args.rows}]",
+            column_processor.load_and_process_data,
+        ),
+        (f"prepare_sequences[{args.rows}]", processor.prepare_sequences),
+    ]
+
+    for batch_size in FORWARD_BATCH_SIZES:
+        windows = torch.randn(batch_size, sequence_length, model.input_channels)
+
+        def forward(windows=windows):
+            with torch.no_grad():
+                return model(windows)
+
+        cases.append((f"cnn_gru_forward[batch={batch_size}]", forward))
+
+    def predict_main():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return predict.main()
+
+    cases.append(("predict_main", predict_main))
+
+    hap_records = [
+        {"time_point": record["time_point"], "hap": 1000.0} for record in tiled[::2]
+    ]
+    cases.append(
+        (
+            f"merge_data[{args.rows}]",
+            lambda: merge_data([dict(record) for record in tiled], hap_records),
+        )
+    )
+
+    spider = GetHuiZhouAQISpider()
+    items = raw_api_items(tiled)
+    cases.append(
+        (
+            f"process_air_quality_data[{args.rows}]",
+            lambda: spider.process_air_quality_data(items),
+        )
+    )
+
+    coll_conn = mongo_collection(args, tiled)
+    cases.append(
+        (
+            f"mongodb_find_by_page[{args.rows}]",
+            lambda: mongodb_find_by_page(
+                coll_conn=coll_conn,
+                filter_dict={},
+                page=1,
+                size=23,
+                sorted_list=[("time_point", -1)],
+                return_dict={"_id": 0, "time_point": 1},
+            ),
+        )
+    )
+    return cases
+
+
+def mongo_collection(args, records):
+    if not args.mongo_uri:
+        return InMemoryCollection(records)
+    import pymongo
+
+    client = pymongo.MongoClient(args.mongo_uri, serverSelectionTimeoutMS=3000)
+    coll_conn = client["benchmark"]["d_aqi_huizhou"]
+    coll_conn.drop()
+    coll_conn.insert_many([dict(record) for record in records])
+    coll_conn.create_index([("time_point", -1)])
+    return coll_conn
+
+
+def run_case(fn, repeat):
+    fn()
+    times_ms = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times_ms.append((time.perf_counter() - start) * 1000)
+    return {
+        "median_ms": round(float(np.median(times_ms)), 4),
+        "min_ms": round(float(np.min(times_ms)), 4),
+        "max_ms": round(float(np.max(times_ms)), 4),
+        "repeat": repeat,
+    }
+
+
+def environment():
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "torch": torch.__version__,
+        "numpy": np.__version__,
+        "torch_threads": torch.get_num_threads(),
+    }
+
+
+def compare(results, baseline, default_threshold):
+    """返回回退项列表, 同时输出每一项与基线的对比"""
+    regressions = []
+    default_threshold = baseline.get("threshold", default_threshold)
+    print(f"\n{'case':<40} {'baseline(ms)':>13} {'now(ms)':>10} {'change':>8}")
+    for name, result in results.items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:<40} {'-':>13} {result['median_ms']:>10.3f} {'new':>8}")
+            continue
+        threshold = base.get("threshold", default_threshold)
+        change = result["median_ms"] / base["median_ms"] - 1
+        flag = ""
+        if change > threshold:
+            flag = f"  REGRESSION (> +{threshold:.0%})"
+            regressions.append(name)
+        print(
+            f"{name:<40} {base['median_ms']:>13.3f} {result['median_ms']:>10.3f} "
+            f"{change:>+8.1%}{flag}"
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="热点函数基准套件")
+    parser.add_argument("--rows", type=int, default=20000, help="合成历史数据的行数")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--cases", nargs="+", help="只运行名称包含这些字符串的项")
+    parser.add_argument("--mongo-uri", default=None, help="本地 mongod 地址")
+    parser.add_argument("--output", default="benchmarks/results/latest.json")
+    parser.add_argument("--compare", default=None, help="基线文件")
+    parser.add_argument("--update-baseline", default=None, help="写入基线文件")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir, preserved_file(
+        os.path.join(Config.AQI_DIR, "predictions_24h.csv")
+    ):
+        for name, fn in build_cases(args, tmp_dir):
+            if args.cases and not any(pattern in name for pattern in args.cases):
+                continue
+            results[name] = run_case(fn, args.repeat)
+            print(
+                f"{name:<40} min {results[name]['min_ms']:>10.3f} ms, "
+                f"median {results[name]['median_ms']:>10.3f} ms"
+            )
+
+    report = {"environment": environment(), "rows": args.rows, "results": results}
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n结果已保存到 {args.output}")
+
+    if args.update_baseline:
+        report["threshold"] = args.threshold
+        # 保留已有基线中单独设置的阈值
+        if os.path.exists(args.update_baseline):
+            with open(args.update_baseline, "r", encoding="utf-8") as f:
+                previous = json.load(f)["results"]
+            for name, result in results.items():
+                if "threshold" in previous.get(name, {}):
+                    result["threshold"] = previous[name]["threshold"]
+        with open(args.update_baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"基线已更新: {args.update_baseline}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("rows") != args.rows:
+            print(
+                f"警告: 基线使用 {baseline.get('rows')} 行数据, 本次为 {args.rows} 行"
+            )
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} 项回退: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import os
+
+import torch
+
+from models.bundle import ModelBundle
+from models.onnx_export import check_parity, export_onnx
+from utils.data_processor import DataProcessor
+from utils.scaler_store import ScalerStore
+
+
+def main(model_path='best_model.pth', onnx_path='best_model.onnx', atol=1e-4):
+    # 导出在CPU上进行, 与 ONNX Runtime CPU 推理保持一致
+    device = torch.device('cpu')
+
+    # 加载模型包, 构造参数和归一化参数都从模型包读取
+    try:
+        bundle = ModelBundle.load(model_path)
+        model = bundle.build_model(device)
+        print(f"Successfully loaded model from {model_path}")
+    except Exception as e:
+        print(f"Error loading model: {str(e)}")
+        return
+
+    # 数据处理, 使用模型包中保存的归一化参数
+    data_processor = DataProcessor('data/d_aqi_huizhou.json', scaler_store=ScalerStore.from_dict(bundle.scalers))
+    X_train, X_test, y_train, y_test = data_processor.prepare_data(
+        bundle.config['sequence_length'], bundle.config['prediction_length'])
+
+    # 先导出到同目录下的临时文件, 通过一致性检查后才原子替换, 服务中的模型文件始终完整可用
+    tmp_path = onnx_path + '.tmp'
+    try:
+        export_onnx(model, tmp_path, X_test.shape[1], X_test.shape[2], scalers=bundle.scalers)
+
+        # 在测试集窗口上比较 eager 模型与 ONNX Runtime 的输出, 超出容差时不替换
+        max_diffs = check_parity(model, tmp_path, X_test)
+        for batch_size, max_diff in max_diffs.items():
+            print(f"batch_size={batch_size}: max abs diff {max_diff:.3e}")
+        if max(max_diffs.values()) > atol:
+            raise ValueError(f"ONNX parity check failed: max abs diff exceeds {atol}, {onnx_path} is unchanged")
+        os.replace(tmp_path, onnx_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    print(f"Parity check passed on {len(X_test)} test windows (atol={atol})")
+    print(f"ONNX model saved to {onnx_path}")
+    return onnx_path
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import torch
+import torch.optim as optim
+
+from models.bundle import ModelBundle
+from models.cnn_gru import CNNGRU
+from train import CombinedLoss, evaluate_checkpoint, train_model_fast
+from utils.data_processor import DataProcessor
+from utils.scaler_store import ScalerStore
+
+
+def finetune_paths(model_path):
+    """候选模型、替换前的备份和微调状态文件, 与模型包放在同一目录(os.replace 需要在同一文件系统)"""
+    root, ext = os.path.splitext(model_path)
+    return {
+        'candidate': f'{root}_finetune{ext}',
+        'backup': f'{root}_prev{ext}',
+        'state': f'{root}_finetune.json',
+    }
+
+
+def load_state(state_path):
+    if not os.path.exists(state_path):
+        return {}
+    with open(state_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_state(state_path, state):
+    """写入临时文件后原子替换"""
+    tmp_path = state_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, state_path)
+
+
+def split_windows(num_windows, recent_windows, replay_ratio, selection_windows, validation_windows, gap, rng):
+    """
+    按时间顺序划分窗口索引, 相邻两部分之间间隔 gap 个窗口, 避免预测目标重叠:
+    - 验证集: 最新的 validation_windows 个窗口, 只用于决定是否替换, 新旧模型都在这里比较
+    - 选择集: 验证集之前的 selection_windows 个窗口, 用于选择最佳epoch和调整学习率
+    - 最近窗口: 选择集之前的 recent_windows 个窗口
+    - 回放样本: 更早的窗口中随机抽取 recent_windows * replay_ratio 个, 防止遗忘历史规律
+    返回 (训练索引, 选择索引, 验证索引, 各部分数量)
+    """
+    selection_end = num_windows - validation_windows - gap
+    train_end = selection_end - selection_windows - gap
+    if validation_windows <= 0 or selection_windows <= 0 or train_end <= 0:
+        raise ValueError(f'Not enough windows to fine-tune: {num_windows}')
+    recent_start = max(train_end - recent_windows, 0)
+    recent = np.arange(recent_start, train_end)
+    replay_size = min(recent_start, int(len(recent) * replay_ratio))
+    replay = np.sort(rng.choice(recent_start, size=replay_size, replace=False)) if replay_size > 0 else np.arange(0)
+    selection = np.arange(selection_end - selection_windows, selection_end)
+    validation = np.arange(num_windows - validation_windows, num_windows)
+    counts = {'recent': len(recent), 'replay': len(replay), 'selection': len(selection), 'validation': len(validation)}
+    return np.concatenate([replay, recent]), selection, validation, counts
+
+
+def promote(candidate_path, model_path, backup_path):
+    """备份线上模型后用 os.replace 原子替换, 服务中的模型注册表按 mtime 变化热加载新模型"""
+    if os.path.exists(model_path):
+        shutil.copy2(model_path, backup_path)
+    os.replace(candidate_path, model_path)
+
+
+def main(model_path='best_model.pth', data_path='data/d_aqi_huizhou.json', epochs=5, recent_windows=168,
+         replay_ratio=1.0, selection_windows=24, validation_windows=48, lr=1e-4, batch_size=32, tolerance=0.0,
+         threads=None, seed=42, force=False):
+    """
+    从 model_path 热启动, 在最近窗口 + 历史回放样本上训练几个epoch, 按选择集保留最佳epoch,
+    候选模型在未参与训练和选择的验证集上误差不高于原模型 * (1 + tolerance) 时才替换 model_path
+    数据与上次微调相比没有新增时跳过(force=True 时仍然执行), 结果写入 *_finetune.json 并返回
+    """
+    if threads:
+        torch.set_num_threads(threads)
+    torch.manual_seed(seed)
+    rng = np.random.default_rng(seed)
+    paths = finetune_paths(model_path)
+    started_at = time.time()
+
+    # 使用模型包中的归一化参数, 微调后的模型与线上模型的输入输出口径一致
+    bundle = ModelBundle.load(model_path)
+    data_processor = DataProcessor(data_path, scaler_store=ScalerStore.from_dict(bundle.scalers))
+    data_watermark = int(data_processor.df['time_point'].max())
+    previous = load_state(paths['state'])
+    if not force and previous.get('data_watermark') == data_watermark:
+        print(f'No new data since the last fine-tune (time_point {data_watermark}), skipped')
+        return {**previous, 'status': 'skipped'}
+
+    X, y = data_processor.prepare_sequences(bundle.config['sequence_length'], bundle.config['prediction_length'])
+    train_index, selection_index, validation_index, counts = split_windows(
+        len(X), recent_windows, replay_ratio, selection_windows, validation_windows,
+        bundle.config['prediction_length'], rng)
+    X_train, y_train = X[train_index], y[train_index]
+    X_select, y_select = X[selection_index], y[selection_index]
+    X_val, y_val = X[validation_index], y[validation_index]
+    print(f"Fine-tune windows: recent {counts['recent']}, replay {counts['replay']}, "
+          f"selection {counts['selection']}, validation {counts['validation']}")
+
+    # 与 train.main 相同的损失函数, 新旧模型在同一验证集上按fp32比较
+    criterion = CombinedLoss(alpha=0.7, check_finite=False)
+    baseline_loss = evaluate_checkpoint(model_path, X_val, y_val, criterion, 'cpu')
+
+    # 清理上次中断留下的候选模型, 之后存在的候选模型一定来自本次训练
+    if os.path.exists(paths['candidate']):
+        os.remove(paths['candidate'])
+
+    # 按构造参数新建模型后复制权重, 不在 mmap 映射的张量上训练
+    model = CNNGRU(**bundle.config)
+    model.load_state_dict(bundle.state_dict)
+    # 最佳epoch和学习率调整只看选择集, 验证集对候选模型完全未知, 替换判断不偏向候选模型
+    optimizer = optim.AdamW(model.parameters(), lr=lr, weight_decay=1e-4, fused=True)
+    scheduler = optim.lr_scheduler.ReduceLROnPlateau(optimizer, mode='min', factor=0.5, patience=2, min_lr=1e-6)
+    train_model_fast(
+        model=model,
+        X_train=X_train,
+        X_test=X_select,
+        y_train=y_train,
+        y_test=y_select,
+        criterion=criterion,
+        optimizer=optimizer,
+        scheduler=scheduler,
+        num_epochs=epochs,
+        device='cpu',
+        checkpoint_path=paths['candidate'],
+        scalers=bundle.scalers,
+        batch_size=batch_size,
+        resume_every=0
+    )
+    # 所有batch都被跳过时不会保存候选模型
+    candidate_loss = None
+    if os.path.exists(paths['candidate']):
+        candidate_loss = evaluate_checkpoint(paths['candidate'], X_val, y_val, criterion, 'cpu')
+
+    promoted = candidate_loss is not None and candidate_loss <= baseline_loss * (1 + tolerance)
+    if promoted:
+        promote(paths['candidate'], model_path, paths['backup'])
+        print(f'Promoted: validation loss {baseline_loss:.4f} -> {candidate_loss:.4f}, previous model saved to {paths["backup"]}')
+    else:
+        if os.path.exists(paths['candidate']):
+            os.remove(paths['candidate'])
+        print(f'Not promoted: validation loss {candidate_loss} vs {baseline_loss:.4f} (tolerance {tolerance})')
+
+    state = {
+        'status': 'promoted' if promoted else 'rejected',
+        'data_watermark': data_watermark,
+        'baseline_loss': baseline_loss,
+        'candidate_loss': candidate_loss,
+        'windows': counts,
+        'epochs': epochs,
+        'seconds': round(time.time() - started_at, 3),
+        'finished_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+    save_state(paths['state'], state)
+    return state
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+from datetime import datetime
+
+import torch
+
+from models.bundle import ModelBundle
+from models.torch_backend import TorchForecaster
+from utils.data_processor import DataProcessor
+from utils.hindcast import hindcast, origin_range
+from utils.scaler_store import ScalerStore
+
+
+def parse_time(value):
+    """解析起报时间: 时间戳(秒) 或 'YYYY-mm-dd HH'"""
+    if str(value).isdigit():
+        return int(value)
+    return int(datetime.strptime(value, '%Y-%m-%d %H').timestamp())
+
+
+def main(origins=None, start=None, end=None, step=1, batch_size=512, output='hindcast.csv'):
+    # 设置设备
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    print(f"Using device: {device}")
+
+    # 加载模型包, 构造参数和归一化参数都从模型包读取
+    try:
+        bundle = ModelBundle.load('best_model.pth')
+        model = bundle.build_model(device)
+        print("Successfully loaded model from best_model.pth")
+    except Exception as e:
+        print(f"Error loading model: {str(e)}")
+        return
+
+    # 数据处理, 使用模型包中保存的归一化参数
+    data_processor = DataProcessor('data/d_aqi_huizhou.json', scaler_store=ScalerStore.from_dict(bundle.scalers))
+    data_processor.ensure_scaled()
+    scaler_store = data_processor.scaler_store
+    df = data_processor.df.sort_values('time_point')
+
+    if origins:
+        origins = [parse_time(origin) for origin in origins]
+    else:
+        # 默认回算全部历史数据
+        start = parse_time(start) if start else int(df['time_point'].iloc[0])
+        end = parse_time(end) if end else int(df['time_point'].iloc[-1])
+        origins = origin_range(start, end, step)
+    print(f"Hindcast origins: {len(origins)}")
+
+    df_hindcast = hindcast(
+        TorchForecaster(model, device),
+        df['time_point'].values,
+        df[scaler_store.feature_order].values,
+        origins,
+        scaler_store,
+        sequence_length=bundle.config['sequence_length'],
+        batch_size=batch_size
+    )
+    print(f"Valid origins: {df_hindcast['origin'].nunique()}")
+
+    df_hindcast.to_csv(output, index=False, encoding='utf-8-sig')
+    print(f"Hindcast results saved to {output}")
+    return df_hindcast
+
+
+if __name__ == '__main__':
+    main()
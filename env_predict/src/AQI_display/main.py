@@ -1,21 +1,116 @@
 import argparse
+import json
 from train import main as train_main
 from test import main as test_main
+from hindcast import main as hindcast_main
+from export import main as export_main
+from sweep import LOG_BACKENDS, main as sweep_main
+from finetune import main as finetune_main
 
 def main():
     parser = argparse.ArgumentParser(description='AQI预测系统')
-    parser.add_argument('--mode', type=str, choices=['train', 'test'], default='train',
-                      help='运行模式: train (训练) 或 test (测试)')
-    
+    parser.add_argument('--mode', type=str, choices=['train', 'test', 'hindcast', 'export', 'sweep', 'finetune'], default='train',
+                      help='运行模式: train (训练), test (测试), hindcast (批量回算), export (导出ONNX), '
+                           'sweep (超参数搜索) 或 finetune (在新数据上微调)')
+    parser.add_argument('--head', type=str, choices=['autoregressive', 'direct'], default='autoregressive',
+                      help='train: 输出头, autoregressive (逐步解码) 或 direct (一次输出全部时效)')
+    parser.add_argument('--epochs', type=int, default=500, help='train: 训练轮数')
+    parser.add_argument('--fast', action='store_true',
+                      help='train: 快速训练模式, 数据常驻为张量, 不逐batch同步检查NaN, 输出 samples/sec')
+    parser.add_argument('--train-batch-size', type=int, default=32,
+                      help='train: 每批样本数, CPU上增大可提高吞吐, 但会改变优化过程')
+    parser.add_argument('--patience', type=int, default=None,
+                      help='train: 早停, 测试损失连续 N 个epoch没有改善时停止, 默认不启用')
+    parser.add_argument('--min-delta', type=float, default=0.0, help='train: 早停时视为改善的最小降幅')
+    parser.add_argument('--resume', action='store_true',
+                      help='train: 从续训checkpoint(如 best_model_last.pth)恢复中断的训练')
+    parser.add_argument('--bf16', action='store_true',
+                      help='train/test: 前向和损失使用 bfloat16 自动混合精度(需要CPU支持bf16指令, 否则可能更慢)')
+    parser.add_argument('--compile', action='store_true',
+                      help='train/test: 使用 torch.compile 编译模型, 编译耗时计入第一个epoch')
+    parser.add_argument('--origins', type=str, nargs='*',
+                      help='hindcast: 起报时间列表, 时间戳或 "YYYY-mm-dd HH"')
+    parser.add_argument('--start', type=str, help='hindcast: 起报时间范围开始')
+    parser.add_argument('--end', type=str, help='hindcast: 起报时间范围结束')
+    parser.add_argument('--step', type=int, default=1, help='hindcast: 起报间隔(小时)')
+    parser.add_argument('--batch-size', type=int, default=512, help='hindcast: 每批样本数')
+    parser.add_argument('--output', type=str, default='hindcast.csv', help='hindcast: 结果文件')
+    parser.add_argument('--onnx-path', type=str, default='best_model.onnx', help='export: ONNX文件路径')
+    parser.add_argument('--atol', type=float, default=1e-4, help='export: 与原模型输出的最大允许误差')
+    parser.add_argument('--model-path', type=str, default='best_model.pth', help='finetune: 热启动并在通过验证后替换的模型包')
+    parser.add_argument('--data-path', type=str, default='data/d_aqi_huizhou.json',
+                      help='finetune: 训练数据, JSON文件或列式存储目录')
+    parser.add_argument('--finetune-epochs', type=int, default=5, help='finetune: 训练轮数')
+    parser.add_argument('--finetune-lr', type=float, default=1e-4, help='finetune: 学习率')
+    parser.add_argument('--recent-windows', type=int, default=168, help='finetune: 参与训练的最近窗口数')
+    parser.add_argument('--replay-ratio', type=float, default=1.0,
+                      help='finetune: 历史回放样本数相对最近窗口数的比例')
+    parser.add_argument('--selection-windows', type=int, default=24,
+                      help='finetune: 用于选择最佳epoch的窗口数, 位于验证窗口之前, 不参与训练')
+    parser.add_argument('--validation-windows', type=int, default=48,
+                      help='finetune: 用于比较新旧模型的最新窗口数, 不参与训练')
+    parser.add_argument('--tolerance', type=float, default=0.0,
+                      help='finetune: 验证损失允许高于原模型的比例, 超过时不替换 best_model.pth')
+    parser.add_argument('--threads', type=int, default=None, help='finetune: torch 线程数')
+    parser.add_argument('--force', action='store_true', help='finetune: 没有新数据时也执行')
+    parser.add_argument('--sweep-config', type=str, default=None,
+                      help='sweep: 搜索空间JSON文件, 如 {"hidden_dim": [32, 64], "lr": [0.001], "epochs": 50}')
+    parser.add_argument('--sweep-dir', type=str, default='sweeps', help='sweep: 输出目录, 每次搜索一个子目录')
+    parser.add_argument('--workers', type=int, default=None, help='sweep: 并行训练进程数, 默认 CPU核数 / 每进程线程数')
+    parser.add_argument('--threads-per-worker', type=int, default=1, help='sweep: 每个训练进程的 torch 线程数')
+    parser.add_argument('--sweep-log', type=str, choices=LOG_BACKENDS, default='json',
+                      help='sweep: 记录方式, json (只写JSON日志) 或 wandb (另外写离线 wandb 运行)')
+
     args = parser.parse_args()
-    
+
     if args.mode == 'train':
         print('开始训练模型...')
-        train_main()
+        train_main(head=args.head, fast=args.fast, num_epochs=args.epochs, batch_size=args.train_batch_size,
+                   bf16=args.bf16, compile=args.compile, patience=args.patience, min_delta=args.min_delta,
+                   resume=args.resume)
+    elif args.mode == 'hindcast':
+        print('开始批量回算...')
+        hindcast_main(
+            origins=args.origins,
+            start=args.start,
+            end=args.end,
+            step=args.step,
+            batch_size=args.batch_size,
+            output=args.output
+        )
+    elif args.mode == 'sweep':
+        print('开始超参数搜索...')
+        sweep_main(
+            config_path=args.sweep_config,
+            output_dir=args.sweep_dir,
+            workers=args.workers,
+            threads_per_worker=args.threads_per_worker,
+            log_backend=args.sweep_log
+        )
+    elif args.mode == 'finetune':
+        print('开始微调模型...')
+        result = finetune_main(
+            model_path=args.model_path,
+            data_path=args.data_path,
+            epochs=args.finetune_epochs,
+            recent_windows=args.recent_windows,
+            replay_ratio=args.replay_ratio,
+            selection_windows=args.selection_windows,
+            validation_windows=args.validation_windows,
+            lr=args.finetune_lr,
+            batch_size=args.train_batch_size,
+            tolerance=args.tolerance,
+            threads=args.threads,
+            force=args.force
+        )
+        # 最后一行输出JSON结果, 供定时任务解析
+        print(json.dumps(result, ensure_ascii=False))
+    elif args.mode == 'export':
+        print('开始导出ONNX模型...')
+        export_main(onnx_path=args.onnx_path, atol=args.atol)
     else:
         print('开始测试模型...')
-        test_main()
+        test_main(bf16=args.bf16, compile=args.compile)
 
 if __name__ == '__main__':
     main()
-
@@ -0,0 +1,338 @@
+"""
+Created by lrh at 2026-10-18.
+Description: 常驻模型注册表
+    - 进程内只加载一次 checkpoint 并预热
+    - checkpoint 文件的 mtime 或内容哈希变化时原子热替换
+    - 推理后端可选 torch, int8(动态量化) 或 onnx, onnx 后端不导入 torch
+    - 归一化参数来自模型包或 ONNX 元数据, 与权重一起热替换
+Changelog: all notable changes to this file will be documented
+"""
+
+import hashlib
+import os
+import threading
+
+from datetime import datetime
+
+import numpy as np
+
+from src.AQI_display.utils.hindcast import hindcast
+from src.AQI_display.utils.postprocess import (
+    FEATURE_NAMES,
+    format_predictions,
+    frame_quantiles,
+)
+from src.AQI_display.utils.scaler_store import ScalerStore, load_scaler_store
+from src.AQI_display.utils.sequence_source import FileSequenceSource, SequenceSource
+from src.config import LOGGER
+
+SEQUENCE_LENGTH = 72
+BACKENDS = ("torch", "int8", "onnx")
+
+
+def file_md5(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    计算文件内容的md5
+    Args:
+        file_path(str):文件路径
+        chunk_size(int,optional):每次读取的字节数
+    Returns:
+        str:md5摘要
+    """
+    m = hashlib.md5()
+    with open(file_path, "rb") as fp:
+        for chunk in iter(lambda: fp.read(chunk_size), b""):
+            m.update(chunk)
+    return m.hexdigest()
+
+
+def file_stat_key(file_path: str) -> tuple:
+    """文件的 (mtime, size), 用于低成本判断文件是否变化"""
+    stat = os.stat(file_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class LoadedModel:
+    """已加载并预热的推理后端快照, 创建后只读"""
+
+    def __init__(
+        self,
+        forecaster,
+        version: str,
+        stat_key: tuple,
+        scaler_store: ScalerStore = None,
+    ):
+        # scaler_store: 模型包或 ONNX 元数据中的归一化参数,
+        # 旧版 ONNX 导出文件中没有时为None(读取 scalers.json)
+        self.forecaster = forecaster
+        self.version = version
+        self.stat_key = stat_key
+        self.scaler_store = scaler_store
+
+
+class ModelRegistry:
+    """进程级模型注册表"""
+
+    def __init__(
+        self,
+        model_path: str,
+        data_path: str = None,
+        scaler_path: str = None,
+        sequence_source: SequenceSource = None,
+        device=None,
+        backend: str = "torch",
+        onnx_path: str = None,
+        num_threads: int = None,
+    ):
+        # sequence_source 为空时从 data_path 导出文件读取全部历史数据
+        # num_threads: onnx 后端的算子内线程数, torch 后端由进程级设置决定
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown predict backend: {backend}")
+        self.model_path = model_path
+        self.data_path = data_path
+        self.sequence_source = sequence_source
+        self.scaler_path = scaler_path or os.path.join(
+            os.path.dirname(model_path), "scalers.json"
+        )
+        self.backend = backend
+        self.onnx_path = onnx_path or os.path.splitext(model_path)[0] + ".onnx"
+        self.num_threads = num_threads
+        # onnx/int8 后端只在CPU上运行, torch 后端在首次加载时再选择设备
+        self.device = device
+        self._lock = threading.Lock()
+        self._loaded = None
+        self._failed_stat_key = None
+        # (stat_key, md5) 未加载的模型文件的版本号缓存, 由 current_version 使用
+        self._version_cache = None
+        self._scaler_store = None
+        self._scaler_stat_key = None
+
+    @property
+    def serving_path(self) -> str:
+        """当前后端实际加载的模型文件, 版本号按该文件计算"""
+        return self.onnx_path if self.backend == "onnx" else self.model_path
+
+    def warm_up(self):
+        """启动时加载模型, 失败只记录日志, 由后续请求重试"""
+        try:
+            loaded = self.get_model()
+            LOGGER.info(f"预测模型已加载: {loaded.version}")
+        except Exception as e:
+            LOGGER.error(f"预测模型加载失败: {e}")
+
+    def current_version(self) -> str:
+        """
+        当前模型的版本号, 只读取文件状态和内容哈希, 不加载模型
+        可在请求线程中调用, 加载和预热由推理线程中的 get_model 完成
+        Returns:
+            str:get_model 将返回的模型版本
+        """
+        stat_key = file_stat_key(self.serving_path)
+        loaded = self._loaded
+        if loaded is not None and stat_key in (loaded.stat_key, self._failed_stat_key):
+            return loaded.version
+
+        cached = self._version_cache
+        if cached is not None and cached[0] == stat_key:
+            return cached[1]
+        version = file_md5(self.serving_path)
+        self._version_cache = (stat_key, version)
+        return version
+
+    def get_model(self) -> LoadedModel:
+        """
+        获取当前模型, checkpoint 变化时先在旁路加载预热, 再替换引用
+        Returns:
+            LoadedModel:当前模型快照
+        """
+        stat_key = file_stat_key(self.serving_path)
+        loaded = self._loaded
+        if loaded is not None and stat_key in (loaded.stat_key, self._failed_stat_key):
+            return loaded
+
+        with self._lock:
+            loaded = self._loaded
+            if loaded is not None and stat_key in (
+                loaded.stat_key,
+                self._failed_stat_key,
+            ):
+                return loaded
+
+            version = file_md5(self.serving_path)
+            if loaded is not None and loaded.version == version:
+                # 仅 mtime 变化, 内容相同, 不需要重新加载
+                self._loaded = LoadedModel(
+                    loaded.forecaster, version, stat_key, loaded.scaler_store
+                )
+                return self._loaded
+
+            try:
+                forecaster, scaler_store = self._load_and_warm_up()
+            except Exception as e:
+                if loaded is None:
+                    raise
+                # 文件可能正在写入, 继续使用旧模型, 文件再次变化时重试
+                self._failed_stat_key = stat_key
+                LOGGER.error(f"模型热更新失败, 继续使用 {loaded.version}: {e}")
+                return loaded
+
+            self._loaded = LoadedModel(forecaster, version, stat_key, scaler_store)
+            self._failed_stat_key = None
+            LOGGER.info(f"模型已切换到 {version}")
+            return self._loaded
+
+    def _load_and_warm_up(self):
+        """加载模型文件并执行一次推理预热, 返回 (推理后端, 模型包中的归一化参数)"""
+        scaler_store = None
+        if self.backend == "onnx":
+            from src.AQI_display.models.onnx_backend import OnnxForecaster
+
+            forecaster = OnnxForecaster(self.onnx_path, num_threads=self.num_threads)
+            if forecaster.scalers is not None:
+                scaler_store = ScalerStore.from_dict(forecaster.scalers)
+            else:
+                LOGGER.warning(
+                    f"{self.onnx_path} 中没有归一化参数, 使用 {self.scaler_path}, "
+                    "请重新导出 ONNX"
+                )
+        else:
+            import torch
+
+            from src.AQI_display.models.bundle import ModelBundle
+            from src.AQI_display.models.quantization import quantize_model
+            from src.AQI_display.models.torch_backend import TorchForecaster
+
+            # 不经过 predict.py, 避免导入 DataProcessor 及 sklearn 等训练依赖
+            bundle = ModelBundle.load(self.model_path)
+            scaler_store = ScalerStore.from_dict(bundle.scalers)
+            if self.backend == "int8":
+                model = quantize_model(bundle.build_model())
+                forecaster = TorchForecaster(model, "cpu")
+            else:
+                if self.device is None:
+                    self.device = torch.device(
+                        "cuda" if torch.cuda.is_available() else "cpu"
+                    )
+                model = bundle.build_model(self.device)
+                forecaster = TorchForecaster(model, self.device)
+        forecaster.predict(
+            np.zeros((1, SEQUENCE_LENGTH, len(FEATURE_NAMES)), dtype=np.float32)
+        )
+        return forecaster, scaler_store
+
+    def get_scaler_store(self, loaded: LoadedModel = None) -> ScalerStore:
+        """获取归一化参数: 优先使用模型包中的参数, 否则读取文件, 文件变化时重新加载
+        Args:
+            loaded(LoadedModel,optional):已取得的模型快照, 保证参数与该模型一致
+        """
+        loaded = loaded or self.get_model()
+        if loaded.scaler_store is not None:
+            return loaded.scaler_store
+
+        if os.path.exists(self.scaler_path):
+            stat_key = file_stat_key(self.scaler_path)
+        else:
+            stat_key = file_stat_key(self.data_path)
+        with self._lock:
+            if self._scaler_store is None or self._scaler_stat_key != stat_key:
+                scaler_store = load_scaler_store(self.scaler_path)
+                self._scaler_store = scaler_store or self._fit_scaler_store()
+                self._scaler_stat_key = stat_key
+            return self._scaler_store
+
+    def _fit_scaler_store(self) -> ScalerStore:
+        """未保存归一化参数时, 按导出的历史数据重新拟合(需要torch)"""
+        from src.AQI_display.utils.data_processor import DataProcessor
+
+        data_processor = DataProcessor(self.data_path)
+        data_processor.ensure_scaled()
+        return data_processor.scaler_store
+
+    def _get_source(self) -> SequenceSource:
+        return self.sequence_source or FileSequenceSource(self.data_path)
+
+    def forecast(self, current_time: datetime = None):
+        """
+        生成未来24小时预测
+        Args:
+            current_time(datetime,optional):预测起点, 默认当前整点
+        Returns:
+            DataFrame:以预测时间为索引的预测结果
+        """
+        loaded = self.get_model()
+        scaler_store = self.get_scaler_store(loaded)
+        window = self._get_source().get_last_window(
+            SEQUENCE_LENGTH, scaler_store.feature_order
+        )
+        current_time = current_time or datetime.now().replace(
+            minute=0, second=0, microsecond=0
+        )
+
+        predictions = loaded.forecaster.predict(scaler_store.transform(window)[None])
+        return format_predictions(
+            predictions[0], scaler_store.column_scalers(), current_time
+        )
+
+    def forecast_quantiles(
+        self,
+        current_time: datetime = None,
+        num_samples: int = 50,
+        quantiles=(0.1, 0.5, 0.9),
+    ):
+        """
+        MC dropout 生成未来24小时预测的分位数区间
+        Args:
+            current_time(datetime,optional):预测起点, 默认当前整点
+            num_samples(int,optional):随机前向的样本数, 在同一批中计算
+            quantiles(tuple,optional):分位数
+        Returns:
+            DataFrame:以预测时间为索引, AQI及各污染物每个分位数一列
+        """
+        loaded = self.get_model()
+        if not hasattr(loaded.forecaster, "predict_quantiles"):
+            # onnx 导出时已固定为eval, 图中不包含dropout
+            raise ValueError(f"Backend {self.backend} does not support MC dropout")
+        scaler_store = self.get_scaler_store(loaded)
+        window = self._get_source().get_last_window(
+            SEQUENCE_LENGTH, scaler_store.feature_order
+        )
+        current_time = current_time or datetime.now().replace(
+            minute=0, second=0, microsecond=0
+        )
+
+        predictions = loaded.forecaster.predict_quantiles(
+            scaler_store.transform(window)[None], num_samples, quantiles
+        )
+        # 归一化为单调递增变换, 分位数可以直接反归一化
+        return frame_quantiles(
+            scaler_store.inverse_transform(predictions[:, 0]), current_time, quantiles
+        )
+
+    def hindcast(self, origins, batch_size: int = 512):
+        """
+        从多个历史起报时间批量回算预测
+        Args:
+            origins(list):起报时间戳(秒), 窗口为截至该时刻的最近72条数据
+            batch_size(int,optional):每次前向传播的样本数
+        Returns:
+            DataFrame:每行一个 (起报时间, 预报时效) 的长表
+        """
+        loaded = self.get_model()
+        scaler_store = self.get_scaler_store(loaded)
+
+        # 一次查询覆盖全部起报时间所需的数据, 并向前多取一个窗口
+        time_points, raw_values = self._get_source().get_range(
+            min(origins),
+            max(origins),
+            scaler_store.feature_order,
+            lookback=SEQUENCE_LENGTH - 1,
+        )
+        return hindcast(
+            loaded.forecaster,
+            time_points,
+            scaler_store.transform(raw_values),
+            origins,
+            scaler_store,
+            sequence_length=SEQUENCE_LENGTH,
+            batch_size=batch_size,
+        )
@@ -0,0 +1,77 @@
+import torch
+
+from .cnn_gru import CNNGRU
+
+# 模型包格式版本, 结构变化时递增
+BUNDLE_FORMAT = 1
+
+
+class ModelBundle:
+    """
+    自描述的模型包: 构造参数, 归一化参数(含特征顺序)和权重保存在同一个文件中
+
+    加载时以 mmap 方式映射权重, 在 meta 设备上构建模型后直接挂载映射的张量,
+    不做随机初始化也不复制权重, 各入口不再各自维护 hidden_dim 等常量
+
+    可选的 training_state 保存续训所需的优化器/调度器状态和训练进度,
+    只用于训练; 没有该字段的旧模型包照常加载, 预测等入口忽略该字段
+    """
+
+    def __init__(self, config, scalers, state_dict, training_state=None):
+        # config: CNNGRU 构造参数, 见 CNNGRU.config()
+        # scalers: ScalerStore.to_dict(), 即 feature_order/data_min/data_max
+        # training_state: epoch/optimizer/scheduler 等续训状态, 见 train.training_state
+        self.config = dict(config)
+        self.scalers = scalers
+        self.state_dict = state_dict
+        self.training_state = training_state
+
+    @property
+    def feature_order(self):
+        return self.scalers["feature_order"]
+
+    @classmethod
+    def from_model(cls, model, scalers, training_state=None):
+        return cls(model.config(), scalers, model.state_dict(), training_state)
+
+    def to_dict(self):
+        checkpoint = {
+            "format": BUNDLE_FORMAT,
+            "config": self.config,
+            "scalers": self.scalers,
+            "state_dict": self.state_dict,
+        }
+        if self.training_state is not None:
+            checkpoint["training_state"] = self.training_state
+        return checkpoint
+
+    def save(self, path):
+        torch.save(self.to_dict(), path)
+
+    @classmethod
+    def load(cls, path):
+        """权重按 mmap 映射到CPU, 只允许加载张量和基础类型"""
+        checkpoint = torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+        if (
+            not isinstance(checkpoint, dict)
+            or checkpoint.get("format") != BUNDLE_FORMAT
+        ):
+            raise ValueError(
+                f"{path} is not a model bundle (format {BUNDLE_FORMAT}), "
+                "retrain or save it with ModelBundle(config, scalers, state_dict).save()"
+            )
+        return cls(
+            checkpoint["config"],
+            checkpoint["scalers"],
+            checkpoint["state_dict"],
+            checkpoint.get("training_state"),
+        )
+
+    def build_model(self, device=None):
+        """按保存的构造参数重建模型并挂载权重, 返回 eval 模式的模型"""
+        with torch.device("meta"):
+            model = CNNGRU(**self.config)
+        model.load_state_dict(self.state_dict, assign=True)
+        if device is not None:
+            model = model.to(device)
+        return model.eval()
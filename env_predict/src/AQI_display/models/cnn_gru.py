@@ -1,13 +1,22 @@
 import torch
 import torch.nn as nn
 
+# 输出头: autoregressive 逐步解码(默认, 与已有checkpoint兼容), direct 一次投影输出全部时效
+HEADS = ('autoregressive', 'direct')
+
 class CNNGRU(nn.Module):
-    def __init__(self, input_channels, sequence_length, hidden_dim=128, num_layers=2, output_dim=8, prediction_length=24):
+    def __init__(self, input_channels, sequence_length, hidden_dim=128, num_layers=2, output_dim=8, prediction_length=24, head='autoregressive'):
         super(CNNGRU, self).__init__()
         
+        if head not in HEADS:
+            raise ValueError(f"Unknown head: {head}")
+        self.input_channels = input_channels
+        self.sequence_length = sequence_length
         self.prediction_length = prediction_length
         self.output_dim = output_dim
         self.hidden_dim = hidden_dim
+        self.num_layers = num_layers
+        self.head = head
         
         # CNN layers
         self.conv1 = nn.Conv1d(6, 32, kernel_size=3, padding=1)  # 固定输入通道为6
@@ -27,12 +36,29 @@ class CNNGRU(nn.Module):
         )
         
         # Output layers
-        self.fc_hidden = nn.Linear(hidden_dim, hidden_dim)  # 调整维度
-        self.fc_out = nn.Linear(hidden_dim, output_dim)  # 调整维度
+        if head == 'direct':
+            # 从最后的隐藏状态一次投影出 prediction_length * output_dim 个值
+            self.fc_direct = nn.Linear(hidden_dim, prediction_length * output_dim)
+        else:
+            self.fc_hidden = nn.Linear(hidden_dim, hidden_dim)  # 调整维度
+            self.fc_out = nn.Linear(hidden_dim, output_dim)  # 调整维度
         self.dropout = nn.Dropout(0.3)
         self.relu = nn.ReLU()
         
-    def forward(self, x):
+    def config(self):
+        """构造参数, 与权重一起保存到模型包中, 加载时按此重建模型"""
+        return {
+            'input_channels': self.input_channels,
+            'sequence_length': self.sequence_length,
+            'hidden_dim': self.hidden_dim,
+            'num_layers': self.num_layers,
+            'output_dim': self.output_dim,
+            'prediction_length': self.prediction_length,
+            'head': self.head,
+        }
+    
+    def encode(self, x):
+        """CNN + GRU 编码, 返回最后一层GRU的最终隐藏状态 [batch, hidden_dim]"""
         # 确保输入只有6个特征
         x = x[:, :, :6] if x.size(2) > 6 else x
         
@@ -46,10 +72,17 @@ class CNNGRU(nn.Module):
         
         # GRU forward pass
         _, hidden = self.gru(x)
+        return hidden[-1]  # 只使用最后一层的隐藏状态
+    
+    def decode(self, hidden):
+        """由隐藏状态生成预测序列 [batch_size, prediction_length, output_dim]"""
+        if self.head == 'direct':
+            outputs = self.fc_direct(self.dropout(hidden))
+            return outputs.view(-1, self.prediction_length, self.output_dim)
         
-        # 使用GRU的最后一个隐藏状态生成预测序列
+        # 使用GRU的最后一个隐藏状态逐步生成预测序列
         outputs = []
-        current_hidden = hidden[-1]  # 只使用最后一层的隐藏状态
+        current_hidden = hidden
         
         for _ in range(self.prediction_length):
             # 通过全连接层生成当前时间步的预测
@@ -61,4 +94,7 @@ class CNNGRU(nn.Module):
         # 将所有预测拼接在一起
         outputs = torch.cat(outputs, dim=1)  # [batch_size, prediction_length, output_dim]
         
-        return outputs
\ No newline at end of file
+        return outputs
+    
+    def forward(self, x):
+        return self.decode(self.encode(x))
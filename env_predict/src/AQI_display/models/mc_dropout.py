@@ -0,0 +1,45 @@
+import copy
+
+import torch
+import torch.nn as nn
+
+# 推理时保持随机的模块: Dropout, 以及只在train模式下启用层间dropout的GRU
+STOCHASTIC_MODULES = (nn.Dropout, nn.GRU)
+DEFAULT_QUANTILES = (0.1, 0.5, 0.9)
+
+
+def enable_mc_dropout(model):
+    """只把dropout相关模块切到train模式, BatchNorm等其余模块保持eval"""
+    model.eval()
+    for module in model.modules():
+        if isinstance(module, STOCHASTIC_MODULES):
+            module.train()
+    return model
+
+
+def mc_dropout_copy(model):
+    """复制一份开启MC dropout的模型, 不改变原模型的eval状态(原模型可能正被其他线程使用)"""
+    return enable_mc_dropout(copy.deepcopy(model))
+
+
+@torch.no_grad()
+def sample_predictions(mc_model, windows, num_samples):
+    """
+    输入沿batch维复制 num_samples 份, 一次前向得到全部随机样本
+    :param mc_model: 已开启MC dropout的模型
+    :param windows: [batch, sequence_length, n_features]
+    :return: [batch, num_samples, prediction_length, output_dim]
+    """
+    outputs = mc_model(windows.repeat_interleave(num_samples, dim=0))
+    return outputs.view(windows.size(0), num_samples, *outputs.shape[1:])
+
+
+@torch.no_grad()
+def predict_quantiles(mc_model, windows, num_samples=50, quantiles=DEFAULT_QUANTILES):
+    """
+    MC dropout 预测分位数
+    :return: [len(quantiles), batch, prediction_length, output_dim]
+    """
+    samples = sample_predictions(mc_model, windows, num_samples)
+    q = torch.tensor(quantiles, dtype=samples.dtype, device=samples.device)
+    return torch.quantile(samples, q, dim=1)
@@ -0,0 +1,52 @@
+import json
+
+import numpy as np
+
+# 本模块不依赖torch, 只需安装 onnxruntime 即可完成推理
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
+
+class OnnxForecaster:
+    """基于 ONNX Runtime (CPU) 的推理后端, 接口与 TorchForecaster 一致"""
+
+    backend = "onnx"
+
+    def __init__(self, onnx_path, num_threads=None):
+        if ort is None:
+            raise ImportError("onnxruntime is required for the onnx backend")
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.onnx_path = onnx_path
+        self.session = ort.InferenceSession(
+            onnx_path, options, providers=["CPUExecutionProvider"]
+        )
+        self.input_name = self.session.get_inputs()[0].name
+        # 输出形状为 [batch, prediction_length, output_dim], batch 为动态维度
+        _, self.prediction_length, self.output_dim = self.session.get_outputs()[0].shape
+        # 导出时写入元数据的归一化参数, 旧版导出文件中没有时为None
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.scalers = (
+            json.loads(metadata["scalers"]) if "scalers" in metadata else None
+        )
+
+    def predict(self, windows, batch_size=512):
+        """
+        按大批量执行推理
+        :param windows: (n, sequence_length, n_features) 已归一化的输入窗口
+        :return: (n, prediction_length, output_dim) 的float32数组
+        """
+        windows = np.ascontiguousarray(windows, dtype=np.float32)
+        outputs = [
+            self.session.run(
+                None, {self.input_name: windows[start : start + batch_size]}
+            )[0]
+            for start in range(0, len(windows), batch_size)
+        ]
+        if not outputs:
+            return np.empty((0, self.prediction_length, self.output_dim), np.float32)
+        return np.concatenate(outputs, axis=0)
@@ -0,0 +1,63 @@
+import json
+
+import numpy as np
+import torch
+
+from .onnx_backend import OnnxForecaster
+from .torch_backend import TorchForecaster
+
+INPUT_NAME = "input"
+OUTPUT_NAME = "output"
+# ONNX 元数据中保存归一化参数(ScalerStore.to_dict 的JSON)的键
+SCALERS_METADATA_KEY = "scalers"
+
+
+def export_onnx(
+    model, onnx_path, sequence_length, input_dim, opset_version=17, scalers=None
+):
+    """
+    将 CNNGRU 导出为 ONNX, batch 维度为动态维度
+    :param model: 已加载参数的模型
+    :param onnx_path: 导出文件路径
+    :param sequence_length: 输入窗口长度
+    :param input_dim: 输入特征数
+    :param scalers: 模型包中的归一化参数, 写入 ONNX 元数据, 与权重在同一个文件中
+    """
+    model = model.cpu().eval()
+    dummy_input = torch.zeros(2, sequence_length, input_dim)
+    torch.onnx.export(
+        model,
+        (dummy_input,),
+        onnx_path,
+        input_names=[INPUT_NAME],
+        output_names=[OUTPUT_NAME],
+        dynamic_axes={INPUT_NAME: {0: "batch"}, OUTPUT_NAME: {0: "batch"}},
+        opset_version=opset_version,
+        dynamo=False,
+    )
+    if scalers is not None:
+        import onnx
+
+        model_proto = onnx.load(onnx_path)
+        onnx.helper.set_model_props(
+            model_proto, {SCALERS_METADATA_KEY: json.dumps(scalers)}
+        )
+        onnx.save(model_proto, onnx_path)
+    return onnx_path
+
+
+def check_parity(model, onnx_path, windows, batch_sizes=(1, 32, 512)):
+    """
+    比较 eager 模型与 ONNX Runtime 在同一批输入上的输出
+    :param windows: (n, sequence_length, n_features) 已归一化的输入窗口
+    :param batch_sizes: 分别按这些批大小推理, 检查动态 batch 维度
+    :return: {batch_size: 最大绝对误差}
+    """
+    expected = TorchForecaster(model.cpu()).predict(windows)
+    forecaster = OnnxForecaster(onnx_path)
+    return {
+        batch_size: float(
+            np.abs(forecaster.predict(windows, batch_size) - expected).max()
+        )
+        for batch_size in batch_sizes
+    }
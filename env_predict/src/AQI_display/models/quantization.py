@@ -0,0 +1,26 @@
+import io
+
+import torch
+import torch.nn as nn
+
+# 动态量化只作用于 GRU 和全连接层, 卷积和BatchNorm保持fp32
+QUANTIZED_MODULES = {nn.GRU, nn.Linear}
+
+
+def quantize_model(model):
+    """
+    对已加载参数的fp32模型做动态int8量化(权重int8, 激活在推理时动态量化)
+    :param model: 已加载参数的模型, 量化只支持CPU
+    :return: 量化后的新模型, 原模型不变
+    """
+    model = model.cpu().eval()
+    return torch.ao.quantization.quantize_dynamic(
+        model, QUANTIZED_MODULES, dtype=torch.qint8
+    )
+
+
+def model_size_bytes(model):
+    """序列化 state_dict 后的字节数, 用于比较量化前后的模型大小"""
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.getbuffer().nbytes
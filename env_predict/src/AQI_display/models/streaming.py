@@ -0,0 +1,98 @@
+import torch
+import torch.nn.functional as F
+
+# 两层 kernel_size=3, padding=1 的卷积: 最新一个小时到达后, conv1 最后1个位置和
+# conv2 最后2个位置的输出会因右侧补零变化, 这些位置只做临时计算, 不写入GRU状态
+CONV_CONTEXT = 2
+
+
+class StreamingState:
+    """一批序列的增量推理状态, 每个tensor的batch维对应一个序列"""
+
+    def __init__(self, x_tail, conv1_tail, hidden, steps=0):
+        # x_tail: [batch, 2, 6] 最近2个小时的输入特征
+        # conv1_tail: [batch, 2, 32] 已确定的最近2个 conv1 输出(不含最新一小时)
+        # hidden: [num_layers, batch, hidden_dim] 已消费全部确定 conv2 输出后的GRU状态
+        # steps: 初始化之后增量推进的小时数
+        self.x_tail = x_tail
+        self.conv1_tail = conv1_tail
+        self.hidden = hidden
+        self.steps = steps
+
+
+class StreamingCNNGRU:
+    """
+    CNNGRU 的增量推理引擎
+
+    先用完整窗口初始化状态(与整窗前向结果一致), 之后每到一个小时只计算
+    卷积感受野内的3个位置, GRU确定推进1步, 再临时推进2步得到预测用的隐藏状态。
+    由于GRU状态包含窗口之前的历史, 结果与只看最近窗口的整窗重算存在误差,
+    可通过 steps 定期用完整窗口重新初始化。
+    """
+
+    def __init__(self, model):
+        self.model = model.eval()
+
+    def _conv1(self, x):
+        """x: [batch, len, 6] -> 无补零的 conv1 输出 [batch, len - 2, 32]"""
+        model = self.model
+        x = F.conv1d(x.permute(0, 2, 1), model.conv1.weight, model.conv1.bias)
+        return model.relu(model.bn1(x)).permute(0, 2, 1)
+
+    def _conv2(self, a):
+        """a: [batch, len, 32] -> 无补零的 conv2 输出 [batch, len - 2, 64]"""
+        model = self.model
+        a = F.conv1d(a.permute(0, 2, 1), model.conv2.weight, model.conv2.bias)
+        return model.relu(model.bn2(a)).permute(0, 2, 1)
+
+    def _provisional_hidden(self, state):
+        """用临时的最后2个 conv2 输出推进GRU, 返回最后一层隐藏状态"""
+        x_tail, a_tail = state.x_tail, state.conv1_tail
+        zeros_x = x_tail.new_zeros(x_tail.size(0), 1, x_tail.size(2))
+        zeros_a = a_tail.new_zeros(a_tail.size(0), 1, a_tail.size(2))
+        # 最新一小时右侧按补零计算 conv1, 再按补零计算最后2个 conv2 输出
+        a_last = self._conv1(torch.cat([x_tail, zeros_x], dim=1))
+        b_last = self._conv2(torch.cat([a_tail, a_last, zeros_a], dim=1))
+        _, hidden = self.model.gru(b_last, state.hidden)
+        return hidden[-1]
+
+    @torch.no_grad()
+    def prime(self, windows):
+        """
+        用完整窗口初始化状态
+        :param windows: [batch, sequence_length, n_features] 已归一化的输入窗口
+        :return: StreamingState
+        """
+        x = windows[:, :, :6]
+        model = self.model
+        a = model.relu(model.bn1(model.conv1(x.permute(0, 2, 1))))
+        b = model.relu(model.bn2(model.conv2(a))).permute(0, 2, 1)
+        _, hidden = model.gru(b[:, :-CONV_CONTEXT])
+        return StreamingState(
+            x_tail=x[:, -CONV_CONTEXT:].contiguous(),
+            conv1_tail=a.permute(0, 2, 1)[:, -CONV_CONTEXT - 1 : -1].contiguous(),
+            hidden=hidden,
+        )
+
+    @torch.no_grad()
+    def step(self, state, observation):
+        """
+        追加一个小时的观测, 返回新状态
+        :param observation: [batch, n_features] 已归一化的最新一小时数据
+        """
+        x_new = observation[:, None, :6]
+        # 新数据到达后, 上一个最新小时的 conv1 输出确定, 倒数第二个 conv2 输出确定
+        a_final = self._conv1(torch.cat([state.x_tail, x_new], dim=1))
+        b_final = self._conv2(torch.cat([state.conv1_tail, a_final], dim=1))
+        _, hidden = self.model.gru(b_final, state.hidden)
+        return StreamingState(
+            x_tail=torch.cat([state.x_tail[:, 1:], x_new], dim=1),
+            conv1_tail=torch.cat([state.conv1_tail[:, 1:], a_final], dim=1),
+            hidden=hidden,
+            steps=state.steps + 1,
+        )
+
+    @torch.no_grad()
+    def forecast(self, state):
+        """由当前状态生成预测 [batch, prediction_length, output_dim]"""
+        return self.model.decode(self._provisional_hidden(state))
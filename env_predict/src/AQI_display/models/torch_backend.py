@@ -0,0 +1,63 @@
+import threading
+
+import numpy as np
+import torch
+
+from .mc_dropout import DEFAULT_QUANTILES, mc_dropout_copy, predict_quantiles
+
+
+class TorchForecaster:
+    """基于 PyTorch eager 模型的推理后端, 输入输出均为numpy数组"""
+
+    backend = "torch"
+
+    def __init__(self, model, device=None):
+        self.model = model
+        self.device = device or next(model.parameters()).device
+        self.model.eval()
+        self._mc_model = None
+        self._mc_lock = threading.Lock()
+
+    def predict(self, windows, batch_size=512):
+        """
+        按大批量执行前向传播
+        :param windows: (n, sequence_length, n_features) 已归一化的输入窗口
+        :return: (n, prediction_length, output_dim) 的float32数组
+        """
+        windows = np.ascontiguousarray(windows, dtype=np.float32)
+        outputs = []
+        with torch.no_grad():
+            for start in range(0, len(windows), batch_size):
+                batch = torch.from_numpy(windows[start : start + batch_size])
+                outputs.append(self.model(batch.to(self.device)).cpu().numpy())
+        if not outputs:
+            return np.empty(
+                (0, self.model.prediction_length, self.model.output_dim), np.float32
+            )
+        return np.concatenate(outputs, axis=0)
+
+    def predict_quantiles(
+        self, windows, num_samples=50, quantiles=DEFAULT_QUANTILES, batch_size=512
+    ):
+        """
+        MC dropout 不确定性预测, 每个窗口复制 num_samples 份在同一批中前向
+        :param batch_size: 每次前向的样本数(含复制), 至少包含一个窗口的全部样本
+        :return: (len(quantiles), n, prediction_length, output_dim) 的float32数组
+        """
+        if self._mc_model is None:
+            with self._mc_lock:
+                if self._mc_model is None:
+                    self._mc_model = mc_dropout_copy(self.model)
+        windows = np.ascontiguousarray(windows, dtype=np.float32)
+        windows_per_batch = max(batch_size // num_samples, 1)
+        outputs = []
+        for start in range(0, len(windows), windows_per_batch):
+            batch = torch.from_numpy(windows[start : start + windows_per_batch])
+            outputs.append(
+                predict_quantiles(
+                    self._mc_model, batch.to(self.device), num_samples, quantiles
+                )
+                .cpu()
+                .numpy()
+            )
+        return np.concatenate(outputs, axis=1)
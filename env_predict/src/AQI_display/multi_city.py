@@ -0,0 +1,215 @@
+"""
+Created by lrh at 2026-10-18.
+Description: 多城市批量预测
+    - 各城市最近72小时窗口堆叠为一个batch, 一次前向得到全部城市的预测
+    - 每个城市使用各自的归一化参数(scalers_{citycode}.json), 缺省时共用模型的参数
+    - 城市归一化参数按各城市全部历史数据拟合:
+      python -m src.AQI_display.multi_city --citycodes 440100 (在 env_predict 目录下运行)
+    - 归一化/反归一化按 (城市, 特征) 向量化计算, 耗时随batch大小而非城市数量增长
+Changelog: all notable changes to this file will be documented
+"""
+
+import argparse
+import os
+import threading
+
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+
+from src.AQI_display.model_registry import SEQUENCE_LENGTH, file_stat_key
+from src.AQI_display.utils.postprocess import frame_predictions
+from src.AQI_display.utils.scaler_store import ScalerStore, StackedScalerStore
+from src.config import LOGGER
+
+# 堆叠归一化参数最多缓存的城市组合数, 超出时淘汰最久未使用的组合
+STACKED_CACHE_SIZE = 8
+
+
+def fit_city_scaler_store(source, base_store: ScalerStore) -> ScalerStore:
+    """
+    按城市全部历史数据拟合 MinMax 归一化参数
+    Args:
+        source(SequenceSource):城市数据源
+        base_store(ScalerStore):模型的归一化参数, 沿用其特征顺序和需要归一化的特征
+    Returns:
+        ScalerStore:城市的归一化参数
+    """
+    _, values = source.get_range(0, np.iinfo(np.int64).max, base_store.feature_order)
+    if len(values) == 0:
+        raise ValueError("No data to fit city scalers")
+    data_min, data_max = {}, {}
+    for i, feature in enumerate(base_store.feature_order):
+        if feature in base_store.data_min:
+            data_min[feature] = np.nanmin(values[:, i])
+            data_max[feature] = np.nanmax(values[:, i])
+    return ScalerStore(base_store.feature_order, data_min, data_max)
+
+
+class MultiCityPredictor:
+    """共用 ModelRegistry 常驻模型的多城市预测"""
+
+    def __init__(self, model_registry, city_sources: dict, scaler_dir: str = None):
+        # city_sources: citycode -> SequenceSource
+        # scaler_dir: 城市归一化参数 scalers_{citycode}.json 所在目录
+        self.model_registry = model_registry
+        self.city_sources = dict(city_sources)
+        self.scaler_dir = scaler_dir or os.path.dirname(model_registry.scaler_path)
+        self._lock = threading.Lock()
+        self._city_stores = {}
+        # 城市组合(按城市代码排序) -> StackedScalerStore, LRU
+        self._stacked = OrderedDict()
+
+    def scaler_path(self, citycode: str) -> str:
+        return os.path.join(self.scaler_dir, f"scalers_{citycode}.json")
+
+    def get_scaler_store(self, citycode: str, loaded=None) -> ScalerStore:
+        """获取城市的归一化参数, 文件变化时重新加载, 没有单独参数时使用模型的参数"""
+        scaler_path = self.scaler_path(citycode)
+        if not os.path.exists(scaler_path):
+            return self.model_registry.get_scaler_store(loaded)
+
+        stat_key = file_stat_key(scaler_path)
+        with self._lock:
+            cached = self._city_stores.get(citycode)
+            if cached is None or cached[0] != stat_key:
+                cached = (stat_key, ScalerStore.load(scaler_path))
+                self._city_stores[citycode] = cached
+            return cached[1]
+
+    def get_stacked_store(self, citycodes, loaded=None) -> StackedScalerStore:
+        """按城市顺序堆叠的归一化参数, 各城市参数未变化时复用"""
+        stores = [self.get_scaler_store(citycode, loaded) for citycode in citycodes]
+        cache_key = tuple(citycodes)
+        with self._lock:
+            cached = self._stacked.get(cache_key)
+            if cached is None or any(a is not b for a, b in zip(cached.stores, stores)):
+                cached = StackedScalerStore(stores)
+                self._stacked[cache_key] = cached
+            self._stacked.move_to_end(cache_key)
+            while len(self._stacked) > STACKED_CACHE_SIZE:
+                self._stacked.popitem(last=False)
+            return cached
+
+    def save_city_scalers(self, citycodes=None) -> dict:
+        """
+        按各城市全部历史数据拟合归一化参数, 写入 scalers_{citycode}.json
+        写入临时文件后原子替换, 服务中按文件变化重新加载
+        Args:
+            citycodes(list,optional):城市代码, 默认全部已配置城市
+        Returns:
+            dict:citycode -> 写入的文件路径
+        """
+        base_store = self.model_registry.get_scaler_store()
+        saved = {}
+        for citycode in citycodes or self.city_sources:
+            store = fit_city_scaler_store(self.city_sources[citycode], base_store)
+            scaler_path = self.scaler_path(citycode)
+            tmp_path = scaler_path + ".tmp"
+            store.save(tmp_path)
+            os.replace(tmp_path, scaler_path)
+            saved[citycode] = scaler_path
+        return saved
+
+    def _load_windows(self, citycodes, feature_order):
+        """读取各城市的最近窗口, 数据不足或读取失败的城市跳过"""
+        ready, windows = [], []
+        for citycode in citycodes:
+            try:
+                window = self.city_sources[citycode].get_last_window(
+                    SEQUENCE_LENGTH, feature_order
+                )
+            except Exception as e:
+                LOGGER.error(f"城市 {citycode} 输入窗口读取失败: {e}")
+                continue
+            ready.append(citycode)
+            windows.append(window)
+        return ready, windows
+
+    def forecast(
+        self, citycodes=None, current_time: datetime = None, batch_size: int = 512
+    ) -> dict:
+        """
+        批量生成多个城市未来24小时预测
+        Args:
+            citycodes(list,optional):城市代码, 默认全部已配置城市
+            current_time(datetime,optional):预测起点, 默认当前整点
+            batch_size(int,optional):每次前向传播的城市数量
+        Returns:
+            dict:citycode -> 以预测时间为索引的预测结果
+        """
+        # 按城市代码排序去重, 同一组城市不论请求中的顺序都复用同一份堆叠参数
+        citycodes = sorted(set(citycodes or self.city_sources))
+        unknown = [
+            citycode for citycode in citycodes if citycode not in self.city_sources
+        ]
+        if unknown:
+            raise KeyError(f"Unknown citycodes: {unknown}")
+
+        loaded = self.model_registry.get_model()
+        feature_order = self.model_registry.get_scaler_store(loaded).feature_order
+        citycodes, windows = self._load_windows(citycodes, feature_order)
+        if not citycodes:
+            return {}
+
+        current_time = current_time or datetime.now().replace(
+            minute=0, second=0, microsecond=0
+        )
+        stacked_store = self.get_stacked_store(citycodes, loaded)
+        predictions = loaded.forecaster.predict(
+            stacked_store.transform(np.stack(windows)), batch_size=batch_size
+        )
+        df_predictions = frame_predictions(
+            stacked_store.inverse_transform(predictions), current_time
+        )
+
+        # 按城市顺序切分为各自的预测结果
+        prediction_length = predictions.shape[1]
+        return {
+            citycode: df_predictions.iloc[
+                i * prediction_length : (i + 1) * prediction_length
+            ]
+            for i, citycode in enumerate(citycodes)
+        }
+
+
+if __name__ == "__main__":
+    from src.AQI_display.model_registry import ModelRegistry
+    from src.AQI_display.utils.sequence_source import (
+        FileSequenceSource,
+        MongoSequenceSource,
+    )
+    from src.config import Config
+    from src.databases import MongodbManager
+
+    parser = argparse.ArgumentParser(description="拟合各城市的归一化参数")
+    parser.add_argument(
+        "--citycodes", nargs="*", default=None, help="城市代码, 默认全部已配置城市"
+    )
+    args = parser.parse_args()
+
+    # 与 Web 服务相同的数据源和模型, 特征顺序以模型的归一化参数为准
+    city_sources = {}
+    for citycode, collection in Config.PREDICT_CITIES.items():
+        if Config.PREDICT_SOURCE == "mongodb":
+            mongodb_base = MongodbManager.get_mongodb_base(
+                mongodb_config=Config.MONGODB_CONFIG
+            )
+            city_sources[citycode] = MongoSequenceSource(
+                coll_conn=mongodb_base.get_collection(collection=collection)
+            )
+        else:
+            city_sources[citycode] = FileSequenceSource(
+                os.path.join(Config.AQI_DIR, "data", f"{collection}.json")
+            )
+    model_registry = ModelRegistry(
+        model_path=Config.MODEL_PATH,
+        data_path=Config.PREDICT_DATA_PATH,
+        scaler_path=Config.SCALER_PATH,
+        backend=Config.PREDICT_BACKEND,
+        onnx_path=Config.ONNX_MODEL_PATH,
+    )
+    predictor = MultiCityPredictor(model_registry, city_sources)
+    for citycode, scaler_path in predictor.save_city_scalers(args.citycodes).items():
+        print(f"城市 {citycode} 的归一化参数已保存到 {scaler_path}")
@@ -0,0 +1,286 @@
+import contextlib
+import itertools
+import json
+import multiprocessing
+import os
+import time
+import traceback
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# 默认搜索空间, 可用 --sweep-config 指定JSON文件覆盖其中的任意项
+DEFAULT_GRID = {
+    'hidden_dim': [32, 64, 128],
+    'num_layers': [1, 2],
+    'lr': [0.0005, 0.001],
+    'alpha': [0.5, 0.7],
+}
+# 所有候选共用的训练设置
+DEFAULT_SETTINGS = {
+    'epochs': 100,
+    'batch_size': 32,
+    'seed': 42,
+    # 早停的 patience, None 表示训练满 epochs
+    'patience': None,
+}
+LOG_BACKENDS = ('json', 'wandb')
+WANDB_PROJECT = 'AQI-predict'
+
+# 工作进程中挂载的共享数据集, 由 _init_worker 设置
+_worker_state = {}
+
+
+def load_grid(config_path=None):
+    """读取搜索空间: {参数名: [候选值]} 以及 epochs/batch_size/seed, 未给出的项使用默认值"""
+    grid, settings = dict(DEFAULT_GRID), dict(DEFAULT_SETTINGS)
+    if config_path:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        for key, value in config.items():
+            if key in DEFAULT_SETTINGS:
+                settings[key] = value
+            elif key in DEFAULT_GRID:
+                grid[key] = value if isinstance(value, list) else [value]
+            else:
+                raise ValueError(f"Unknown sweep parameter: {key}")
+    return grid, settings
+
+
+def candidates_from_grid(grid):
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+
+
+def candidate_id(index, params):
+    return f"{index:03d}_" + '_'.join(f"{key}={value}" for key, value in params.items())
+
+
+def share_arrays(arrays):
+    """
+    把数组复制到共享内存, 返回 (共享内存块列表, 描述信息)
+    工作进程按描述信息挂载, 直接在共享内存上构建数组和张量, 不再各自解析JSON和构建窗口
+    """
+    blocks, specs = [], {}
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array, dtype=np.float32)
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        blocks.append(block)
+        specs[name] = (block.name, array.shape, array.dtype.str)
+    return blocks, specs
+
+
+def _attach_arrays(specs):
+    blocks, arrays = [], {}
+    for name, (block_name, shape, dtype) in specs.items():
+        # 工作进程只挂载, 共享内存由主进程创建和释放(spawn 的子进程与主进程共用同一个 resource_tracker)
+        block = shared_memory.SharedMemory(name=block_name)
+        blocks.append(block)
+        arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+    return blocks, arrays
+
+
+def _init_worker(specs, scalers, threads):
+    """工作进程启动时限制 torch 线程数并挂载共享数据集, 进程数 * threads 不超过CPU核数"""
+    import torch
+
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+    blocks, arrays = _attach_arrays(specs)
+    _worker_state.update(blocks=blocks, arrays=arrays, scalers=scalers)
+
+
+def _run_candidate(run_id, params, settings, output_dir, log_backend):
+    """在工作进程中训练一个候选, 训练输出写入候选目录下的 train.log"""
+    import torch
+    import torch.optim as optim
+
+    from models.cnn_gru import CNNGRU
+    from train import CombinedLoss, evaluate_checkpoint, train_model_fast
+
+    arrays = _worker_state['arrays']
+    X_train, X_test, y_train, y_test = (arrays[name] for name in ('X_train', 'X_test', 'y_train', 'y_test'))
+    run_dir = os.path.abspath(os.path.join(output_dir, run_id))
+    os.makedirs(run_dir, exist_ok=True)
+    checkpoint_path = os.path.join(run_dir, 'best_model.pth')
+
+    torch.manual_seed(settings['seed'])
+    np.random.seed(settings['seed'])
+    model = CNNGRU(
+        input_channels=X_train.shape[2],
+        sequence_length=X_train.shape[1],
+        output_dim=y_train.shape[2],
+        prediction_length=y_train.shape[1],
+        hidden_dim=params['hidden_dim'],
+        num_layers=params['num_layers']
+    )
+    criterion = CombinedLoss(alpha=params['alpha'], check_finite=False)
+    optimizer = optim.AdamW(model.parameters(), lr=params['lr'], weight_decay=1e-4, fused=True)
+    scheduler = optim.lr_scheduler.ReduceLROnPlateau(optimizer, mode='min', factor=0.5, patience=10, min_lr=1e-6)
+
+    start = time.perf_counter()
+    # 训练过程中的预测图也保存到候选目录, 各进程互不覆盖
+    cwd = os.getcwd()
+    os.chdir(run_dir)
+    try:
+        with open('train.log', 'w', encoding='utf-8') as log, contextlib.redirect_stdout(log):
+            train_losses, test_losses = train_model_fast(
+                model=model,
+                X_train=X_train,
+                X_test=X_test,
+                y_train=y_train,
+                y_test=y_test,
+                criterion=criterion,
+                optimizer=optimizer,
+                scheduler=scheduler,
+                num_epochs=settings['epochs'],
+                device='cpu',
+                checkpoint_path=checkpoint_path,
+                scalers=_worker_state['scalers'],
+                batch_size=settings['batch_size'],
+                patience=settings['patience']
+            )
+    finally:
+        os.chdir(cwd)
+    seconds = time.perf_counter() - start
+
+    result = {
+        'id': run_id,
+        'params': params,
+        'status': 'ok',
+        'best_test_loss': min(test_losses) if test_losses else None,
+        'best_epoch': int(np.argmin(test_losses)) + 1 if test_losses else None,
+        'final_test_loss': None,
+        'epochs': len(test_losses),
+        'seconds': round(seconds, 3),
+        'checkpoint': checkpoint_path,
+        'train_losses': train_losses,
+        'test_losses': test_losses,
+    }
+    if os.path.exists(checkpoint_path):
+        # 与 train.main 一致, 按fp32重新计算最佳模型的测试损失作为排名依据
+        result['final_test_loss'] = evaluate_checkpoint(checkpoint_path, X_test, y_test, criterion, 'cpu')
+    if log_backend == 'wandb':
+        log_wandb(result, settings, output_dir)
+    return result
+
+
+def import_wandb():
+    """仓库中的 wandb/ 离线运行目录会被当作同名命名空间包导入, 需要确认导入的是 wandb 本身"""
+    import wandb
+
+    if not hasattr(wandb, 'init'):
+        raise ImportError("wandb is not installed, use --sweep-log json")
+    return wandb
+
+
+def log_wandb(result, settings, output_dir):
+    """每个候选一个离线 wandb 运行, 同一次搜索的候选在同一分组中, 之后可用 wandb sync 上传"""
+    wandb = import_wandb()
+    run = wandb.init(
+        project=WANDB_PROJECT,
+        mode='offline',
+        dir=os.path.abspath(output_dir),
+        group=os.path.basename(os.path.abspath(output_dir)),
+        name=result['id'],
+        config={**result['params'], **settings},
+        reinit=True
+    )
+    for epoch, (train_loss, test_loss) in enumerate(zip(result['train_losses'], result['test_losses'])):
+        run.log({'epoch': epoch + 1, 'train_loss': train_loss, 'test_loss': test_loss})
+    run.summary['best_test_loss'] = result['best_test_loss']
+    run.summary['final_test_loss'] = result['final_test_loss']
+    run.finish()
+
+
+def leaderboard(results):
+    """按fp32最终测试损失升序排名, 失败的候选排在最后"""
+    def key(result):
+        loss = result.get('final_test_loss')
+        return (loss is None, loss if loss is not None else 0.0)
+
+    board = []
+    for rank, result in enumerate(sorted(results, key=key), start=1):
+        entry = {k: v for k, v in result.items() if k not in ('train_losses', 'test_losses')}
+        board.append({'rank': rank, **entry})
+    return board
+
+
+def write_json(path, data):
+    """写入临时文件后原子替换, 中途中断时不会留下不完整的排行榜"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def main(config_path=None, output_dir='sweeps', workers=None, threads_per_worker=1, log_backend='json',
+         data_path='data/d_aqi_huizhou.json'):
+    from utils.data_processor import DataProcessor
+
+    if log_backend not in LOG_BACKENDS:
+        raise ValueError(f"Unknown sweep log backend: {log_backend}")
+    if log_backend == 'wandb':
+        import_wandb()
+    grid, settings = load_grid(config_path)
+    candidates = candidates_from_grid(grid)
+    workers = workers or max(1, (os.cpu_count() or 1) // threads_per_worker)
+    output_dir = os.path.join(output_dir, time.strftime('%Y%m%d_%H%M%S'))
+    os.makedirs(output_dir, exist_ok=True)
+    print(f"Sweep: {len(candidates)} candidates, {workers} workers x {threads_per_worker} threads, output: {output_dir}")
+
+    # 数据只解析和构建窗口一次, 放入共享内存供所有工作进程使用
+    start = time.perf_counter()
+    data_processor = DataProcessor(data_path)
+    X_train, X_test, y_train, y_test = data_processor.prepare_data()
+    blocks, specs = share_arrays({'X_train': X_train, 'X_test': X_test, 'y_train': y_train, 'y_test': y_test})
+    print(f"Dataset prepared in {time.perf_counter() - start:.2f}s: X_train {X_train.shape}, X_test {X_test.shape}")
+    write_json(os.path.join(output_dir, 'sweep_config.json'), {'grid': grid, 'settings': settings})
+
+    results = []
+    leaderboard_path = os.path.join(output_dir, 'leaderboard.json')
+    log_path = os.path.join(output_dir, 'sweep_log.jsonl')
+    try:
+        # spawn: 工作进程不继承主进程中已启动的 torch 线程池
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(specs, data_processor.scaler_store.to_dict(), threads_per_worker)
+        ) as executor, open(log_path, 'a', encoding='utf-8') as log:
+            futures = {
+                executor.submit(_run_candidate, candidate_id(index, params), params, settings, output_dir, log_backend):
+                    (candidate_id(index, params), params)
+                for index, params in enumerate(candidates)
+            }
+            for future in as_completed(futures):
+                run_id, params = futures[future]
+                try:
+                    result = future.result()
+                except Exception:
+                    # 单个候选失败不影响其他候选, 错误记录在日志和排行榜中
+                    result = {'id': run_id, 'params': params, 'status': 'failed', 'error': traceback.format_exc()}
+                results.append(result)
+                log.write(json.dumps(result, ensure_ascii=False) + '\n')
+                log.flush()
+                # 每完成一个候选就更新排行榜, 中断后已完成的结果仍然可用
+                write_json(leaderboard_path, leaderboard(results))
+                print(f"[{len(results)}/{len(candidates)}] {run_id}: {result['status']}, "
+                      f"final test loss {result.get('final_test_loss')}, {result.get('seconds')}s")
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    board = leaderboard(results)
+    print(f"\nLeaderboard saved to {leaderboard_path}")
+    for entry in board[:5]:
+        print(f"{entry['rank']:>3}. {entry['id']}: final test loss {entry.get('final_test_loss')}")
+    return board
+
+
+if __name__ == '__main__':
+    main()
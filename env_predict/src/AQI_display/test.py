@@ -1,7 +1,9 @@
+import time
 import torch
 import numpy as np
-from models.cnn_gru import CNNGRU
+from models.bundle import ModelBundle
 from utils.data_processor import DataProcessor
+from utils.scaler_store import ScalerStore
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 import matplotlib.pyplot as plt
 import seaborn as sns
@@ -31,55 +33,47 @@ def plot_predictions(y_true, y_pred, feature_name, time_steps):
     plt.savefig(f'{feature_name}_predictions.png')
     plt.close()
 
-def main():
+def main(bf16=False, compile=False):
     # 设置设备
     device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
     print(f"Using device: {device}")
     
-    # 数据处理
-    data_processor = DataProcessor('data/d_aqi_huizhou.json')
-    X_train, X_test, y_train, y_test = data_processor.prepare_data()
-    _, test_loader = data_processor.create_dataloaders(X_train, X_test, y_train, y_test)
-    
-    # 加载模型
-    input_channels = X_test.shape[2]
-    sequence_length = X_test.shape[1]
-    output_dim = y_test.shape[2]
-    prediction_length = y_test.shape[1]
-    
-    print(f"Model parameters:")
-    print(f"input_channels: {input_channels}")
-    print(f"sequence_length: {sequence_length}")
-    print(f"output_dim: {output_dim}")
-    print(f"prediction_length: {prediction_length}")
-    
-    model = CNNGRU(
-        input_channels=input_channels,
-        sequence_length=sequence_length,
-        output_dim=output_dim,
-        prediction_length=prediction_length
-    ).to(device)
-    
-    # 加载训练好的模型
+    # 加载模型包, 构造参数和归一化参数都从模型包读取
     try:
-        model.load_state_dict(torch.load('best_model.pth'))
+        bundle = ModelBundle.load('best_model.pth')
+        model = bundle.build_model(device)
         print("Successfully loaded model from best_model.pth")
-    except:
-        print("Error loading model. Please ensure best_model.pth exists and is valid.")
+    except Exception as e:
+        print(f"Error loading model: {str(e)}")
+        print("Please ensure best_model.pth exists and is a valid model bundle.")
         return
-        
-    model.eval()
     
-    # 进行预测
+    # 数据处理, 使用模型包中保存的归一化参数
+    scaler_store = ScalerStore.from_dict(bundle.scalers)
+    data_processor = DataProcessor('data/d_aqi_huizhou.json', scaler_store=scaler_store)
+    X_train, X_test, y_train, y_test = data_processor.prepare_data(
+        bundle.config['sequence_length'], bundle.config['prediction_length'])
+    _, test_loader = data_processor.create_dataloaders(X_train, X_test, y_train, y_test)
+    
+    print(f"Model parameters:")
+    for key, value in bundle.config.items():
+        print(f"{key}: {value}")
+    
+    # 进行预测, 可选 bfloat16 自动混合精度和 torch.compile, 用于比较速度和精度
+    print(f"bf16 autocast: {bf16}, torch.compile: {compile}")
+    if compile:
+        model = torch.compile(model)
     all_predictions = []
     all_targets = []
     
-    with torch.no_grad():
+    start = time.perf_counter()
+    with torch.no_grad(), torch.autocast(device_type=device.type, dtype=torch.bfloat16, enabled=bf16):
         for batch_features, batch_targets in test_loader:
             batch_features = batch_features.to(device)
             outputs = model(batch_features)
-            all_predictions.append(outputs.cpu().numpy())
+            all_predictions.append(outputs.float().cpu().numpy())
             all_targets.append(batch_targets.numpy())
+    print(f"Inference time: {time.perf_counter() - start:.3f}s")
     
     y_pred = np.concatenate(all_predictions, axis=0)
     y_true = np.concatenate(all_targets, axis=0)
@@ -3,24 +3,29 @@ import torch.nn as nn
 import torch.optim as optim
 from tqdm import tqdm
 import numpy as np
+from models.bundle import ModelBundle
 from models.cnn_gru import CNNGRU
+from utils.checkpoint_writer import AsyncCheckpointWriter
 from utils.data_processor import DataProcessor
 import matplotlib.pyplot as plt
 import seaborn as sns
 from torch.optim.lr_scheduler import CosineAnnealingWarmRestarts
 import os
+import time
 
 class CombinedLoss(nn.Module):
-    def __init__(self, alpha=0.5):
+    def __init__(self, alpha=0.5, check_finite=True):
         super(CombinedLoss, self).__init__()
         self.alpha = alpha
+        # check_finite=False 时不在损失内部检查NaN/Inf(每次检查都要同步到主机), 由调用方处理
+        self.check_finite = check_finite
         self.mse = nn.MSELoss()
         self.mae = nn.L1Loss()
     
     def forward(self, y_pred, y_true):
         # 检查输入是否包含NaN或inf
-        if torch.isnan(y_pred).any() or torch.isnan(y_true).any() or \
-           torch.isinf(y_pred).any() or torch.isinf(y_true).any():
+        if self.check_finite and (torch.isnan(y_pred).any() or torch.isnan(y_true).any() or \
+           torch.isinf(y_pred).any() or torch.isinf(y_true).any()):
             print("Warning: NaN or Inf detected in loss computation")
             return torch.tensor(1e6, requires_grad=True, device=y_pred.device)  # 返回一个大的损失值
         
@@ -38,125 +43,405 @@ class CombinedLoss(nn.Module):
         weighted_loss = (combined_loss * time_weights).mean()
         
         # 检查最终损失值
-        if torch.isnan(weighted_loss) or torch.isinf(weighted_loss):
+        if self.check_finite and (torch.isnan(weighted_loss) or torch.isinf(weighted_loss)):
             print("Warning: NaN or Inf in final loss value")
             return torch.tensor(1e6, requires_grad=True, device=y_pred.device)
             
         return weighted_loss
 
-def train_model(model, train_loader, test_loader, criterion, optimizer, scheduler, num_epochs=500, device='cuda'):
+def unwrap_model(model):
+    """torch.compile 返回的模块的 state_dict 带 _orig_mod. 前缀, 保存模型包时使用原模型"""
+    return getattr(model, '_orig_mod', model)
+
+def autocast(device, bf16=False):
+    """bf16=True 时前向和损失计算使用 bfloat16 自动混合精度, 权重和优化器状态仍为fp32"""
+    return torch.autocast(device_type=torch.device(device).type, dtype=torch.bfloat16, enabled=bf16)
+
+def masked_step(optimizer, ok):
+    """
+    ok 为 False 时跳过本次更新: 参数、动量和步数都不变, AdamW 的权重衰减也不生效
+    fused 优化器(如 AdamW(fused=True))按 GradScaler 的方式把 found_inf 交给融合内核在设备上判断,
+    不复制参数也不同步到主机; 其他优化器在主机上判断 ok
+    """
+    if optimizer.defaults.get('fused'):
+        optimizer.found_inf = (~ok).float()
+        try:
+            optimizer.step()
+        finally:
+            del optimizer.found_inf
+    elif ok.item():
+        optimizer.step()
+
+def print_epoch_times(epoch_times):
+    """第一个epoch包含 torch.compile 的编译耗时, 单独输出"""
+    if not epoch_times:
+        return
+    print(f'First epoch time: {epoch_times[0]:.3f}s')
+    if len(epoch_times) > 1:
+        print(f'Average epoch time (excluding first): {np.mean(epoch_times[1:]):.3f}s')
+
+class EarlyStopping:
+    """
+    记录最佳测试损失; 测试损失连续 patience 个epoch没有比最佳值降低超过 min_delta 时停止训练,
+    patience=None 时只记录不停止
+    """
+    def __init__(self, patience=None, min_delta=0.0):
+        self.patience = patience
+        self.min_delta = min_delta
+        self.best_loss = float('inf')
+        self.best_epoch = 0
+        self.bad_epochs = 0
+    
+    def step(self, loss, epoch):
+        """返回本epoch是否为新的最佳(需要保存模型)"""
+        if loss < self.best_loss - self.min_delta:
+            self.bad_epochs = 0
+        else:
+            self.bad_epochs += 1
+        if loss < self.best_loss:
+            self.best_loss = loss
+            self.best_epoch = epoch
+            return True
+        return False
+    
+    @property
+    def should_stop(self):
+        return self.patience is not None and self.bad_epochs >= self.patience
+    
+    def state_dict(self):
+        return {'best_loss': self.best_loss, 'best_epoch': self.best_epoch, 'bad_epochs': self.bad_epochs}
+    
+    def load_state_dict(self, state):
+        self.best_loss = state['best_loss']
+        self.best_epoch = state['best_epoch']
+        self.bad_epochs = state['bad_epochs']
+
+def resume_path_for(checkpoint_path):
+    """续训checkpoint与最佳模型包分开保存, 如 best_model.pth -> best_model_last.pth"""
+    root, ext = os.path.splitext(checkpoint_path)
+    return f'{root}_last{ext}'
+
+def training_state(epoch, optimizer, scheduler, early_stopping, train_losses, test_losses):
+    """续训所需的状态, epoch 为下一个要运行的epoch"""
+    return {
+        'epoch': epoch + 1,
+        'optimizer': optimizer.state_dict(),
+        'scheduler': scheduler.state_dict(),
+        'early_stopping': early_stopping.state_dict(),
+        'train_losses': list(train_losses),
+        'test_losses': list(test_losses),
+        'rng_state': torch.get_rng_state(),
+    }
+
+def resume_training(resume_path, model, optimizer, scheduler, early_stopping):
+    """从续训checkpoint恢复权重、优化器、调度器和早停状态, 返回 (起始epoch, train_losses, test_losses)"""
+    bundle = ModelBundle.load(resume_path)
+    if bundle.training_state is None:
+        raise ValueError(f'{resume_path} has no training state')
+    model = unwrap_model(model)
+    if bundle.config != model.config():
+        raise ValueError(f'{resume_path} was trained with {bundle.config}, current model is {model.config()}')
+    state = bundle.training_state
+    model.load_state_dict(bundle.state_dict)
+    optimizer.load_state_dict(state['optimizer'])
+    scheduler.load_state_dict(state['scheduler'])
+    early_stopping.load_state_dict(state['early_stopping'])
+    torch.set_rng_state(state['rng_state'])
+    print(f'Resumed from {resume_path} at epoch {state["epoch"]+1}, best test loss: {early_stopping.best_loss:.4f}')
+    return state['epoch'], list(state['train_losses']), list(state['test_losses'])
+
+def end_of_epoch(writer, model, scalers, epoch, num_epochs, optimizer, scheduler, early_stopping, train_losses, test_losses,
+                 checkpoint_path, resume_every):
+    """每 resume_every 个epoch以及训练结束时把续训状态交给后台写入, 早停时输出提示"""
+    if resume_every and ((epoch + 1) % resume_every == 0 or epoch + 1 == num_epochs or early_stopping.should_stop):
+        state = training_state(epoch, optimizer, scheduler, early_stopping, train_losses, test_losses)
+        writer.submit(ModelBundle.from_model(unwrap_model(model), scalers, state).to_dict(), resume_path_for(checkpoint_path))
+    if early_stopping.should_stop:
+        print(f'Early stopping at epoch {epoch+1}: test loss has not improved by more than '
+              f'{early_stopping.min_delta} for {early_stopping.patience} epochs')
+    return early_stopping.should_stop
+
+def train_model(model, train_loader, test_loader, criterion, optimizer, scheduler, num_epochs=500, device='cuda', checkpoint_path='best_model.pth', scalers=None, bf16=False,
+                patience=None, min_delta=0.0, resume=False, resume_every=1):
+    """
+    patience/min_delta: 早停, 测试损失连续 patience 个epoch没有改善时停止
+    resume: checkpoint_path 对应的续训checkpoint(见 resume_path_for)存在时从中断处继续
+    resume_every: 每隔多少个epoch保存一次续训状态, 0 表示不保存
+    最佳模型包和续训状态都由后台线程写入, 不阻塞训练
+    """
     train_losses = []
     test_losses = []
-    best_test_loss = float('inf')
-    best_epoch = 0
+    early_stopping = EarlyStopping(patience, min_delta)
+    epoch_times = []
+    start_epoch = 0
+    if resume and os.path.exists(resume_path_for(checkpoint_path)):
+        start_epoch, train_losses, test_losses = resume_training(
+            resume_path_for(checkpoint_path), model, optimizer, scheduler, early_stopping)
     
-    for epoch in range(num_epochs):
-        # 训练阶段
-        model.train()
-        total_train_loss = 0
-        batch_count = 0
-        
-        for batch_features, batch_targets in tqdm(train_loader, desc=f'Epoch {epoch+1}/{num_epochs}'):
-            batch_features = batch_features.to(device)
-            batch_targets = batch_targets.to(device)
-            
-            optimizer.zero_grad()
+    writer = AsyncCheckpointWriter()
+    try:
+        for epoch in range(start_epoch, num_epochs):
+            # 训练阶段
+            model.train()
+            epoch_start = time.perf_counter()
+            total_train_loss = 0
+            batch_count = 0
             
-            # 检查输入数据
-            if torch.isnan(batch_features).any() or torch.isnan(batch_targets).any():
-                print(f"Warning: NaN detected in input data at epoch {epoch+1}")
-                continue
+            for batch_features, batch_targets in tqdm(train_loader, desc=f'Epoch {epoch+1}/{num_epochs}'):
+                batch_features = batch_features.to(device)
+                batch_targets = batch_targets.to(device)
+                
+                optimizer.zero_grad()
+                
+                # 检查输入数据
+                if torch.isnan(batch_features).any() or torch.isnan(batch_targets).any():
+                    print(f"Warning: NaN detected in input data at epoch {epoch+1}")
+                    continue
+                
+                with autocast(device, bf16):
+                    outputs = model(batch_features)
+                
+                # 检查输出是否包含NaN
+                if torch.isnan(outputs).any():
+                    print(f"Warning: NaN detected in model outputs at epoch {epoch+1}")
+                    continue
+                
+                with autocast(device, bf16):
+                    loss = criterion(outputs, batch_targets)
                 
-            outputs = model(batch_features)
+                if loss.item() > 1e5:  # 如果损失值过大，跳过这个batch
+                    print(f"Warning: Large loss value ({loss.item()}) detected at epoch {epoch+1}")
+                    continue
+                    
+                loss.backward()
+                
+                # 梯度裁剪（降低阈值）
+                torch.nn.utils.clip_grad_norm_(model.parameters(), max_norm=0.5)
+                
+                # 检查梯度是否为NaN
+                has_nan_grad = False
+                for param in model.parameters():
+                    if param.grad is not None:
+                        if torch.isnan(param.grad).any() or torch.isinf(param.grad).any():
+                            has_nan_grad = True
+                            param.grad.data.zero_()
+                
+                if not has_nan_grad:
+                    optimizer.step()
+                    total_train_loss += loss.item()
+                    batch_count += 1
             
-            # 检查输出是否包含NaN
-            if torch.isnan(outputs).any():
-                print(f"Warning: NaN detected in model outputs at epoch {epoch+1}")
+            if batch_count == 0:
+                print(f"Warning: All batches were skipped in epoch {epoch+1}")
                 continue
                 
-            loss = criterion(outputs, batch_targets)
+            avg_train_loss = total_train_loss / batch_count
+            train_losses.append(avg_train_loss)
+            
+            # 测试阶段
+            model.eval()
+            total_test_loss = 0
+            test_batch_count = 0
+            predictions = []
+            actuals = []
             
-            if loss.item() > 1e5:  # 如果损失值过大，跳过这个batch
-                print(f"Warning: Large loss value ({loss.item()}) detected at epoch {epoch+1}")
+            with torch.no_grad():
+                for batch_features, batch_targets in test_loader:
+                    batch_features = batch_features.to(device)
+                    batch_targets = batch_targets.to(device)
+                    
+                    with autocast(device, bf16):
+                        outputs = model(batch_features)
+                        loss = criterion(outputs, batch_targets)
+                    
+                    if loss.item() < 1e5:  # 只统计正常的损失值
+                        total_test_loss += loss.item()
+                        test_batch_count += 1
+                        predictions.extend(outputs.float().cpu().numpy())
+                        actuals.extend(batch_targets.cpu().numpy())
+            
+            if test_batch_count == 0:
+                print(f"Warning: All test batches were skipped in epoch {epoch+1}")
                 continue
                 
-            loss.backward()
+            avg_test_loss = total_test_loss / test_batch_count
+            test_losses.append(avg_test_loss)
+            epoch_times.append(time.perf_counter() - epoch_start)
             
-            # 梯度裁剪（降低阈值）
-            torch.nn.utils.clip_grad_norm_(model.parameters(), max_norm=0.5)
+            # 更新学习率
+            scheduler.step(avg_test_loss)
+            current_lr = optimizer.param_groups[0]['lr']
             
-            # 检查梯度是否为NaN
-            has_nan_grad = False
-            for param in model.parameters():
-                if param.grad is not None:
-                    if torch.isnan(param.grad).any() or torch.isinf(param.grad).any():
-                        has_nan_grad = True
-                        param.grad.data.zero_()
+            # 每10个epoch打印一次损失
+            if (epoch + 1) % 10 == 0:
+                print(f'Epoch {epoch+1}/{num_epochs}:')
+                print(f'Training Loss: {avg_train_loss:.4f}')
+                print(f'Test Loss: {avg_test_loss:.4f}')
+                print(f'Learning Rate: {current_lr:.6f}')
+                print(f'Epoch time: {epoch_times[-1]:.3f}s')
             
-            if not has_nan_grad:
-                optimizer.step()
-                total_train_loss += loss.item()
-                batch_count += 1
-        
-        if batch_count == 0:
-            print(f"Warning: All batches were skipped in epoch {epoch+1}")
-            continue
+            # 保存最佳模型
+            if early_stopping.step(avg_test_loss, epoch):
+                # 保存为模型包: 构造参数 + 归一化参数 + 权重, 复制快照后由后台线程写入
+                writer.submit(ModelBundle.from_model(unwrap_model(model), scalers).to_dict(), checkpoint_path)
+                
+                # 保存预测结果的可视化
+                if (epoch + 1) % 50 == 0 and len(predictions) > 0:
+                    plot_predictions(predictions, actuals, epoch)
             
-        avg_train_loss = total_train_loss / batch_count
-        train_losses.append(avg_train_loss)
-        
-        # 测试阶段
-        model.eval()
-        total_test_loss = 0
-        test_batch_count = 0
-        predictions = []
-        actuals = []
-        
-        with torch.no_grad():
-            for batch_features, batch_targets in test_loader:
-                batch_features = batch_features.to(device)
-                batch_targets = batch_targets.to(device)
+            if end_of_epoch(writer, model, scalers, epoch, num_epochs, optimizer, scheduler, early_stopping,
+                            train_losses, test_losses, checkpoint_path, resume_every):
+                break
+    finally:
+        # 等待后台写完checkpoint, 中断时也保留已提交的最佳模型和续训状态
+        writer.close()
+    
+    print(f'\nTraining completed! Best model was at epoch {early_stopping.best_epoch+1} with test loss: {early_stopping.best_loss:.4f}')
+    print_epoch_times(epoch_times)
+    return train_losses, test_losses
+
+def train_model_fast(model, X_train, X_test, y_train, y_test, criterion, optimizer, scheduler, num_epochs=500, device='cpu',
+                     checkpoint_path='best_model.pth', scalers=None, batch_size=32, check_every=50, eval_batch_size=1024,
+                     bf16=False, patience=None, min_delta=0.0, resume=False, resume_every=1):
+    """
+    快速训练模式, 训练过程中不逐batch同步到主机:
+    - 全部样本常驻为张量, 每个epoch用 randperm 打乱后按索引取batch, 不经过 DataLoader
+    - 输入数据只在训练开始时检查一次NaN/Inf
+    - 损失在张量上累加, 训练和评估各只在epoch结束时同步一次
+    - 梯度范数或损失非有限、或损失过大时跳过该batch(见 masked_step, 优化器应使用 fused=True,
+      在设备上跳过), 跳过的batch数每 check_every 个batch才同步检查一次
+    criterion 应使用 CombinedLoss(check_finite=False)
+    早停、续训和后台写入checkpoint的参数同 train_model
+    """
+    X_train = torch.as_tensor(X_train, dtype=torch.float32, device=device)
+    y_train = torch.as_tensor(y_train, dtype=torch.float32, device=device)
+    X_test = torch.as_tensor(X_test, dtype=torch.float32, device=device)
+    y_test = torch.as_tensor(y_test, dtype=torch.float32, device=device)
+    for name, tensor in (('X_train', X_train), ('y_train', y_train), ('X_test', X_test), ('y_test', y_test)):
+        if not torch.isfinite(tensor).all():
+            raise ValueError(f'NaN or Inf detected in {name}')
+    
+    params = [param for param in model.parameters() if param.requires_grad]
+    num_train, num_test = len(X_train), len(X_test)
+    train_losses = []
+    test_losses = []
+    early_stopping = EarlyStopping(patience, min_delta)
+    total_train_time = 0.0
+    epoch_times = []
+    start_epoch = 0
+    if resume and os.path.exists(resume_path_for(checkpoint_path)):
+        start_epoch, train_losses, test_losses = resume_training(
+            resume_path_for(checkpoint_path), model, optimizer, scheduler, early_stopping)
+    
+    writer = AsyncCheckpointWriter()
+    try:
+        for epoch in range(start_epoch, num_epochs):
+            # 训练阶段
+            model.train()
+            epoch_start = time.perf_counter()
+            total_train_loss = torch.zeros((), device=device)
+            good_batches = torch.zeros((), device=device)
+            reported_skipped = 0
+            permutation = torch.randperm(num_train, device=device)
+            
+            for batch_index, begin in enumerate(range(0, num_train, batch_size)):
+                indices = permutation[begin:begin + batch_size]
+                batch_features, batch_targets = X_train[indices], y_train[indices]
                 
-                outputs = model(batch_features)
-                loss = criterion(outputs, batch_targets)
+                optimizer.zero_grad()
+                with autocast(device, bf16):
+                    outputs = model(batch_features)
+                    loss = criterion(outputs, batch_targets)
+                loss.backward()
                 
-                if loss.item() < 1e5:  # 只统计正常的损失值
-                    total_test_loss += loss.item()
-                    test_batch_count += 1
-                    predictions.extend(outputs.cpu().numpy())
-                    actuals.extend(batch_targets.cpu().numpy())
-        
-        if test_batch_count == 0:
-            print(f"Warning: All test batches were skipped in epoch {epoch+1}")
-            continue
+                # 梯度裁剪, 返回的总范数在任一梯度含NaN/Inf时也非有限
+                total_norm = torch.nn.utils.clip_grad_norm_(params, max_norm=0.5)
+                loss = loss.detach()
+                ok = torch.isfinite(total_norm) & (loss < 1e5)
+                masked_step(optimizer, ok)
+                
+                total_train_loss += torch.where(ok, loss, torch.zeros_like(loss))
+                good_batches += ok
+                
+                # 抽样检查: 每 check_every 个batch同步一次跳过的batch数
+                if (batch_index + 1) % check_every == 0:
+                    skipped = batch_index + 1 - int(good_batches.item())
+                    if skipped > reported_skipped:
+                        print(f"Warning: {skipped - reported_skipped} batches with NaN/Inf or large loss skipped at epoch {epoch+1}")
+                        reported_skipped = skipped
             
-        avg_test_loss = total_test_loss / test_batch_count
-        test_losses.append(avg_test_loss)
-        
-        # 更新学习率
-        scheduler.step(avg_test_loss)
-        current_lr = optimizer.param_groups[0]['lr']
-        
-        # 每10个epoch打印一次损失
-        if (epoch + 1) % 10 == 0:
-            print(f'Epoch {epoch+1}/{num_epochs}:')
-            print(f'Training Loss: {avg_train_loss:.4f}')
-            print(f'Test Loss: {avg_test_loss:.4f}')
-            print(f'Learning Rate: {current_lr:.6f}')
-        
-        # 保存最佳模型
-        if avg_test_loss < best_test_loss:
-            best_test_loss = avg_test_loss
-            best_epoch = epoch
-            torch.save(model.state_dict(), 'best_model.pth')
+            total_train_loss, good_count = torch.stack([total_train_loss, good_batches]).tolist()
+            train_time = time.perf_counter() - epoch_start
+            total_train_time += train_time
+            if good_count == 0:
+                print(f"Warning: All batches were skipped in epoch {epoch+1}")
+                continue
+            avg_train_loss = total_train_loss / good_count
+            train_losses.append(avg_train_loss)
             
-            # 保存预测结果的可视化
-            if (epoch + 1) % 50 == 0 and len(predictions) > 0:
-                plot_predictions(predictions, actuals, epoch)
+            # 测试阶段: 大batch前向, 按样本数加权得到全部测试样本上的平均损失
+            model.eval()
+            total_test_loss = torch.zeros((), device=device)
+            with torch.no_grad():
+                for begin in range(0, num_test, eval_batch_size):
+                    with autocast(device, bf16):
+                        outputs = model(X_test[begin:begin + eval_batch_size])
+                        total_test_loss += criterion(outputs, y_test[begin:begin + eval_batch_size]) * len(outputs)
+            avg_test_loss = total_test_loss.item() / num_test
+            test_losses.append(avg_test_loss)
+            epoch_times.append(time.perf_counter() - epoch_start)
+            
+            # 更新学习率
+            scheduler.step(avg_test_loss)
+            current_lr = optimizer.param_groups[0]['lr']
+            
+            # 每10个epoch打印一次损失和吞吐
+            if (epoch + 1) % 10 == 0:
+                print(f'Epoch {epoch+1}/{num_epochs}:')
+                print(f'Training Loss: {avg_train_loss:.4f}')
+                print(f'Test Loss: {avg_test_loss:.4f}')
+                print(f'Learning Rate: {current_lr:.6f}')
+                print(f'Throughput: {num_train / train_time:.0f} samples/sec, epoch time: {epoch_times[-1]:.3f}s')
+            
+            # 保存最佳模型
+            if early_stopping.step(avg_test_loss, epoch):
+                # 保存为模型包: 构造参数 + 归一化参数 + 权重, 复制快照后由后台线程写入
+                writer.submit(ModelBundle.from_model(unwrap_model(model), scalers).to_dict(), checkpoint_path)
+                
+                # 保存预测结果的可视化, 只取第一个测试样本
+                if (epoch + 1) % 50 == 0 and num_test > 0:
+                    with torch.no_grad():
+                        first_prediction = unwrap_model(model)(X_test[:1]).cpu().numpy()
+                    plot_predictions(first_prediction, y_test[:1].cpu().numpy(), epoch)
+            
+            if end_of_epoch(writer, model, scalers, epoch, num_epochs, optimizer, scheduler, early_stopping,
+                            train_losses, test_losses, checkpoint_path, resume_every):
+                break
+    finally:
+        # 等待后台写完checkpoint, 中断时也保留已提交的最佳模型和续训状态
+        writer.close()
     
-    print(f'\nTraining completed! Best model was at epoch {best_epoch+1} with test loss: {best_test_loss:.4f}')
+    print(f'\nTraining completed! Best model was at epoch {early_stopping.best_epoch+1} with test loss: {early_stopping.best_loss:.4f}')
+    if total_train_time > 0:
+        print(f'Average throughput: {num_train * len(epoch_times) / total_train_time:.0f} samples/sec')
+    print_epoch_times(epoch_times)
     return train_losses, test_losses
 
+def evaluate_checkpoint(checkpoint_path, X_test, y_test, criterion, device, batch_size=1024):
+    """
+    按fp32、不编译重新计算最佳模型在测试集上的损失(按样本数加权),
+    使 bf16 / torch.compile 训练出的模型与默认训练结果在同一口径下比较
+    """
+    model = ModelBundle.load(checkpoint_path).build_model(device)
+    X_test = torch.as_tensor(X_test, dtype=torch.float32, device=device)
+    y_test = torch.as_tensor(y_test, dtype=torch.float32, device=device)
+    total_loss = 0.0
+    with torch.no_grad():
+        for begin in range(0, len(X_test), batch_size):
+            outputs = model(X_test[begin:begin + batch_size])
+            total_loss += criterion(outputs, y_test[begin:begin + batch_size]).item() * len(outputs)
+    return total_loss / len(X_test)
+
 def plot_predictions(predictions, actuals, epoch):
     # 选择第一个样本的AQI和hap预测进行可视化
     fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 10))
@@ -199,7 +484,12 @@ def plot_losses(train_losses, test_losses):
     plt.savefig('loss_plot.png')
     plt.close()
 
-def main():
+def checkpoint_path_for(head):
+    """autoregressive 头沿用 best_model.pth, 其他输出头单独保存, 不覆盖线上模型"""
+    return 'best_model.pth' if head == 'autoregressive' else f'best_model_{head}.pth'
+
+def main(head='autoregressive', fast=False, num_epochs=500, batch_size=32, bf16=False, compile=False,
+         patience=None, min_delta=0.0, resume=False):
     # 设置随机种子以确保可重复性
     torch.manual_seed(42)
     np.random.seed(42)
@@ -215,7 +505,12 @@ def main():
     # 数据处理
     data_processor = DataProcessor(data_path)
     X_train, X_test, y_train, y_test = data_processor.prepare_data()
-    train_loader, test_loader = data_processor.create_dataloaders(X_train, X_test, y_train, y_test, batch_size=32)
+    train_loader, test_loader = data_processor.create_dataloaders(X_train, X_test, y_train, y_test, batch_size=batch_size)
+    
+    # 归一化参数同时写入模型包; scalers.json 供 onnx 后端使用, 只在训练线上模型时更新,
+    # 其他输出头的模型包不覆盖线上模型的归一化参数
+    if head == 'autoregressive':
+        data_processor.scaler_store.save('scalers.json')
     
     # 打印数据形状
     print(f"X_train shape: {X_train.shape}")
@@ -232,6 +527,8 @@ def main():
     print(f"sequence_length: {sequence_length}")
     print(f"output_dim: {output_dim}")
     print(f"prediction_length: {prediction_length}")
+    print(f"head: {head}")
+    print(f"bf16 autocast: {bf16}, torch.compile: {compile}")
     
     model = CNNGRU(
         input_channels=input_channels,
@@ -239,12 +536,14 @@ def main():
         output_dim=output_dim,
         prediction_length=prediction_length,
         hidden_dim=64,  # 减小隐藏层维度
-        num_layers=2
+        num_layers=2,
+        head=head
     ).to(device)
     
-    # 损失函数和优化器
-    criterion = CombinedLoss(alpha=0.7)
-    optimizer = optim.AdamW(model.parameters(), lr=0.0005, weight_decay=1e-4)  # 降低学习率
+    # 损失函数和优化器, 快速模式下NaN/Inf检查由训练循环在设备上处理
+    criterion = CombinedLoss(alpha=0.7, check_finite=not fast)
+    # 快速训练模式使用 fused AdamW, 异常batch在融合内核中跳过, 不同步到主机
+    optimizer = optim.AdamW(model.parameters(), lr=0.0005, weight_decay=1e-4, fused=fast or None)  # 降低学习率
     
     # 学习率调度器
     scheduler = optim.lr_scheduler.ReduceLROnPlateau(
@@ -252,20 +551,56 @@ def main():
         mode='min',
         factor=0.5,
         patience=10,
-        verbose=True,
         min_lr=1e-6
     )
     
+    # torch.compile 在第一次前向时编译, 耗时计入第一个epoch; 保存模型包时使用原模型
+    train_target = torch.compile(model) if compile else model
+    checkpoint_path = checkpoint_path_for(head)
+    
     # 训练模型
-    train_losses, test_losses = train_model(
-        model=model,
-        train_loader=train_loader,
-        test_loader=test_loader,
-        criterion=criterion,
-        optimizer=optimizer,
-        scheduler=scheduler,
-        device=device
-    )
+    if fast:
+        train_losses, test_losses = train_model_fast(
+            model=train_target,
+            X_train=X_train,
+            X_test=X_test,
+            y_train=y_train,
+            y_test=y_test,
+            criterion=criterion,
+            optimizer=optimizer,
+            scheduler=scheduler,
+            num_epochs=num_epochs,
+            device=device,
+            checkpoint_path=checkpoint_path,
+            scalers=data_processor.scaler_store.to_dict(),
+            batch_size=batch_size,
+            bf16=bf16,
+            patience=patience,
+            min_delta=min_delta,
+            resume=resume
+        )
+    else:
+        train_losses, test_losses = train_model(
+            model=train_target,
+            train_loader=train_loader,
+            test_loader=test_loader,
+            criterion=criterion,
+            optimizer=optimizer,
+            scheduler=scheduler,
+            num_epochs=num_epochs,
+            device=device,
+            checkpoint_path=checkpoint_path,
+            scalers=data_processor.scaler_store.to_dict(),
+            bf16=bf16,
+            patience=patience,
+            min_delta=min_delta,
+            resume=resume
+        )
+    
+    # 最终测试损失统一按fp32计算, 用于比较 bf16 / torch.compile 是否影响精度
+    if os.path.exists(checkpoint_path):
+        final_test_loss = evaluate_checkpoint(checkpoint_path, X_test, y_test, criterion, device)
+        print(f'Final test loss (fp32, best checkpoint): {final_test_loss:.4f}')
     
     # 绘制损失曲线
     plot_losses(train_losses, test_losses)
@@ -0,0 +1,101 @@
+import os
+import threading
+
+import torch
+
+
+def snapshot(obj):
+    """
+    复制 state_dict 等嵌套结构中的张量(detach + clone 到CPU), 之后训练循环继续更新参数
+    不会影响正在后台写入的内容; 其他值原样保留
+    """
+    if isinstance(obj, torch.Tensor):
+        return obj.detach().to("cpu", copy=True)
+    if isinstance(obj, dict):
+        return {key: snapshot(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(snapshot(value) for value in obj)
+    return obj
+
+
+def save_atomic(obj, path):
+    """写入临时文件后原子替换, 中途中断时原文件保持完整"""
+    tmp_path = path + ".tmp"
+    torch.save(obj, tmp_path)
+    os.replace(tmp_path, path)
+
+
+class AsyncCheckpointWriter:
+    """
+    后台线程写入checkpoint, 训练循环只在提交时复制一份张量快照, 不等待 torch.save
+
+    同一路径尚未写入的旧快照会被新快照替换, 只写最新的一份; 写入失败的异常在下一次
+    submit 或 close 时抛出
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        # path -> 待写入的快照, 按提交顺序写入
+        self._pending = {}
+        self._writing = False
+        self._closed = False
+        self._error = None
+        self._thread = threading.Thread(
+            target=self._run, name="checkpoint-writer", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, obj, path):
+        """复制 obj 中的张量后交给后台线程写入 path, 立即返回"""
+        obj = snapshot(obj)
+        with self._condition:
+            self._raise_error()
+            if self._closed:
+                raise RuntimeError("checkpoint writer is closed")
+            self._pending.pop(path, None)
+            self._pending[path] = obj
+            self._condition.notify_all()
+
+    def flush(self):
+        """等待已提交的快照全部写入"""
+        with self._condition:
+            self._condition.wait_for(lambda: not self._pending and not self._writing)
+            self._raise_error()
+
+    def close(self):
+        """写完已提交的快照后停止后台线程"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        self._raise_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    return
+                path = next(iter(self._pending))
+                obj = self._pending.pop(path)
+                self._writing = True
+            try:
+                save_atomic(obj, path)
+            except Exception as e:
+                with self._condition:
+                    self._error = e
+            finally:
+                with self._condition:
+                    self._writing = False
+                    self._condition.notify_all()
@@ -0,0 +1,218 @@
+import json
+import os
+import shutil
+
+from itertools import islice
+
+import numpy as np
+
+from .sequence_source import QUALITY_MAPPING
+
+# 列式存储格式版本, 结构变化时递增
+COLUMN_STORE_FORMAT = 1
+META_FILE = "meta.json"
+TIME_COLUMN = "time_point"
+# 数值列统一保存为float32, Quality 保存为数值等级, 缺失或无法解析的值为NaN
+FLOAT_COLUMNS = ["AQI", "PM2_5", "PM10", "SO2", "NO2", "CO", "O3", "hap", "Quality"]
+# 全量写入时每次转换的记录数
+WRITE_CHUNK_SIZE = 10000
+
+
+def is_column_store(path):
+    return os.path.isfile(os.path.join(path, META_FILE))
+
+
+def resolve_data_path(data_path):
+    """传入 xxx.json 时, 同名的列式存储目录 xxx/ 存在则优先使用"""
+    root, ext = os.path.splitext(data_path)
+    if ext == ".json" and is_column_store(root):
+        return root
+    return data_path
+
+
+def records_to_columns(records, columns=FLOAT_COLUMNS):
+    """
+    将原始记录转换为列数组, 按 time_point 升序
+    :return: (time_points int64 [n], {column: float32 [n]})
+    """
+    # pandas 在使用时才导入, Web 进程启动时不加载
+    import pandas as pd
+
+    df = pd.DataFrame(list(records), columns=[TIME_COLUMN] + list(columns))
+    df = df.sort_values(TIME_COLUMN, kind="stable")
+    time_points = df[TIME_COLUMN].to_numpy(dtype=np.int64)
+    arrays = {}
+    for column in columns:
+        if column == "Quality":
+            values = df[column].map(QUALITY_MAPPING)
+        else:
+            values = pd.to_numeric(df[column], errors="coerce")
+        arrays[column] = values.to_numpy(dtype=np.float32, na_value=np.nan)
+    return time_points, arrays
+
+
+def _write_meta(path, rows, columns):
+    """原子替换 meta.json, 读取方看到的行数总是对应已写完的列文件"""
+    meta = {
+        "format": COLUMN_STORE_FORMAT,
+        "rows": rows,
+        "columns": list(columns),
+        "time_column": TIME_COLUMN,
+    }
+    tmp_path = os.path.join(path, META_FILE + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(path, META_FILE))
+
+
+def _sort_files(path, columns):
+    """输入不是按时间升序时, 写完后按 time_point 重排各列文件, 每次只读入一列"""
+    time_file = os.path.join(path, f"{TIME_COLUMN}.i8")
+    order = np.argsort(np.fromfile(time_file, dtype=np.int64), kind="stable")
+    np.fromfile(time_file, dtype=np.int64)[order].tofile(time_file)
+    for column in columns:
+        column_file = os.path.join(path, f"{column}.f4")
+        np.fromfile(column_file, dtype=np.float32)[order].tofile(column_file)
+
+
+def write_column_store(path, records, columns=FLOAT_COLUMNS):
+    """
+    全量写入列式存储: 每列一个float32文件, time_point 一个int64文件, 以及描述行数和列的 meta.json
+    records 可以是数据库游标, 按块转换后追加写入, 内存占用与总行数无关
+    先写入临时目录再替换原目录, 已映射旧文件的读取方不受影响, 返回写入的行数
+    """
+    tmp_path = path.rstrip(os.sep) + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    names = [TIME_COLUMN] + list(columns)
+    suffixes = ["i8"] + ["f4"] * len(columns)
+    files = {
+        name: open(os.path.join(tmp_path, f"{name}.{suffix}"), "wb")
+        for name, suffix in zip(names, suffixes)
+    }
+    rows, last_time_point, ordered = 0, None, True
+    try:
+        records = iter(records)
+        while True:
+            chunk = list(islice(records, WRITE_CHUNK_SIZE))
+            if not chunk:
+                break
+            time_points, arrays = records_to_columns(chunk, columns)
+            if last_time_point is not None and time_points[0] < last_time_point:
+                ordered = False
+            last_time_point = time_points[-1]
+            files[TIME_COLUMN].write(time_points.tobytes())
+            for column, values in arrays.items():
+                files[column].write(values.tobytes())
+            rows += len(time_points)
+    finally:
+        for f in files.values():
+            f.close()
+    if not ordered:
+        _sort_files(tmp_path, columns)
+    _write_meta(tmp_path, rows, columns)
+
+    # 目录不能原子覆盖, 先移走旧目录再换入新目录
+    old_path = path.rstrip(os.sep) + ".old"
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    return rows
+
+
+def _append_file(file_path, values, rows):
+    with open(file_path, "r+b") as f:
+        # 丢弃上次中断的追加留在文件末尾、未写入 meta.json 的数据
+        f.truncate(rows * values.itemsize)
+        f.seek(0, os.SEEK_END)
+        f.write(values.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def append_column_store(path, records):
+    """
+    只追加 time_point 大于已有最大值(高水位)的记录, 耗时与新增行数成正比
+    各列文件写完后才原子替换 meta.json, 中途失败时已有数据不受影响;
+    早于高水位的迟到数据不会追加, 需要时用 write_column_store 全量重建
+    存储不存在时等同于全量写入, 返回追加的行数
+    """
+    if not is_column_store(path):
+        return write_column_store(path, records)
+
+    store = ColumnStore(path)
+    time_points, arrays = records_to_columns(records, store.columns)
+    watermark = store.watermark()
+    if watermark is not None:
+        keep = time_points > watermark
+        time_points = time_points[keep]
+        arrays = {column: values[keep] for column, values in arrays.items()}
+    if len(time_points) == 0:
+        return 0
+
+    _append_file(os.path.join(path, f"{store.time_column}.i8"), time_points, store.rows)
+    for column, values in arrays.items():
+        _append_file(os.path.join(path, f"{column}.f4"), values, store.rows)
+    _write_meta(path, store.rows + len(time_points), store.columns)
+    return len(time_points)
+
+
+class ColumnStore:
+    """
+    只读的列式存储, 各列以 mmap 方式映射, 不解析也不复制数据
+
+    映射使用写时复制模式(mode="c"): 调用方修改数组只影响本进程的私有页, 不会写回文件
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") != COLUMN_STORE_FORMAT:
+            raise ValueError(
+                f"{path} is not a column store (format {COLUMN_STORE_FORMAT})"
+            )
+        self.rows = meta["rows"]
+        self.columns = meta["columns"]
+        self.time_column = meta["time_column"]
+
+    def __len__(self):
+        return self.rows
+
+    def _map(self, file_name, dtype):
+        if self.rows == 0:
+            return np.empty(0, dtype=dtype)
+        # 只映射 meta.json 记录的行数, 文件末尾未提交的数据不可见
+        return np.memmap(
+            os.path.join(self.path, file_name),
+            dtype=dtype,
+            mode="c",
+            shape=(self.rows,),
+        )
+
+    def time_points(self):
+        return self._map(f"{self.time_column}.i8", np.int64)
+
+    def watermark(self):
+        """已写入的最大 time_point (按时间升序存储, 即最后一行), 空存储返回None"""
+        if self.rows == 0:
+            return None
+        return int(self.time_points()[-1])
+
+    def column(self, name):
+        if name not in self.columns:
+            raise KeyError(f"{name} is not in column store {self.path}")
+        return self._map(f"{name}.f4", np.float32)
+
+    def to_frame(self, columns=None):
+        """构建 DataFrame, 各列直接引用映射的数组"""
+        import pandas as pd
+
+        columns = self.columns if columns is None else columns
+        data = {self.time_column: self.time_points()}
+        data.update({column: self.column(column) for column in columns})
+        return pd.DataFrame(data, copy=False)
@@ -6,6 +6,9 @@ import torch
 from torch.utils.data import Dataset, DataLoader
 from datetime import datetime, timedelta
 
+from .column_store import ColumnStore, is_column_store, resolve_data_path
+from .scaler_store import ScalerStore
+
 class AQIDataset(Dataset):
     def __init__(self, features, targets):
         self.features = torch.FloatTensor(features)
@@ -33,18 +36,35 @@ class TimeSeriesDataset(Dataset):
         return self.features[idx], self.targets[idx]
 
 class DataProcessor:
-    def __init__(self, data_path):
-        self.data_path = data_path
+    def __init__(self, data_path=None, scaler_store=None, sequence_source=None):
+        # data_path 可以是JSON文件或列式存储目录, xxx.json 旁有同名列式存储时优先使用
+        self.data_path = resolve_data_path(data_path) if data_path else data_path
         self.scalers = {}
+        # 传入训练时保存的归一化参数则不再重新拟合, df保持原始值, 用到时再归一化
+        self.scaler_store = scaler_store
+        self.is_scaled = scaler_store is None
+        # 传入数据源时只按需读取最近窗口, 不加载全部历史数据(仅用于预测)
+        self.sequence_source = sequence_source
+        self.numeric_columns = ['AQI', 'PM2_5', 'PM10', 'SO2', 'NO2', 'CO', 'O3', 'hap']
+        if sequence_source is not None:
+            if scaler_store is None:
+                raise ValueError("sequence_source requires a fitted scaler_store")
+            self.df = None
+            self.scalers = scaler_store.column_scalers()
+            return
         self.load_and_process_data()
     
     def load_and_process_data(self):
-        # 读取JSON数据
-        with open(self.data_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # 转换为DataFrame
-        self.df = pd.DataFrame(data)
+        if is_column_store(self.data_path):
+            # 列式存储: 数值列已是float32, 按 mmap 映射, 不解析不复制
+            self.df = ColumnStore(self.data_path).to_frame()
+        else:
+            # 读取JSON数据
+            with open(self.data_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            
+            # 转换为DataFrame
+            self.df = pd.DataFrame(data)
         
         # 确保时间列存在
         if 'time' not in self.df.columns:
@@ -58,14 +78,17 @@ class DataProcessor:
             if column in self.df.columns:
                 # 将字符串转换为浮点数，处理可能的错误值
                 try:
-                    if column != 'hap':  # hap已经是数值类型
+                    if column != 'hap' and self.df[column].dtype != np.float32:  # hap和列式存储中的列已经是数值类型
                         self.df[column] = pd.to_numeric(self.df[column], errors='coerce')
                     # 填充可能的NaN值
                     if self.df[column].isna().any():
                         # 使用前向填充和后向填充的组合
-                        self.df[column] = self.df[column].fillna(method='ffill').fillna(method='bfill')
+                        self.df[column] = self.df[column].ffill().bfill()
                     # 确保数据类型为float32
-                    self.df[column] = self.df[column].astype(np.float32)
+                    if self.df[column].dtype != np.float32:
+                        self.df[column] = self.df[column].astype(np.float32)
+                    if not self.is_scaled:
+                        continue
                     # 归一化
                     scaler = MinMaxScaler()
                     self.df[column] = scaler.fit_transform(self.df[column].values.reshape(-1, 1))
@@ -83,37 +106,52 @@ class DataProcessor:
             '重度污染': 4,
             '严重污染': 5
         }
-        if 'Quality' in self.df.columns:
+        if 'Quality' in self.df.columns and self.df['Quality'].dtype != np.float32:
             self.df['Quality'] = self.df['Quality'].map(quality_mapping).astype(np.float32)
+
+        if self.is_scaled:
+            self.scaler_store = ScalerStore.from_scalers(self.scalers, self.numeric_columns + ['Quality'])
+        else:
+            self.scalers = self.scaler_store.column_scalers()
             
         # 检查是否有任何NaN值
         if self.df[self.numeric_columns + ['Quality']].isna().any().any():
             print("Warning: There are still NaN values in the processed data")
             print(self.df[self.numeric_columns + ['Quality']].isna().sum())
     
+    def ensure_scaled(self):
+        """使用加载的归一化参数对整个df归一化, 训练/评估构建全部序列前调用"""
+        if self.is_scaled:
+            return
+        feature_columns = self.scaler_store.feature_order
+        self.df[feature_columns] = self.scaler_store.transform(self.df[feature_columns].values)
+        self.is_scaled = True
+    
     def prepare_sequences(self, sequence_length=72, prediction_length=24):
-        features = []
-        targets = []
+        self.ensure_scaled()
         
-        # 获取所有特征列
+        # 获取所有特征列, 转换为一个连续的float32矩阵
         feature_columns = self.numeric_columns + ['Quality']
+        values = np.ascontiguousarray(self.df[feature_columns].to_numpy(dtype=np.float32))
         
-        # 创建序列
-        for i in range(len(self.df) - sequence_length - prediction_length + 1):
-            feature_seq = self.df[feature_columns].iloc[i:i+sequence_length].values
-            target_seq = self.df[feature_columns].iloc[i+sequence_length:i+sequence_length+prediction_length].values
-            
-            # 检查是否有NaN值
-            if np.isnan(feature_seq).any() or np.isnan(target_seq).any():
-                continue
-                
-            features.append(feature_seq)
-            targets.append(target_seq)
-        
-        if not features or not targets:
+        window_length = sequence_length + prediction_length
+        num_windows = len(values) - window_length + 1
+        if num_windows <= 0:
             raise ValueError("No valid sequences could be created. Check your data for NaN values.")
-            
-        return np.array(features, dtype=np.float32), np.array(targets, dtype=np.float32)
+        
+        # 含NaN行数的前缀和, 窗口 [i, i+window_length) 内NaN行数为 prefix[i+window_length] - prefix[i]
+        nan_prefix = np.concatenate(([0], np.cumsum(np.isnan(values).any(axis=1))))
+        valid_starts = np.flatnonzero(nan_prefix[window_length:] == nan_prefix[:num_windows])
+        if len(valid_starts) == 0:
+            raise ValueError("No valid sequences could be created. Check your data for NaN values.")
+        
+        # 滑动窗口视图 [num_windows, window_length, n_features], 不复制数据
+        windows = np.lib.stride_tricks.sliding_window_view(values, window_length, axis=0).transpose(0, 2, 1)
+        
+        # 只有筛选有效窗口时才复制
+        features = np.ascontiguousarray(windows[valid_starts, :sequence_length])
+        targets = np.ascontiguousarray(windows[valid_starts, sequence_length:])
+        return features, targets
     
     def prepare_data(self, sequence_length=72, prediction_length=24, train_ratio=0.8):
         X, y = self.prepare_sequences(sequence_length, prediction_length)
@@ -137,23 +175,34 @@ class DataProcessor:
     def get_last_sequence(self, sequence_length=72):
         """获取最新的序列数据用于预测"""
         feature_columns = self.numeric_columns + ['Quality']
+        if self.sequence_source is not None:
+            window = self.sequence_source.get_last_window(sequence_length, feature_columns)
+            return self.scaler_store.transform(window)
         last_sequence = self.df[feature_columns].iloc[-sequence_length:].values.astype(np.float32)
+        if not self.is_scaled:
+            # 只对最后一个窗口做归一化
+            last_sequence = self.scaler_store.transform(last_sequence)
         return last_sequence
     
     def get_current_features(self):
         """获取最新的特征值"""
         feature_columns = self.numeric_columns + ['Quality']
-        return self.df[feature_columns].iloc[-1].to_dict()
+        current = self.df[feature_columns].iloc[-1:].values
+        if not self.is_scaled:
+            current = self.scaler_store.transform(current)
+        return dict(zip(feature_columns, current[0].tolist()))
     
     def update_data(self, new_data):
         """更新数据集，添加新的观测值"""
         # 将新数据添加到DataFrame
         new_df = pd.DataFrame([new_data])
         
-        # 对新数据进行归一化
+        # 对新数据进行归一化, df保持原始值时只做类型转换
         for column in self.numeric_columns:
             if column in new_df.columns:
                 new_df[column] = pd.to_numeric(new_df[column], errors='coerce').astype(np.float32)
+                if not self.is_scaled:
+                    continue
                 new_df[column] = self.scalers[column].transform(new_df[column].values.reshape(-1, 1)).astype(np.float32)
         
         # 将Quality转换为数值
@@ -0,0 +1,110 @@
+import numpy as np
+
+from .sequence_source import QUALITY_MAPPING
+
+HOUR_SECONDS = 3600
+
+# Quality数值到文本标签的映射
+QUALITY_LABELS = {v: k for k, v in QUALITY_MAPPING.items()}
+
+
+def origin_count(start_time, end_time, step_hours=1):
+    """[start_time, end_time] 内按 step_hours 间隔的起报时间数量, 不生成列表"""
+    step_seconds = int(step_hours) * HOUR_SECONDS
+    if step_seconds <= 0:
+        raise ValueError(f"step must be positive: {step_hours}")
+    if int(end_time) < int(start_time):
+        return 0
+    return (int(end_time) - int(start_time)) // step_seconds + 1
+
+
+def origin_range(start_time, end_time, step_hours=1):
+    """生成 [start_time, end_time] 内按 step_hours 间隔的起报时间戳(秒)"""
+    origin_count(start_time, end_time, step_hours)
+    return np.arange(int(start_time), int(end_time) + 1, int(step_hours) * HOUR_SECONDS)
+
+
+def build_origin_windows(time_points, values, origins, sequence_length=72):
+    """
+    一次性构建所有起报时间的输入窗口
+    :param time_points: (N,) 升序的整点时间戳
+    :param values: (N, n_features) 已归一化的特征矩阵
+    :param origins: 起报时间戳, 窗口为截至该时刻(含)的最近 sequence_length 条数据
+    :return: (windows, valid_origins), 无数据/历史不足/含NaN的起报时间被跳过
+    """
+    time_points = np.asarray(time_points, dtype=np.int64)
+    values = np.ascontiguousarray(values, dtype=np.float32)
+    origins = np.unique(np.asarray(origins, dtype=np.int64))
+
+    # 起报时间必须正好是一条数据, 且向前至少有 sequence_length 条数据
+    # 与训练和实时预测一致, 窗口按数据条数截取, 不要求时间连续
+    end_idx = np.searchsorted(time_points, origins)
+    found = end_idx < len(time_points)
+    found[found] &= time_points[end_idx[found]] == origins[found]
+    start_idx = end_idx - sequence_length + 1
+    valid = found & (start_idx >= 0)
+    start_safe = np.where(valid, start_idx, 0)
+    end_safe = np.where(valid, end_idx, 0)
+
+    # 窗口内NaN行数用前缀和判断
+    nan_prefix = np.concatenate(([0], np.cumsum(np.isnan(values).any(axis=1))))
+    valid &= nan_prefix[end_safe + 1] == nan_prefix[start_safe]
+
+    if not valid.any():
+        return np.empty((0, sequence_length, values.shape[1]), np.float32), origins[:0]
+
+    windows = np.lib.stride_tricks.sliding_window_view(
+        values, sequence_length, axis=0
+    ).transpose(0, 2, 1)
+    return np.ascontiguousarray(windows[start_idx[valid]]), origins[valid]
+
+
+def predictions_to_frame(predictions, origins, scaler_store, feature_names):
+    """
+    批量反归一化并展开为长表, 每行一个 (起报时间, 预报时效)
+    :param predictions: (n, prediction_length, n_features) 模型输出
+    :param origins: (n,) 起报时间戳
+    :param scaler_store: 训练时保存的归一化参数
+    :param feature_names: 模型输出的特征顺序
+    """
+    num_origins, prediction_length, num_features = predictions.shape
+    values = scaler_store.inverse_transform(predictions).reshape(-1, num_features)
+
+    leads = np.tile(np.arange(1, prediction_length + 1), num_origins)
+    origin_col = np.repeat(np.asarray(origins, dtype=np.int64), prediction_length)
+    # pandas 在使用时才导入, Web 进程启动时不加载
+    import pandas as pd
+
+    df = pd.DataFrame(values, columns=feature_names)
+    df.insert(0, "lead", leads)
+    df.insert(0, "time_point", origin_col + leads * HOUR_SECONDS)
+    df.insert(0, "origin", origin_col)
+
+    # 与单次预测一致: hap取整, Quality取最接近的整数并转换为文本标签
+    if "hap" in df.columns:
+        df["hap"] = np.round(df["hap"]).astype(int)
+    if "Quality" in df.columns:
+        df["Quality"] = np.round(df["Quality"]).astype(int).map(QUALITY_LABELS)
+    return df
+
+
+def hindcast(
+    forecaster,
+    time_points,
+    values,
+    origins,
+    scaler_store,
+    sequence_length=72,
+    batch_size=512,
+):
+    """
+    从多个历史起报时间批量生成预测, 返回长表
+    :param forecaster: 推理后端(TorchForecaster / OnnxForecaster)
+    """
+    windows, valid_origins = build_origin_windows(
+        time_points, values, origins, sequence_length
+    )
+    predictions = forecaster.predict(windows, batch_size)
+    return predictions_to_frame(
+        predictions, valid_origins, scaler_store, scaler_store.feature_order
+    )
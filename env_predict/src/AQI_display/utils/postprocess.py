@@ -0,0 +1,135 @@
+from datetime import timedelta
+
+import numpy as np
+
+# 反归一化时的特征顺序, 与模型输出维度一一对应
+FEATURE_NAMES = ["AQI", "PM2_5", "PM10", "SO2", "NO2", "CO", "O3", "hap", "Quality"]
+
+# 输出不确定性区间的特征: AQI和各污染物
+UNCERTAINTY_FEATURES = FEATURE_NAMES[:7]
+
+# Quality数值到文本标签的映射
+QUALITY_LABELS = {
+    0: "优",
+    1: "良",
+    2: "轻度污染",
+    3: "中度污染",
+    4: "重度污染",
+    5: "严重污染",
+}
+
+
+# AQI分级上限(含), 超过最后一级为严重污染
+AQI_LEVEL_BOUNDS = [50, 100, 150, 200, 300]
+
+# 各AQI分级对应的活动建议
+MEASURES = [
+    "各类人群可正常活动",
+    "极少数异常敏感人群应减少户外活动",
+    "儿童、老年人及心脏病、呼吸系统疾病患者应减少长时间、高强度的户外锻炼",
+    "儿童、老年人及心脏病、呼吸系统疾病患者应避免长时间、高强度的户外锻炼，一般人群适量减少户外运动",
+    "儿童、老年人及心脏病、呼吸系统疾病患者应停留在室内，停止户外运动，一般人群减少户外运动",
+    "儿童、老年人和病人应当留在室内，避免体力消耗，一般人群应避免户外活动",
+]
+
+# 各AQI分级对应的空气质量状况描述
+UNHEALTHFUL = [
+    "空气质量令人满意，基本无空气污染",
+    "空气质量可以接受，但某些污染物可能对极少数异常敏感人群健康有较弱影响",
+    "易感人群症状有轻度加剧，健康人群出现刺激症状",
+    "进一步加剧易感人群症状，可能对健康人群心脏、呼吸系统有影响",
+    "心脏病和肺病患者症状显著加剧，运动耐受力降低，健康人群普遍出现症状",
+    "健康人群运动耐受力降低，有明显强烈症状，提前出现某些疾病",
+]
+
+
+def aqi_level(aqi):
+    """AQI分级下标, 支持标量和数组"""
+    return np.searchsorted(AQI_LEVEL_BOUNDS, aqi, side="left")
+
+
+def calculate_measure(row):
+    # 根据AQI值计算measure（活动建议）
+    return MEASURES[aqi_level(row["AQI"])]
+
+
+def calculate_unhealthful(row):
+    # 根据AQI值计算unhealthful（空气质量状况描述）
+    return UNHEALTHFUL[aqi_level(row["AQI"])]
+
+
+def frame_predictions(values, current_time):
+    """
+    将反归一化后的预测整理为带时间索引的DataFrame
+    :param values: (prediction_length, n_features), 或多个序列
+        (n_series, prediction_length, n_features), 多个序列时按序列依次拼接
+    :param current_time: 预测起点
+    """
+    # pandas 在使用时才导入, Web 进程启动时不加载
+    import pandas as pd
+
+    values = np.asarray(values)
+    if values.ndim == 2:
+        values = values[None]
+    num_series, prediction_length, num_features = values.shape
+
+    # 创建时间索引（从当前时间开始）
+    time_index = [
+        current_time + timedelta(hours=i) for i in range(1, prediction_length + 1)
+    ] * num_series
+
+    df_predictions = pd.DataFrame(
+        values.reshape(-1, num_features), columns=FEATURE_NAMES, index=time_index
+    )
+    # 对hap进行四舍五入处理为整数
+    df_predictions["hap"] = np.round(df_predictions["hap"].values).astype(int)
+
+    # Quality预测（取最接近的整数作为分类）, 转换回文本标签
+    df_predictions["Quality"] = (
+        pd.Series(np.round(df_predictions["Quality"].values).astype(int))
+        .map(QUALITY_LABELS)
+        .values
+    )
+
+    # 添加measure和unhealthful列, 按AQI分级向量化查表
+    levels = aqi_level(df_predictions["AQI"].values)
+    df_predictions["measure"] = np.asarray(MEASURES, dtype=object)[levels]
+    df_predictions["unhealthful"] = np.asarray(UNHEALTHFUL, dtype=object)[levels]
+    return df_predictions
+
+
+def format_predictions(predictions, scalers, current_time):
+    """
+    将模型输出反归一化并整理为带时间索引的DataFrame
+    :param predictions: (prediction_length, n_features) 模型输出
+    :param scalers: 特征名到归一化器的映射, 如 DataProcessor.scalers
+    :param current_time: 预测起点
+    """
+    values = np.array(predictions, dtype=np.float32)
+    for i, feature in enumerate(FEATURE_NAMES[:-1]):  # 除了Quality
+        if feature in scalers:
+            values[:, i] = (
+                scalers[feature]
+                .inverse_transform(predictions[:, i].reshape(-1, 1))
+                .flatten()
+            )
+    return frame_predictions(values, current_time)
+
+
+def frame_quantiles(values, current_time, quantiles):
+    """
+    将反归一化后的分位数预测整理为带时间索引的DataFrame
+    :param values: (len(quantiles), prediction_length, n_features)
+    :return: 每个特征每个分位数一列, 如 AQI_p10, AQI_p50, AQI_p90
+    """
+    import pandas as pd
+
+    prediction_length = values.shape[1]
+    time_index = [
+        current_time + timedelta(hours=i) for i in range(1, prediction_length + 1)
+    ]
+    columns = {}
+    for i, feature in enumerate(UNCERTAINTY_FEATURES):
+        for j, q in enumerate(quantiles):
+            columns[f"{feature}_p{round(q * 100)}"] = values[j, :, i]
+    return pd.DataFrame(columns, index=time_index)
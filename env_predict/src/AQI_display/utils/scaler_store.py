@@ -0,0 +1,145 @@
+import json
+import os
+
+import numpy as np
+
+
+class ColumnScaler:
+    """单个特征的MinMax归一化, 接口与 sklearn MinMaxScaler 的 transform 一致"""
+
+    def __init__(self, data_min, data_max):
+        self.data_min = float(data_min)
+        self.data_max = float(data_max)
+        data_range = self.data_max - self.data_min
+        # 与 sklearn 一致: 取值范围为0时缩放系数取1
+        self.scale = 1.0 / data_range if data_range != 0 else 1.0
+
+    def transform(self, data):
+        return ((np.asarray(data) - self.data_min) * self.scale).astype(np.float32)
+
+    def inverse_transform(self, data):
+        return (np.asarray(data) / self.scale + self.data_min).astype(np.float32)
+
+
+class ScalerStore:
+    """训练时拟合的归一化参数: 特征顺序以及每个特征的 min/max
+
+    与 best_model.pth 一起保存, 预测时直接加载, 不再按历史数据重新拟合
+    """
+
+    def __init__(self, feature_order, data_min, data_max):
+        # feature_order: 模型输入的全部特征顺序
+        # data_min/data_max: 需要归一化的特征 -> 训练集上的最小/最大值
+        self.feature_order = list(feature_order)
+        self.data_min = {k: float(v) for k, v in data_min.items()}
+        self.data_max = {k: float(v) for k, v in data_max.items()}
+
+        # 按特征顺序展开为向量, 未归一化的特征(如Quality)保持原值
+        offset = np.zeros(len(self.feature_order), dtype=np.float32)
+        scale = np.ones(len(self.feature_order), dtype=np.float32)
+        for i, feature in enumerate(self.feature_order):
+            if feature in self.data_min:
+                column_scaler = self.column_scaler(feature)
+                offset[i] = column_scaler.data_min
+                scale[i] = column_scaler.scale
+        self.offset = offset
+        self.scale = scale
+
+    @classmethod
+    def from_scalers(cls, scalers, feature_order):
+        """由已拟合的 sklearn MinMaxScaler 字典构建"""
+        data_min = {k: s.data_min_[0] for k, s in scalers.items()}
+        data_max = {k: s.data_max_[0] for k, s in scalers.items()}
+        return cls(feature_order, data_min, data_max)
+
+    @classmethod
+    def from_dict(cls, store_dict):
+        return cls(
+            store_dict["feature_order"], store_dict["data_min"], store_dict["data_max"]
+        )
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+    def to_dict(self):
+        return {
+            "feature_order": self.feature_order,
+            "data_min": self.data_min,
+            "data_max": self.data_max,
+        }
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=4)
+
+    def column_scaler(self, feature):
+        return ColumnScaler(self.data_min[feature], self.data_max[feature])
+
+    def column_scalers(self):
+        """按特征返回单列归一化器, 与 DataProcessor.scalers 的用法兼容"""
+        return {feature: self.column_scaler(feature) for feature in self.data_min}
+
+    def transform(self, values):
+        """对 (..., n_features) 的原始值按特征顺序归一化"""
+        return (
+            (np.asarray(values, dtype=np.float32) - self.offset) * self.scale
+        ).astype(np.float32)
+
+    def inverse_transform(self, values):
+        """对 (..., n_features) 的归一化值按特征顺序反归一化"""
+        return (np.asarray(values, dtype=np.float32) / self.scale + self.offset).astype(
+            np.float32
+        )
+
+
+class StackedScalerStore:
+    """多个序列(如多个城市)各自的归一化参数, 按序列堆叠为 (n_series, n_features)
+
+    特征顺序必须一致, transform/inverse_transform 对 (n_series, ..., n_features)
+    一次性广播计算
+    """
+
+    def __init__(self, stores):
+        stores = list(stores)
+        if not stores:
+            raise ValueError("StackedScalerStore needs at least one ScalerStore")
+        self.feature_order = stores[0].feature_order
+        for store in stores[1:]:
+            if store.feature_order != self.feature_order:
+                raise ValueError(
+                    f"Feature order mismatch: {store.feature_order} "
+                    f"!= {self.feature_order}"
+                )
+        self.stores = stores
+        self.offset = np.stack([store.offset for store in stores])
+        self.scale = np.stack([store.scale for store in stores])
+
+    def _broadcast(self, vector, ndim):
+        """(n_series, n_features) 扩展为 (n_series, 1, ..., 1, n_features)"""
+        return vector.reshape(
+            (len(self.stores),) + (1,) * (ndim - 2) + (len(self.feature_order),)
+        )
+
+    def transform(self, values):
+        """对 (n_series, ..., n_features) 的原始值按各序列参数归一化"""
+        values = np.asarray(values, dtype=np.float32)
+        offset = self._broadcast(self.offset, values.ndim)
+        scale = self._broadcast(self.scale, values.ndim)
+        return ((values - offset) * scale).astype(np.float32)
+
+    def inverse_transform(self, values):
+        """对 (n_series, ..., n_features) 的归一化值按各序列参数反归一化"""
+        values = np.asarray(values, dtype=np.float32)
+        offset = self._broadcast(self.offset, values.ndim)
+        scale = self._broadcast(self.scale, values.ndim)
+        return (values / scale + offset).astype(np.float32)
+
+
+def load_scaler_store(scaler_path):
+    """加载训练时保存的归一化参数, 文件不存在时返回None(退回按历史数据拟合)"""
+    if not os.path.exists(scaler_path):
+        print(f"Scaler store not found: {scaler_path}, refitting on history")
+        return None
+    return ScalerStore.load(scaler_path)
@@ -0,0 +1,212 @@
+import bisect
+import json
+
+import numpy as np
+
+# Quality文本标签到数值的映射, 与 DataProcessor 保持一致
+QUALITY_MAPPING = {
+    "优": 0,
+    "良": 1,
+    "轻度污染": 2,
+    "中度污染": 3,
+    "重度污染": 4,
+    "严重污染": 5,
+}
+
+
+def records_to_window(records, feature_order):
+    """将原始记录转换为 (len(records), n_features) 的float32原始值矩阵(未归一化)"""
+    # pandas 在使用时才导入, Web 进程启动时不加载
+    import pandas as pd
+
+    df = pd.DataFrame(list(records), columns=feature_order)
+    for column in feature_order:
+        if column == "Quality":
+            df[column] = df[column].map(QUALITY_MAPPING)
+        else:
+            df[column] = pd.to_numeric(df[column], errors="coerce")
+    # 与 DataProcessor 一致, 缺失值先前向再后向填充
+    return np.ascontiguousarray(df.ffill().bfill().values, dtype=np.float32)
+
+
+def records_to_series(records, feature_order):
+    """将原始记录转换为按时间升序的 (time_points, values)"""
+    records = sorted(records, key=lambda item: item["time_point"])
+    time_points = np.array([item["time_point"] for item in records], dtype=np.int64)
+    return time_points, records_to_window(records, feature_order)
+
+
+class SequenceSource:
+    """预测输入窗口的数据源, 只返回最近 sequence_length 小时的原始值"""
+
+    def get_last_window(self, sequence_length, feature_order):
+        """
+        获取最近的输入窗口
+        :param sequence_length: 窗口长度(小时)
+        :param feature_order: 特征顺序
+        :return: (sequence_length, n_features) 的float32数组, 按时间升序
+        """
+        raise NotImplementedError
+
+    def get_range(self, start_time, end_time, feature_order, lookback=0):
+        """
+        获取 [start_time, end_time] 内的全部数据, 用于批量回算
+        :param lookback: 额外返回 start_time 之前的条数, 供第一个窗口使用
+        :return: (time_points, values), 按时间升序, values为float32原始值
+        """
+        raise NotImplementedError
+
+
+def fill_window(values):
+    """与 records_to_window 一致, 缺失值先前向再后向填充"""
+    import pandas as pd
+
+    return np.ascontiguousarray(
+        pd.DataFrame(values).ffill().bfill().values, dtype=np.float32
+    )
+
+
+class ColumnSequenceSource(SequenceSource):
+    """
+    基于 data2columns 导出的列式存储的数据源, 各列按 mmap 映射,
+    只读取窗口或时间范围内的行, 不解析全部历史数据
+    """
+
+    def __init__(self, store_path):
+        self.store_path = store_path
+
+    def _store(self):
+        # 列式存储在此处才导入, 避免与 column_store 循环导入;
+        # 每次重新读取 meta.json, 增量追加的新数据立即可见
+        from .column_store import ColumnStore
+
+        return ColumnStore(self.store_path)
+
+    def _values(self, store, start, end, feature_order):
+        return fill_window(
+            np.stack(
+                [store.column(feature)[start:end] for feature in feature_order], axis=1
+            )
+        )
+
+    def get_last_window(self, sequence_length, feature_order):
+        store = self._store()
+        if len(store) < sequence_length:
+            raise ValueError(
+                f"Not enough data for prediction: {len(store)} < {sequence_length}"
+            )
+        return self._values(
+            store, len(store) - sequence_length, len(store), feature_order
+        )
+
+    def get_range(self, start_time, end_time, feature_order, lookback=0):
+        store = self._store()
+        time_points = store.time_points()
+        start_idx = max(
+            int(np.searchsorted(time_points, start_time, side="left")) - lookback, 0
+        )
+        end_idx = int(np.searchsorted(time_points, end_time, side="right"))
+        return (
+            np.array(time_points[start_idx:end_idx], dtype=np.int64),
+            self._values(store, start_idx, end_idx, feature_order),
+        )
+
+
+class FileSequenceSource(SequenceSource):
+    """
+    基于导出文件的数据源, 用于离线预测
+    xxx.json 旁有同名列式存储 xxx/ 时读取列式存储(由 data2columns 增量更新), 否则解析JSON文件
+    """
+
+    def __init__(self, data_path):
+        self.data_path = data_path
+
+    def _column_source(self):
+        from .column_store import resolve_data_path
+
+        store_path = resolve_data_path(self.data_path)
+        if store_path == self.data_path:
+            return None
+        return ColumnSequenceSource(store_path)
+
+    def get_last_window(self, sequence_length, feature_order):
+        column_source = self._column_source()
+        if column_source is not None:
+            return column_source.get_last_window(sequence_length, feature_order)
+        with open(self.data_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return records_to_window(data[-sequence_length:], feature_order)
+
+    def get_range(self, start_time, end_time, feature_order, lookback=0):
+        column_source = self._column_source()
+        if column_source is not None:
+            return column_source.get_range(
+                start_time, end_time, feature_order, lookback
+            )
+        with open(self.data_path, "r", encoding="utf-8") as f:
+            data = sorted(json.load(f), key=lambda item: item["time_point"])
+        time_points = [item["time_point"] for item in data]
+        start_idx = max(bisect.bisect_left(time_points, start_time) - lookback, 0)
+        end_idx = bisect.bisect_right(time_points, end_time)
+        return records_to_series(data[start_idx:end_idx], feature_order)
+
+
+class MongoSequenceSource(SequenceSource):
+    """直接从 MongoDB 读取最近窗口: 投影 + 按 time_point 倒序 + limit"""
+
+    def __init__(self, coll_conn, filter_dict=None):
+        self.coll_conn = coll_conn
+        self.filter_dict = filter_dict or {}
+        self._index_ready = False
+
+    def _ensure_index(self):
+        """保证 (过滤字段, time_point) 上有索引, 排序+limit 的开销与历史数据量无关"""
+        if self._index_ready:
+            return
+        try:
+            # 多个城市共用一个集合时按 citycode 等过滤字段在前建立复合索引
+            keys = [(key, 1) for key in self.filter_dict] + [("time_point", -1)]
+            self.coll_conn.create_index(keys)
+            self._index_ready = True
+        except Exception as e:
+            print(f"Error creating time_point index: {str(e)}")
+
+    def _projection(self, feature_order):
+        return {"_id": 0, "time_point": 1, **{k: 1 for k in feature_order}}
+
+    def get_last_window(self, sequence_length, feature_order):
+        self._ensure_index()
+        projection = self._projection(feature_order)
+        cursor = (
+            self.coll_conn.find(self.filter_dict, projection)
+            .sort("time_point", -1)
+            .limit(sequence_length)
+        )
+        records = list(cursor)
+        if len(records) < sequence_length:
+            raise ValueError(
+                f"Not enough data for prediction: {len(records)} < {sequence_length}"
+            )
+        # 查询结果为倒序, 翻转为时间升序
+        return records_to_window(records[::-1], feature_order)
+
+    def get_range(self, start_time, end_time, feature_order, lookback=0):
+        self._ensure_index()
+        projection = self._projection(feature_order)
+        filter_dict = {
+            **self.filter_dict,
+            "time_point": {"$gte": int(start_time), "$lte": int(end_time)},
+        }
+        records = list(self.coll_conn.find(filter_dict, projection))
+        if lookback:
+            lookback_filter = {
+                **self.filter_dict,
+                "time_point": {"$lt": int(start_time)},
+            }
+            cursor = (
+                self.coll_conn.find(lookback_filter, projection)
+                .sort("time_point", -1)
+                .limit(lookback)
+            )
+            records.extend(cursor)
+        return records_to_series(records, feature_order)
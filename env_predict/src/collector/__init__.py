@@ -8,6 +8,7 @@ from .env_huizhou_bak import (
     GetHuiZhouAQISpider,
     GetHuiZhouHAPSpider,
     env_data2mongodb,
+    get_latest_time_point_from_db,
     get_recent_data_from_db,
     merge_data,
 )
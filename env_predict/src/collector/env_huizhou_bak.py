@@ -17,16 +17,19 @@ from src.config import LOGGER, Config
 from src.databases import (
     MongodbBase,
     MongodbManager,
+    mongodb_find,
     mongodb_find_by_page,
     mongodb_insert_many_data,
 )
+from src.utils.forecast_cache import FORECAST_CACHE
 
 
 class GetHuiZhouAQISpider:
     """获取惠州的空气质量数据"""
 
-    def __init__(self):
+    def __init__(self, citycode: str = "441300"):
         self.session = requests.Session()
+        self.citycode = citycode
 
     def fetch_data(self):
         """获取数据"""
@@ -35,7 +38,10 @@ class GetHuiZhouAQISpider:
             "Accept": "application/json, text/plain, */*",
         }
 
-        url = "https://air.cnemc.cn:18007/HourChangesPublish/GetCityRealTimeAqiHistoryByCondition?citycode=441300"
+        url = (
+            "https://air.cnemc.cn:18007/HourChangesPublish/"
+            f"GetCityRealTimeAqiHistoryByCondition?citycode={self.citycode}"
+        )
 
         data_list = []  # 提前定义，防止后面 return 报错
         try:
@@ -174,6 +180,10 @@ def env_data2mongodb(data):
 
         insert_res = mongodb_insert_many_data(coll_conn=coll, data=data)
 
+        # 有新数据写入, 预测缓存失效
+        if data:
+            FORECAST_CACHE.invalidate()
+
         if insert_res:
             LOGGER.info("页面持久化成功")
         else:
@@ -202,6 +212,23 @@ def get_recent_data_from_db():
     )
 
 
+def get_latest_time_point_from_db():
+    """从数据库获取最新一条数据的 time_point, 查询失败返回 None"""
+    mongodb_base: MongodbBase = MongodbManager.get_mongodb_base(
+        mongodb_config=Config.MONGODB_CONFIG
+    )
+    latest_res = mongodb_find(
+        coll_conn=mongodb_base.get_collection(collection="d_aqi_huizhou"),
+        filter_dict={},
+        return_dict={"_id": 0, "time_point": 1},
+        sorted_list=[("time_point", -1)],
+        limit=1,
+    )
+    if not latest_res["status"] or not latest_res["info"]:
+        return None
+    return latest_res["info"][0].get("time_point")
+
+
 def run_spider():
     """运行两个爬虫并合并数据"""
     # 实例化两个爬虫
@@ -106,6 +106,18 @@ class UniResponse:
         ResponseField.INFO: ResponseReply.SUCCESS,
         ResponseField.STATUS: ResponseCode.SUCCESS,
     }
+    # 请求限流
+    LIMITED_FLOW = {
+        ResponseField.DATA: {},
+        ResponseField.INFO: ResponseReply.LIMITED_FLOW,
+        ResponseField.STATUS: ResponseCode.LIMITED_FLOW,
+    }
+    # 请求超时
+    OVERTIME = {
+        ResponseField.DATA: {},
+        ResponseField.INFO: ResponseReply.OVERTIME,
+        ResponseField.STATUS: ResponseCode.OVERTIME,
+    }
     # 未验证
     NOT_AUTHORIZED = {
         ResponseField.DATA: {},
@@ -32,6 +32,62 @@ class Config:
         "operate_db": os.getenv("MONGODB_DB", "env_city_test"),
     }
 
+    # 预测模型配置
+    AQI_DIR = os.path.join(BASE_DIR, "AQI_display")
+    MODEL_PATH = os.getenv("MODEL_PATH", os.path.join(AQI_DIR, "best_model.pth"))
+    SCALER_PATH = os.getenv("SCALER_PATH", os.path.join(AQI_DIR, "scalers.json"))
+    # 预测输入来源: mongodb 直接读取最近72小时, file 读取导出文件(同名列式存储优先)
+    PREDICT_SOURCE = os.getenv("PREDICT_SOURCE", "mongodb")
+    PREDICT_DATA_PATH = os.getenv(
+        "PREDICT_DATA_PATH", os.path.join(AQI_DIR, "data", "d_aqi_huizhou.json")
+    )
+    # 训练数据的列式存储目录(每列一个float32文件), 由 data2columns 导出,
+    # 与 d_aqi_huizhou.json 同名时 DataProcessor 和 file 输入来源优先读取
+    COLUMN_STORE_PATH = os.getenv(
+        "COLUMN_STORE_PATH", os.path.join(AQI_DIR, "data", "d_aqi_huizhou")
+    )
+    # 推理后端: torch, int8(GRU/Linear动态量化, 仅CPU)
+    # 或 onnx(需先执行 main.py --mode export, 不导入torch)
+    PREDICT_BACKEND = os.getenv("PREDICT_BACKEND", "torch")
+    ONNX_MODEL_PATH = os.getenv(
+        "ONNX_MODEL_PATH", os.path.join(AQI_DIR, "best_model.onnx")
+    )
+    # 多城市预测: 城市代码:数据集合, 逗号分隔, 如 441300:d_aqi_huizhou,440100:d_aqi_guangzhou
+    # file 输入来源时读取 AQI_display/data/{数据集合}.json
+    PREDICT_CITIES = dict(
+        item.split(":", 1)
+        for item in os.getenv("PREDICT_CITIES", "441300:d_aqi_huizhou").split(",")
+        if item
+    )
+    # 推理线程池: 推理线程数, 除执行中任务外最多排队的请求数, 接口等待推理的超时(秒)
+    INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", 1))
+    INFERENCE_MAX_QUEUE = int(os.getenv("INFERENCE_MAX_QUEUE", 8))
+    INFERENCE_TIMEOUT = float(os.getenv("INFERENCE_TIMEOUT", 60))
+    # 推理的算子内/算子间线程数(torch, onnx 后端只使用算子内线程数)
+    # 默认按推理线程数平分CPU核数, 避免多个推理线程和定时任务超额占用CPU
+    INFERENCE_INTRA_OP_THREADS = int(
+        os.getenv(
+            "INFERENCE_INTRA_OP_THREADS",
+            max((os.cpu_count() or 1) // INFERENCE_WORKERS, 1),
+        )
+    )
+    INFERENCE_INTER_OP_THREADS = int(os.getenv("INFERENCE_INTER_OP_THREADS", 1))
+    # 模型预热方式: background 启动后在推理线程中导入推理依赖并预热,
+    # eager 在 create_app 中同步预热, off 在第一次预测请求时才加载
+    PREDICT_WARM_UP = os.getenv("PREDICT_WARM_UP", "background")
+    # 单次回算最多的起报时间数量(默认约一个月逐小时)
+    HINDCAST_MAX_ORIGINS = int(os.getenv("HINDCAST_MAX_ORIGINS", 24 * 31))
+    # /predict 返回的预测起报时间早于该小时数时记录警告(采集可能已停止)
+    FORECAST_MAX_AGE = float(os.getenv("FORECAST_MAX_AGE", 24))
+    # /predict 不确定性区间(MC dropout)单次最多的随机样本数
+    UNCERTAINTY_MAX_SAMPLES = int(os.getenv("UNCERTAINTY_MAX_SAMPLES", 200))
+    # 采集后微调: 为1时定时任务采集成功后在子进程中执行 main.py --mode finetune,
+    # 验证误差不回退才替换 MODEL_PATH, 由模型注册表热加载
+    # 子进程的 torch 线程数和超时(秒), 避免与推理线程争用CPU
+    FINETUNE_AFTER_COLLECT = int(os.getenv("FINETUNE_AFTER_COLLECT", 0))
+    FINETUNE_THREADS = int(os.getenv("FINETUNE_THREADS", 1))
+    FINETUNE_TIMEOUT = float(os.getenv("FINETUNE_TIMEOUT", 1800))
+
     # 日志配置
     TAG = {
         "info": f"{PROJECT_NAME.replace('_','-')}-info",
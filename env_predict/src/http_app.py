@@ -6,7 +6,9 @@ Changelog: all notable changes to this file will be documented
 """
 
 import asyncio
+import os
 import threading
+import time
 
 import requests
 
@@ -14,10 +16,32 @@ from flask import Flask
 from flask_cors import CORS
 
 from config import LOGGER, Config
+from src.AQI_display.model_registry import ModelRegistry
+from src.AQI_display.multi_city import MultiCityPredictor
+from src.AQI_display.utils.sequence_source import (
+    FileSequenceSource,
+    MongoSequenceSource,
+)
+from src.utils.forecast_store import FORECAST_COLLECTION, ForecastStore
+from src.utils.inference_executor import InferenceExecutor, configure_torch_threads
 from tasks.env_huizhou_task_bak import run_scheduler
 from views.bp_api import bp_api
 
 
+def warm_up_inference(model_registry: ModelRegistry):
+    """
+    导入推理依赖并加载、预热常驻模型, 在推理线程中执行, 不阻塞 Web 进程启动
+    Args:
+        model_registry(ModelRegistry):常驻预测模型
+    """
+    start = time.perf_counter()
+    # 预测结果整理使用 pandas, 预先导入避免第一次预测请求承担导入耗时
+    import pandas  # noqa: F401
+
+    model_registry.warm_up()
+    LOGGER.info(f"推理预热完成, 耗时 {time.perf_counter() - start:.2f}s")
+
+
 def create_app():
     """
     建立web应用
@@ -47,6 +71,68 @@ def create_app():
         flask_app.config["req_session"] = req_session
         flask_app.config["app_logger"] = LOGGER
 
+        # 推理线程池, 推理线程启动时(第一次前向传播之前)设置 torch 线程数
+        initializer, initargs = None, ()
+        if Config.PREDICT_BACKEND != "onnx":
+            initializer = configure_torch_threads
+            initargs = (
+                Config.INFERENCE_INTRA_OP_THREADS,
+                Config.INFERENCE_INTER_OP_THREADS,
+            )
+        inference_executor = InferenceExecutor(
+            max_workers=Config.INFERENCE_WORKERS,
+            max_queue=Config.INFERENCE_MAX_QUEUE,
+            initializer=initializer,
+            initargs=initargs,
+        )
+        flask_app.config["inference_executor"] = inference_executor
+
+        # 常驻预测模型, 按 PREDICT_WARM_UP 加载并预热, 未预热时第一次预测请求加载
+        sequence_source = None
+        if Config.PREDICT_SOURCE == "mongodb":
+            sequence_source = MongoSequenceSource(
+                coll_conn=mongodb_base.get_collection(collection="d_aqi_huizhou")
+            )
+        model_registry = ModelRegistry(
+            model_path=Config.MODEL_PATH,
+            data_path=Config.PREDICT_DATA_PATH,
+            scaler_path=Config.SCALER_PATH,
+            sequence_source=sequence_source,
+            backend=Config.PREDICT_BACKEND,
+            onnx_path=Config.ONNX_MODEL_PATH,
+            num_threads=Config.INFERENCE_INTRA_OP_THREADS,
+        )
+        if Config.PREDICT_WARM_UP == "eager":
+            inference_executor.run(
+                warm_up_inference, model_registry, enforce_limit=False
+            )
+        elif Config.PREDICT_WARM_UP == "background":
+            inference_executor.submit(
+                warm_up_inference, model_registry, enforce_limit=False
+            )
+        flask_app.config["model_registry"] = model_registry
+
+        # 多城市批量预测, 每个城市一个数据集合, 共用常驻模型
+        city_sources = {}
+        for citycode, collection in Config.PREDICT_CITIES.items():
+            if Config.PREDICT_SOURCE == "mongodb":
+                city_sources[citycode] = MongoSequenceSource(
+                    coll_conn=mongodb_base.get_collection(collection=collection)
+                )
+            else:
+                city_sources[citycode] = FileSequenceSource(
+                    os.path.join(Config.AQI_DIR, "data", f"{collection}.json")
+                )
+        flask_app.config["multi_city_predictor"] = MultiCityPredictor(
+            model_registry=model_registry, city_sources=city_sources
+        )
+
+        # 预计算的预测结果
+        forecast_store = ForecastStore(
+            coll_conn=mongodb_base.get_collection(collection=FORECAST_COLLECTION)
+        )
+        flask_app.config["forecast_store"] = forecast_store
+
         # 打印启动日志
         api_version = Config.get_version()
         LOGGER.info(
@@ -57,7 +143,9 @@ def create_app():
         def run_spider_task():
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
-            loop.run_until_complete(run_scheduler())
+            loop.run_until_complete(
+                run_scheduler(model_registry, forecast_store, inference_executor)
+            )
 
         # 在新线程中启动定时任务
         spider_thread = threading.Thread(target=run_spider_task)
@@ -6,6 +6,7 @@ Description: 惠州空气质量数据异步采集定时任务
 import asyncio
 import json
 import re
+import sys
 
 from datetime import datetime
 
@@ -16,13 +17,17 @@ from lxml import html
 
 from src.config import LOGGER, Config
 from src.databases import MongodbManager, mongodb_find_by_page, mongodb_insert_many_data
+from src.utils.data_export import data2columns
+from src.utils.forecast_cache import FORECAST_CACHE
+from src.utils.forecast_store import precompute_forecast
 
 
 class AsyncGetHuiZhouAQISpider:
     """异步获取惠州的空气质量数据"""
 
-    def __init__(self):
+    def __init__(self, citycode: str = "441300"):
         self.session = ClientSession()
+        self.citycode = citycode
 
     async def fetch_data(self):
         """异步获取数据"""
@@ -31,7 +36,10 @@ class AsyncGetHuiZhouAQISpider:
             "Accept": "application/json, text/plain, */*",
         }
 
-        url = "https://air.cnemc.cn:18007/HourChangesPublish/GetCityRealTimeAqiHistoryByCondition?citycode=441300"
+        url = (
+            "https://air.cnemc.cn:18007/HourChangesPublish/"
+            f"GetCityRealTimeAqiHistoryByCondition?citycode={self.citycode}"
+        )
 
         try:
             async with self.session.post(url, headers=headers, timeout=10) as resp:
@@ -166,9 +174,14 @@ async def env_data2mongodb(data):
         mongodb_base = MongodbManager.get_mongodb_base(
             mongodb_config=Config.MONGODB_CONFIG
         )
-        coll = mongodb_base.get_collection(collection="d_env_huizhou")
+        # 与爬虫接口写入同一集合, 预计算、列式存储导出和各接口都读取该集合
+        coll = mongodb_base.get_collection(collection="d_aqi_huizhou")
         insert_res = mongodb_insert_many_data(coll_conn=coll, data=data)
 
+        # 与爬虫接口一致, 有新数据写入时预测缓存失效
+        if data:
+            FORECAST_CACHE.invalidate()
+
         if insert_res:
             LOGGER.info("数据持久化成功")
         else:
@@ -181,7 +194,7 @@ async def get_recent_data_from_db():
     """从数据库获取最近23小时的数据"""
     mongodb_base = MongodbManager.get_mongodb_base(mongodb_config=Config.MONGODB_CONFIG)
     recent_data_res = mongodb_find_by_page(
-        coll_conn=mongodb_base.get_collection(collection="d_env_huizhou"),
+        coll_conn=mongodb_base.get_collection(collection="d_aqi_huizhou"),
         filter_dict={},
         page=1,
         size=23,
@@ -196,7 +209,7 @@ async def get_recent_data_from_db():
 
 
 async def collect_air_quality_data():
-    """异步采集空气质量数据"""
+    """异步采集空气质量数据, 成功返回True"""
     try:
         LOGGER.info(f"开始执行空气质量数据采集任务 - {datetime.now()}")
 
@@ -229,19 +242,136 @@ async def collect_air_quality_data():
         # 关闭会话
         await aqi_spider.close()
         await hap_spider.close()
+        return True
 
     except Exception as e:
         LOGGER.error(f"任务执行出错: {e}")
+        return False
+
+
+async def run_finetune() -> dict:
+    """
+    在子进程中执行 main.py --mode finetune, 训练不占用 Web 进程的推理线程和GIL
+    Returns:
+        dict:微调结果(status 为 promoted/rejected/skipped), 失败或超时返回空字典
+    """
+    process = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "main.py",
+        "--mode",
+        "finetune",
+        "--model-path",
+        Config.MODEL_PATH,
+        # 直接读取刚导出的列式存储, 与采集写入的集合一致
+        "--data-path",
+        Config.COLUMN_STORE_PATH,
+        "--threads",
+        str(Config.FINETUNE_THREADS),
+        cwd=Config.AQI_DIR,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
+    )
+    try:
+        output, _ = await asyncio.wait_for(
+            process.communicate(), timeout=Config.FINETUNE_TIMEOUT
+        )
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        LOGGER.error(f"模型微调超时({Config.FINETUNE_TIMEOUT}s), 已终止")
+        return {}
+
+    lines = output.decode("utf-8", errors="replace").strip().splitlines()
+    if process.returncode != 0 or not lines:
+        LOGGER.error(f"模型微调失败: {' | '.join(lines[-5:])}")
+        return {}
+    # 最后一行为JSON结果
+    try:
+        return json.loads(lines[-1])
+    except json.JSONDecodeError:
+        LOGGER.error(f"无法解析模型微调结果: {lines[-1]}")
+        return {}
+
+
+async def precompute(model_registry, forecast_store, inference_executor=None):
+    """预计算最新一期预测, 前向传播放到推理线程池中执行, 不阻塞事件循环"""
+    try:
+        if inference_executor is not None:
+            # 与接口共用推理线程, 不受排队上限限制
+            await asyncio.wrap_future(
+                inference_executor.submit(
+                    precompute_forecast,
+                    model_registry,
+                    forecast_store,
+                    enforce_limit=False,
+                )
+            )
+        else:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(
+                None, precompute_forecast, model_registry, forecast_store
+            )
+    except Exception as e:
+        LOGGER.error(f"预测预计算失败: {e}")
+
+
+async def finetune_and_precompute(
+    model_registry=None, forecast_store=None, inference_executor=None
+):
+    """新数据导出到列式存储后微调模型, 新模型通过验证并替换后重新预计算预测"""
+    loop = asyncio.get_running_loop()
+    try:
+        exported_rows = await loop.run_in_executor(None, data2columns)
+        LOGGER.info(f"{exported_rows} 条数据已导出到列式存储")
+    except Exception as e:
+        LOGGER.error(f"导出列式存储失败, 跳过模型微调: {e}")
+        return
+
+    result = await run_finetune()
+    LOGGER.info(f"模型微调结果: {result}")
+    if result.get("status") != "promoted":
+        return
+    if Config.PREDICT_BACKEND == "onnx":
+        LOGGER.error("模型已更新, onnx 后端需要重新执行 main.py --mode export")
+    # 模型注册表在下一次取模型时按文件变化热加载新模型
+    if model_registry is not None and forecast_store is not None:
+        await precompute(model_registry, forecast_store, inference_executor)
+
+
+async def collect_and_precompute(
+    model_registry=None, forecast_store=None, inference_executor=None
+):
+    """采集成功后预计算最新一期预测; 开启 FINETUNE_AFTER_COLLECT 时随后微调模型"""
+    if not await collect_air_quality_data():
+        return
+    if model_registry is not None and forecast_store is not None:
+        await precompute(model_registry, forecast_store, inference_executor)
+    if Config.FINETUNE_AFTER_COLLECT:
+        await finetune_and_precompute(
+            model_registry, forecast_store, inference_executor
+        )
 
 
-async def run_scheduler():
-    """运行异步定时任务调度器"""
+async def run_scheduler(
+    model_registry=None, forecast_store=None, inference_executor=None
+):
+    """
+    运行异步定时任务调度器
+    :param model_registry: 常驻模型注册表, 传入时采集后预计算预测
+    :param forecast_store: 预测存储
+    :param inference_executor: 推理线程池, 传入时预计算在推理线程中执行
+    """
     try:
         scheduler = AsyncIOScheduler()
 
         # 添加定时任务 - 每天 0:00 和 12:00 执行
         scheduler.add_job(
-            collect_air_quality_data,
+            collect_and_precompute,
+            kwargs={
+                "model_registry": model_registry,
+                "forecast_store": forecast_store,
+                "inference_executor": inference_executor,
+            },
             trigger=CronTrigger(hour="0,12", minute=0),  # 设置为每天 0:00 和 12:00
             id="air_quality_task",
             name="惠州空气质量数据采集",
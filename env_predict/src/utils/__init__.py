@@ -4,6 +4,6 @@ Description:
 Changelog: all notable changes to this file will be documented
 """
 
-from .data_export import data2json
+from .data_export import data2columns, data2json
 from .singleton import singleton
 from .tools import md5_encryption
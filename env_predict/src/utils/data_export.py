@@ -1,16 +1,32 @@
 """
 Created by a-b-ab at 2025-05-14.
 Description: 数据导出脚本
+    - data2json: 按批读取游标逐条写出JSON数组或JSON Lines(.jsonl), 内存占用与数据量无关
+    - data2columns: 导出为列式存储(每列一个float32文件, 训练时按 mmap 读取)
+      默认只追加 time_point 大于已导出最大值的新数据, full=True 时全量重建
+    - 全量重建: python -m src.utils.data_export --full
 Changelog: all notable changes to this file will be documented
 """
 
+import argparse
 import json
+import os
 
 from src.databases import MongodbBase, MongodbManager
 
+# 游标每批从数据库读取的文档数
+EXPORT_BATCH_SIZE = 1000
 
-def data2json():
-    """将数据库所有数据导出为json"""
+
+def data2json(output_file: str = None, batch_size: int = EXPORT_BATCH_SIZE) -> int:
+    """
+    将数据库所有数据导出为json, 逐条写出, 不在内存中保存全部文档
+    Args:
+        output_file(str,optional):输出文件, 以 .jsonl 结尾时每行一条文档, 否则为缩进的JSON数组
+        batch_size(int,optional):游标每批读取的文档数
+    Returns:
+        int:导出的文档数
+    """
     from src.config import Config
 
     mongodb_base: MongodbBase = MongodbManager.get_mongodb_base(
@@ -18,26 +34,95 @@ def data2json():
     )
     collection = mongodb_base.get_collection(collection="d_aqi_huizhou")
 
-    documents = collection.find({})
+    documents = collection.find({}).batch_size(batch_size)
+
+    output_file = output_file or os.path.join(Config.AQI_DIR, "d_aqi_huizhou.json")
+    json_lines = output_file.endswith(".jsonl")
+
+    # 先写临时文件再替换, 导出中断时不留下不完整的文件
+    count = 0
+    tmp_file = output_file + ".tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        for doc in documents:
+            # 将 ObjectId 转换为字符串（如果存在）
+            if "_id" in doc:
+                doc["_id"] = str(doc["_id"])
+            if json_lines:
+                f.write(json.dumps(doc, ensure_ascii=False) + "\n")
+            else:
+                # 与 json.dump(data_list, indent=4) 的输出一致
+                f.write("[\n" if count == 0 else ",\n")
+                text = json.dumps(doc, ensure_ascii=False, indent=4)
+                f.write("    " + text.replace("\n", "\n    "))
+            count += 1
+        if not json_lines:
+            f.write("\n]" if count else "[]")
+    os.replace(tmp_file, output_file)
+
+    print(f"{count} 条数据已导出到 {output_file}")
+    return count
+
+
+def data2columns(output_dir: str = None, full: bool = False) -> int:
+    """
+    将数据库数据导出为列式存储, 只读取训练用到的字段
+    增量导出只查询 time_point 大于已导出最大值(高水位)的文档, 耗时与新增数据量成正比;
+    早于高水位的迟到数据只有全量重建时才会导出
+    Args:
+        output_dir(str,optional):列式存储目录, 默认 Config.COLUMN_STORE_PATH
+        full(bool,optional):是否全量重建
+    Returns:
+        int:导出的行数
+    """
+    from src.AQI_display.utils.column_store import (
+        FLOAT_COLUMNS,
+        TIME_COLUMN,
+        ColumnStore,
+        append_column_store,
+        is_column_store,
+        write_column_store,
+    )
+    from src.config import Config
 
-    # 将文档转换为列表
-    data_list = list(documents)
+    mongodb_base: MongodbBase = MongodbManager.get_mongodb_base(
+        mongodb_config=Config.MONGODB_CONFIG
+    )
+    collection = mongodb_base.get_collection(collection="d_aqi_huizhou")
 
-    # 将 ObjectId 转换为字符串（如果存在）
-    for doc in data_list:
-        if "_id" in doc:
-            doc["_id"] = str(doc["_id"])
+    projection = {"_id": 0, TIME_COLUMN: 1, **{k: 1 for k in FLOAT_COLUMNS}}
+    output_dir = output_dir or Config.COLUMN_STORE_PATH
 
-    # 获取当前目录并设置输出文件路径
-    current_dir = Config.ROOT_DIR
-    output_file = f"{current_dir}/src/AQI_display/d_aqi_huizhou.json"
+    # 与 MongoSequenceSource 相同的索引, 高水位查询和全量导出的排序都不扫描全部历史
+    collection.create_index([(TIME_COLUMN, -1)])
 
-    # 将数据写入 JSON 文件
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(data_list, f, ensure_ascii=False, indent=4)
+    watermark = None
+    if not full and is_column_store(output_dir):
+        watermark = ColumnStore(output_dir).watermark()
+    if watermark is None:
+        # 按时间升序分批读取, 写入时不需要再重排
+        cursor = (
+            collection.find({}, projection)
+            .sort(TIME_COLUMN, 1)
+            .batch_size(EXPORT_BATCH_SIZE)
+        )
+        rows = write_column_store(output_dir, cursor)
+        print(f"{rows} 条数据已全量导出到 {output_dir}")
+        return rows
 
-    print(f"数据已导出到 {output_file}")
+    cursor = collection.find({TIME_COLUMN: {"$gt": watermark}}, projection)
+    rows = append_column_store(output_dir, cursor)
+    print(f"{rows} 条新数据已追加到 {output_dir}")
+    return rows
 
 
 if __name__ == "__main__":
-    data2json()
+    parser = argparse.ArgumentParser(description="导出数据库数据")
+    parser.add_argument("--full", action="store_true", help="全量重建列式存储")
+    parser.add_argument(
+        "--json", nargs="?", const="", default=None, help="同时导出为JSON(.jsonl)文件"
+    )
+    args = parser.parse_args()
+
+    if args.json is not None:
+        data2json(args.json or None)
+    data2columns(full=args.full)
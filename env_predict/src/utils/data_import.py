@@ -1,33 +1,121 @@
 """
 Created by a-b-ab at 2025-05-14.
 Description: 数据导入脚本
+    - 增量解析JSON数组或JSON Lines(.jsonl), 按块写入数据库, 内存占用与文件大小无关
+    - 无序批量插入, 重复文档(E11000)跳过并计数, 不影响同一批中的其他文档
+    - 运行: python -m src.utils.data_import --input d_aqi_huizhou.jsonl
 Changelog: all notable changes to this file will be documented
 """
 
+import argparse
 import json
 import os
 
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo.errors import BulkWriteError
+
 from src.config import Config
 from src.databases import MongodbBase, MongodbManager
 
+# 每次 insert_many 写入的文档数
+IMPORT_CHUNK_SIZE = 1000
+# 解析JSON数组时每次读取的字符数
+READ_SIZE = 1 << 20
+# MongoDB 重复键错误码
+DUPLICATE_KEY_ERROR = 11000
+
+
+def iter_json_records(input_file: str, read_size: int = READ_SIZE):
+    """
+    逐条读取文件中的文档, 不把整个文件读入内存
+    Args:
+        input_file(str):JSON数组文件, 或每行一个文档的 .jsonl 文件
+        read_size(int,optional):解析JSON数组时每次读取的字符数
+    Yields:
+        dict:文档
+    """
+    with open(input_file, "r", encoding="utf-8") as f:
+        if input_file.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+
+        decoder = json.JSONDecoder()
+        buffer, pos, eof = "", 0, False
+        started = False
+        while True:
+            # 跳过空白以及数组的 [ , ] 分隔符
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,[]":
+                if buffer[pos] == "[":
+                    started = True
+                pos += 1
+            if pos == len(buffer):
+                if eof:
+                    return
+                buffer, pos = f.read(read_size), 0
+                eof = not buffer
+                continue
+            if not started:
+                raise ValueError(f"{input_file} is not a JSON array")
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # 文档跨越了读取边界, 读入更多内容后重试
+                chunk = f.read(read_size)
+                if not chunk:
+                    raise
+                buffer, pos = buffer[pos:] + chunk, 0
+                continue
+            yield record
+            pos = end
 
-def json2data():
-    """将 JSON 文件中的数据导入到数据库"""
 
-    # 获取当前目录并设置输入文件路径
-    current_dir = Config.ROOT_DIR
-    input_file = os.path.join(current_dir, "src\AQI_display\d_aqi_huizhou.json")
+def restore_object_id(record: dict) -> dict:
+    """导出时 _id 转为字符串(或扩展JSON的 {"$oid": ...}), 导入时还原为 ObjectId 以便识别重复文档"""
+    object_id = record.get("_id")
+    if isinstance(object_id, dict) and "$oid" in object_id:
+        object_id = object_id["$oid"]
+    if isinstance(object_id, str):
+        try:
+            record["_id"] = ObjectId(object_id)
+        except InvalidId:
+            pass
+    return record
 
-    # 读取 JSON 文件
+
+def insert_chunk(collection, chunk: list) -> tuple:
+    """
+    无序批量插入, 重复文档跳过
+    Returns:
+        tuple:(插入数, 重复数)
+    Raises:
+        BulkWriteError:除重复键以外的写入错误
+    """
     try:
-        with open(input_file, "r", encoding="utf-8") as f:
-            data_list = json.load(f)
-    except FileNotFoundError:
+        result = collection.insert_many(chunk, ordered=False)
+        return len(result.inserted_ids), 0
+    except BulkWriteError as e:
+        write_errors = e.details.get("writeErrors", [])
+        if any(error.get("code") != DUPLICATE_KEY_ERROR for error in write_errors):
+            raise
+        return e.details.get("nInserted", 0), len(write_errors)
+
+
+def json2data(input_file: str = None, chunk_size: int = IMPORT_CHUNK_SIZE) -> dict:
+    """
+    将 JSON 文件中的数据导入到数据库
+    Args:
+        input_file(str,optional):JSON数组或 .jsonl 文件, 默认为 data2json 的导出文件
+        chunk_size(int,optional):每次写入的文档数
+    Returns:
+        dict:插入数和跳过的重复文档数
+    """
+    input_file = input_file or os.path.join(Config.AQI_DIR, "d_aqi_huizhou.json")
+    if not os.path.exists(input_file):
         print(f"未找到文件: {input_file}")
-        return
-    except json.JSONDecodeError as e:
-        print(f"JSON 文件解析错误: {e}")
-        return
+        return {"inserted": 0, "duplicates": 0}
 
     # 获取 MongoDB 集合
     mongodb_base: MongodbBase = MongodbManager.get_mongodb_base(
@@ -35,16 +123,36 @@ def json2data():
     )
     collection = mongodb_base.get_collection(collection="d_aqi_huizhou")
 
-    # 插入数据到集合
+    # 按块插入数据到集合
+    inserted, duplicates = 0, 0
+    chunk = []
     try:
-        if data_list:
-            collection.insert_many(data_list)
-            print(f"成功导入 {len(data_list)} 条数据到集合 'd_aqi_huizhou'")
-        else:
-            print("JSON 文件中没有数据可导入")
+        for record in iter_json_records(input_file):
+            chunk.append(restore_object_id(record))
+            if len(chunk) >= chunk_size:
+                chunk_inserted, chunk_duplicates = insert_chunk(collection, chunk)
+                inserted += chunk_inserted
+                duplicates += chunk_duplicates
+                chunk = []
+        if chunk:
+            chunk_inserted, chunk_duplicates = insert_chunk(collection, chunk)
+            inserted += chunk_inserted
+            duplicates += chunk_duplicates
+    except json.JSONDecodeError as e:
+        print(f"JSON 文件解析错误: {e}")
     except Exception as e:
         print(f"数据导入失败: {e}")
 
+    print(
+        f"成功导入 {inserted} 条数据到集合 'd_aqi_huizhou', 跳过 {duplicates} 条重复数据"
+    )
+    return {"inserted": inserted, "duplicates": duplicates}
+
 
 if __name__ == "__main__":
-    json2data()
+    parser = argparse.ArgumentParser(description="导入JSON数据到数据库")
+    parser.add_argument("--input", default=None, help="JSON数组或 .jsonl 文件")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    json2data(args.input, args.chunk_size)
@@ -0,0 +1,82 @@
+"""
+Created by lrh at 2026-10-18.
+Description: 预测结果进程内缓存
+    - 以 (模型版本, 数据最新 time_point, ...) 为键, 新数据入库前预测结果不变
+    - 同一个键并发未命中时只有一个请求计算, 其余请求等待该结果
+Changelog: all notable changes to this file will be documented
+"""
+
+import threading
+
+
+class _InflightCall:
+    """正在计算中的一次调用"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ForecastCache:
+    """单值预测缓存, 带 single-flight 计算"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key = None
+        self._value = None
+        self._generation = 0
+        self._inflight = {}
+
+    def get_or_compute(self, key, compute_fn):
+        """
+        命中直接返回, 未命中时由第一个请求计算, 其他请求等待
+        Args:
+            key(tuple):缓存键
+            compute_fn(callable):无参计算函数
+        Returns:
+            计算结果
+        """
+        with self._lock:
+            if self._value is not None and self._key == key:
+                return self._value
+            call = self._inflight.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _InflightCall()
+                self._inflight[key] = call
+            generation = self._generation
+
+        if not is_leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = compute_fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                # 计算期间发生过失效则不写入缓存, 只返回给本轮等待者
+                if call.error is None and generation == self._generation:
+                    self._key, self._value = key, call.value
+                if self._inflight.get(key) is call:
+                    del self._inflight[key]
+            call.event.set()
+        return call.value
+
+    def invalidate(self):
+        """清空缓存, 数据写入后调用"""
+        with self._lock:
+            self._key = None
+            self._value = None
+            self._generation += 1
+            # 之后的请求不再等待失效前发起的计算
+            self._inflight = {}
+
+
+# 进程级预测缓存
+FORECAST_CACHE = ForecastCache()
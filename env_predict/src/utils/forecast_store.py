@@ -0,0 +1,150 @@
+"""
+Created by lrh at 2026-10-18.
+Description: 预测结果预计算与存储
+    - 新数据入库后计算最新一期24小时预测, 写入 d_aqi_forecast
+    - 以 (model_version, issue_time) 唯一索引, 同一期同一模型只存一份
+    - /predict 只需一次索引查询, 历史预测同时作为评估存档
+Changelog: all notable changes to this file will be documented
+"""
+
+import time
+
+from datetime import datetime
+
+from src.collector.env_huizhou_bak import get_latest_time_point_from_db
+from src.config import LOGGER
+from src.databases import mongodb_find, mongodb_update_data
+
+FORECAST_COLLECTION = "d_aqi_forecast"
+
+
+def build_predictions_list(model_registry, current_time: datetime) -> list:
+    """生成预测并转换为接口返回的记录列表"""
+    prediction_results = model_registry.forecast(current_time=current_time)
+    return predictions_to_records(prediction_results)
+
+
+def predictions_to_records(prediction_results) -> list:
+    """以预测时间为索引的预测结果转换为记录列表, 时间格式化为字符串"""
+    predictions_list = prediction_results.reset_index().to_dict(orient="records")
+
+    for record in predictions_list:
+        record["time"] = record["index"].strftime("%Y-%m-%d %H:%M:%S")
+        del record["index"]
+    return predictions_list
+
+
+class ForecastStore:
+    """d_aqi_forecast 集合的读写"""
+
+    def __init__(self, coll_conn):
+        self.coll_conn = coll_conn
+        self._index_ready = False
+
+    def _ensure_index(self):
+        """(model_version, issue_time) 唯一索引, 同时用于按模型取最新一期"""
+        if self._index_ready:
+            return
+        try:
+            self.coll_conn.create_index(
+                [("model_version", 1), ("issue_time", -1)], unique=True
+            )
+            self._index_ready = True
+        except Exception as e:
+            LOGGER.error(f"创建预测索引失败: {e}")
+
+    def get_latest(self, model_version: str, min_issue_time: int = None) -> dict:
+        """
+        获取指定模型最新一期预测
+        Args:
+            model_version(str):模型版本
+            min_issue_time(int,optional):起报时间下限, 通常为数据最新 time_point,
+                最新一期早于该值(有新数据但尚未预计算)时视为不存在
+        Returns:
+            dict:预测文档, 不存在或查询失败时返回None
+        """
+        self._ensure_index()
+        filter_dict = {"model_version": model_version}
+        if min_issue_time is not None:
+            filter_dict["issue_time"] = {"$gte": min_issue_time}
+        find_res = mongodb_find(
+            coll_conn=self.coll_conn,
+            filter_dict=filter_dict,
+            return_dict={"_id": 0},
+            sorted_list=[("issue_time", -1)],
+            limit=1,
+        )
+        if not find_res["status"]:
+            LOGGER.error(f"读取预测失败: {find_res['info']}")
+            return None
+        return find_res["info"][0] if find_res["info"] else None
+
+    def get(self, issue_time: int, model_version: str) -> dict:
+        """获取指定起报时间和模型的预测, 不存在或查询失败时返回None"""
+        self._ensure_index()
+        find_res = mongodb_find(
+            coll_conn=self.coll_conn,
+            filter_dict={"model_version": model_version, "issue_time": issue_time},
+            return_dict={"_id": 0},
+            limit=1,
+        )
+        if not find_res["status"]:
+            LOGGER.error(f"读取预测失败: {find_res['info']}")
+            return None
+        return find_res["info"][0] if find_res["info"] else None
+
+    def save(self, forecast: dict) -> dict:
+        """写入预测, 同一 (model_version, issue_time) 已存在时不覆盖"""
+        self._ensure_index()
+        return mongodb_update_data(
+            coll_conn=self.coll_conn,
+            filter_dict={
+                "model_version": forecast["model_version"],
+                "issue_time": forecast["issue_time"],
+            },
+            update_data={"$setOnInsert": forecast},
+        )
+
+
+def precompute_forecast(
+    model_registry, forecast_store: ForecastStore, issue_time: int = None
+) -> dict:
+    """
+    计算并存储最新一期预测, 已存在时直接返回
+    Args:
+        model_registry(ModelRegistry):常驻模型注册表
+        forecast_store(ForecastStore):预测存储
+        issue_time(int,optional):起报时间戳, 默认取数据最新 time_point
+    Returns:
+        dict:预测文档
+    """
+    if issue_time is None:
+        issue_time = get_latest_time_point_from_db()
+    if issue_time is None:
+        # 数据库不可用时以当前整点起报, 与离线预测一致
+        issue_time = int(
+            datetime.now().replace(minute=0, second=0, microsecond=0).timestamp()
+        )
+    model_version = model_registry.get_model().version
+
+    forecast = forecast_store.get(issue_time, model_version)
+    if forecast is not None:
+        return forecast
+
+    forecast = {
+        "issue_time": issue_time,
+        "issue_time_str": datetime.fromtimestamp(issue_time).strftime(
+            "%Y-%m-%d %H:%M:%S"
+        ),
+        "model_version": model_version,
+        "created_at": int(time.time()),
+        "predictions": build_predictions_list(
+            model_registry, datetime.fromtimestamp(issue_time)
+        ),
+    }
+    save_res = forecast_store.save(forecast)
+    if save_res["status"]:
+        LOGGER.info(f"预测已预计算: {forecast['issue_time_str']} {model_version}")
+    else:
+        LOGGER.error(f"预测存储失败: {save_res['info']}")
+    return forecast
@@ -0,0 +1,158 @@
+"""
+Created by lrh at 2026-10-18.
+Description: 有界推理线程池
+    - 前向传播统一在固定数量的推理线程中执行, 不占用请求线程
+    - 推理线程启动时显式设置 torch intra-op / inter-op 线程数, 避免并发请求和定时任务超额占用CPU
+    - 本模块不在导入时加载 torch/numpy, Web 进程启动时不需要推理依赖
+    - 排队数超过上限时直接拒绝, 由接口返回 ResponseCode.LIMITED_FLOW
+    - 记录排队/执行耗时和计数, 由 /metrics 接口输出
+Changelog: all notable changes to this file will be documented
+"""
+
+import threading
+import time
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from src.config import LOGGER
+
+# torch 线程数是进程级设置, 只在第一个推理线程启动时设置一次
+_TORCH_THREADS_LOCK = threading.Lock()
+_torch_threads_configured = False
+
+
+class InferenceRejected(Exception):
+    """推理队列已满"""
+
+
+def configure_torch_threads(intra_op_threads: int = None, inter_op_threads: int = None):
+    """
+    设置进程级 torch 线程数, 需要在第一次前向传播之前调用, 重复调用只生效一次
+    可作为 InferenceExecutor 的 initializer, 在推理线程启动时才导入 torch
+    Args:
+        intra_op_threads(int,optional):单个算子内的并行线程数
+        inter_op_threads(int,optional):算子间的并行线程数
+    """
+    global _torch_threads_configured
+
+    with _TORCH_THREADS_LOCK:
+        if _torch_threads_configured:
+            return
+        import torch
+
+        if intra_op_threads:
+            torch.set_num_threads(intra_op_threads)
+        if inter_op_threads:
+            try:
+                torch.set_num_interop_threads(inter_op_threads)
+            except RuntimeError as e:
+                # inter-op 线程池已启动后不能再修改
+                LOGGER.error(f"设置 torch inter-op 线程数失败: {e}")
+        _torch_threads_configured = True
+        LOGGER.info(
+            f"torch 线程数: intra-op={torch.get_num_threads()}, "
+            f"inter-op={torch.get_num_interop_threads()}"
+        )
+
+
+class InferenceExecutor:
+    """固定线程数的推理执行器, 排队数有上限"""
+
+    def __init__(
+        self,
+        max_workers: int = 1,
+        max_queue: int = 8,
+        window: int = 1024,
+        initializer=None,
+        initargs: tuple = (),
+    ):
+        # max_queue: 除正在执行的任务外最多排队的任务数
+        # window: 统计耗时分位数的最近任务数
+        # initializer: 每个推理线程启动时执行一次, 如 configure_torch_threads
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="inference",
+            initializer=initializer,
+            initargs=initargs,
+        )
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._counts = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0}
+        self._queue_wait_ms = deque(maxlen=window)
+        self._run_ms = deque(maxlen=window)
+
+    def submit(self, fn, *args, enforce_limit: bool = True, **kwargs):
+        """
+        提交推理任务
+        Args:
+            fn(callable):推理函数
+            enforce_limit(bool,optional):是否受排队上限限制, 定时预计算等内部任务不限制
+        Returns:
+            Future:任务结果
+        Raises:
+            InferenceRejected:排队数已达上限
+        """
+        with self._lock:
+            if enforce_limit and self._pending >= self.max_workers + self.max_queue:
+                self._counts["rejected"] += 1
+                raise InferenceRejected(
+                    f"inference queue is full ({self.max_queue} waiting)"
+                )
+            self._pending += 1
+            self._counts["submitted"] += 1
+        return self._pool.submit(self._run, time.perf_counter(), fn, args, kwargs)
+
+    def run(self, fn, *args, timeout: float = None, **kwargs):
+        """提交推理任务并等待结果, 参数同 submit"""
+        return self.submit(fn, *args, **kwargs).result(timeout=timeout)
+
+    def _run(self, enqueued_at, fn, args, kwargs):
+        started_at = time.perf_counter()
+        with self._lock:
+            self._running += 1
+            self._queue_wait_ms.append((started_at - enqueued_at) * 1000)
+        failed = True
+        try:
+            result = fn(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._pending -= 1
+                self._run_ms.append((time.perf_counter() - started_at) * 1000)
+                self._counts["failed" if failed else "completed"] += 1
+
+    def metrics(self) -> dict:
+        """当前排队情况, 累计计数以及最近任务的耗时分位数(毫秒)"""
+        import numpy as np
+
+        with self._lock:
+            queue_wait_ms = list(self._queue_wait_ms)
+            run_ms = list(self._run_ms)
+            metrics = {
+                "workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queued": self._pending - self._running,
+                **self._counts,
+            }
+        for name, values in (("queue_wait_ms", queue_wait_ms), ("run_ms", run_ms)):
+            if values:
+                p50, p95, p99 = np.percentile(values, [50, 95, 99])
+                metrics[name] = {
+                    "p50": round(float(p50), 3),
+                    "p95": round(float(p95), 3),
+                    "p99": round(float(p99), 3),
+                    "max": round(float(max(values)), 3),
+                }
+            else:
+                metrics[name] = {}
+        return metrics
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait)
@@ -8,8 +8,11 @@ from flask import Blueprint
 
 from src.views.aqi_trend import aqi_trend
 from src.views.get import get
+from src.views.hindcast import hindcast
+from src.views.metrics import metrics
 from views.ping import ping
 from views.predict import predict
+from views.predict_cities import predict_cities
 from views.spider import spider
 
 bp_api = Blueprint("bp_api", __name__)
@@ -19,3 +22,6 @@ bp_api.add_url_rule("/get", view_func=get, methods=["POST"])
 bp_api.add_url_rule("/aqi_trend", view_func=aqi_trend, methods=["POST"])
 bp_api.add_url_rule("/spider", view_func=spider, methods=["POST"])
 bp_api.add_url_rule("/predict", view_func=predict, methods=["POST"])
+bp_api.add_url_rule("/predict/cities", view_func=predict_cities, methods=["POST"])
+bp_api.add_url_rule("/hindcast", view_func=hindcast, methods=["POST"])
+bp_api.add_url_rule("/metrics", view_func=metrics, methods=["GET"])
@@ -0,0 +1,95 @@
+"""
+Created by lrh at 2026-10-18.
+Description: 多起报时间批量回算接口, 用于评估模型效果
+Changelog: all notable changes to this file will be documented
+"""
+
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from flask import current_app, request
+from flask_cors import cross_origin
+
+from src.AQI_display.model_registry import ModelRegistry
+from src.AQI_display.utils.hindcast import origin_count, origin_range
+from src.common import (
+    ResponseCode,
+    ResponseField,
+    ResponseReply,
+    UniResponse,
+    response_handle,
+)
+from src.config import Config
+from src.utils.inference_executor import InferenceExecutor, InferenceRejected
+
+
+@cross_origin()
+def hindcast():
+    """批量回算接口
+    {
+        "origins": [1744804800, 1744808400],
+        或
+        "time_list": [1744804800, 1747393200],
+        "step": 1
+    }
+    """
+
+    # 获取基本配置
+    app_logger = current_app.config["app_logger"]
+    model_registry: ModelRegistry = current_app.config["model_registry"]
+    executor: InferenceExecutor = current_app.config["inference_executor"]
+
+    # 获取基础数据
+    post_data = request.json or {}
+    try:
+        if post_data.get("origins"):
+            origins = [int(origin) for origin in post_data["origins"]]
+            num_origins = len(origins)
+        else:
+            start_time, end_time = post_data["time_list"]
+            step = post_data.get("step", 1)
+            # 先按区间和步长计算数量, 超出上限时不生成起报时间列表
+            num_origins = origin_count(start_time, end_time, step)
+            origins = None
+    except Exception:
+        app_logger.error(f"API {request.path} 参数错误")
+        return response_handle(request=request, dict_value=UniResponse.PARAM_ERR)
+
+    if not 1 <= num_origins <= Config.HINDCAST_MAX_ORIGINS:
+        result = {
+            ResponseField.DATA: {},
+            ResponseField.INFO: f"起报时间数量需在 1-{Config.HINDCAST_MAX_ORIGINS} 之间",
+            ResponseField.STATUS: ResponseCode.PARAM_ERR,
+        }
+        return response_handle(request=request, dict_value=result)
+
+    if origins is None:
+        origins = origin_range(start_time, end_time, step).tolist()
+
+    try:
+        df_hindcast = executor.run(
+            model_registry.hindcast, origins, timeout=Config.INFERENCE_TIMEOUT
+        )
+        result = {
+            ResponseField.DATA: {
+                "total": len(df_hindcast),
+                "rows": df_hindcast.to_dict(orient="records"),
+            },
+            ResponseField.INFO: ResponseReply.SUCCESS,
+            ResponseField.STATUS: ResponseCode.SUCCESS,
+        }
+        app_logger.info(f"API {request.path} 回算成功")
+    except InferenceRejected:
+        app_logger.error(f"API {request.path} 推理队列已满")
+        result = UniResponse.LIMITED_FLOW
+    except FutureTimeoutError:
+        app_logger.error(f"API {request.path} 推理超时")
+        result = UniResponse.OVERTIME
+    except Exception as e:
+        app_logger.error(f"API {request.path} 回算失败: {e}")
+        result = {
+            ResponseField.DATA: {},
+            ResponseField.INFO: str(e),
+            ResponseField.STATUS: ResponseCode.UNKNOWN_ERR,
+        }
+
+    return response_handle(request=request, dict_value=result)
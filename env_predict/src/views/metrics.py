@@ -0,0 +1,24 @@
+"""
+Created by lrh at 2026-10-18.
+Description: 运行指标接口
+    - 推理线程池的排队数, 累计提交/完成/失败/拒绝次数, 以及排队和执行耗时分位数
+Changelog: all notable changes to this file will be documented
+"""
+
+from flask import current_app, request
+from flask_cors import cross_origin
+
+from src.common import ResponseCode, ResponseField, ResponseReply, response_handle
+from src.utils.inference_executor import InferenceExecutor
+
+
+@cross_origin()
+def metrics():
+    """运行指标接口"""
+    executor: InferenceExecutor = current_app.config["inference_executor"]
+    result = {
+        ResponseField.DATA: {"inference": executor.metrics()},
+        ResponseField.INFO: ResponseReply.SUCCESS,
+        ResponseField.STATUS: ResponseCode.SUCCESS,
+    }
+    return response_handle(request=request, dict_value=result)
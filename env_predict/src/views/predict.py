@@ -4,27 +4,108 @@ Description: 预测接口
 Changelog: all notable changes to this file will be documented
 """
 
-from flask import current_app
+import time
+
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime
+
+from flask import current_app, request
 from flask_cors import cross_origin
 
-from src.AQI_display.predict import main as aqi_predict  # 导入AQI_display的predict函数
-from src.common import ResponseCode, ResponseField, ResponseReply, response_handle
+from src.AQI_display.model_registry import ModelRegistry
+from src.collector.env_huizhou_bak import get_latest_time_point_from_db
+from src.common import (
+    ResponseCode,
+    ResponseField,
+    ResponseReply,
+    UniResponse,
+    response_handle,
+)
+from src.config import Config
+from src.utils.forecast_cache import FORECAST_CACHE
+from src.utils.forecast_store import (
+    ForecastStore,
+    precompute_forecast,
+    predictions_to_records,
+)
+from src.utils.inference_executor import InferenceExecutor, InferenceRejected
+
+
+def add_uncertainty(model_registry: ModelRegistry, forecast: dict, num_samples: int):
+    """为预计算的预测追加 MC dropout 分位数, 返回新的记录列表(不修改缓存的预测)"""
+    df_quantiles = model_registry.forecast_quantiles(
+        current_time=datetime.fromtimestamp(forecast["issue_time"]),
+        num_samples=num_samples,
+    )
+    quantile_records = {
+        record["time"]: record for record in predictions_to_records(df_quantiles)
+    }
+    return [
+        {**record, **quantile_records.get(record["time"], {})}
+        for record in forecast["predictions"]
+    ]
 
 
 @cross_origin()
 def predict():
-    """预测接口"""
+    """预测接口
+    {
+        "uncertainty": true,  # 可选, 追加 AQI 及各污染物的 p10/p50/p90
+        "samples": 50  # 可选, MC dropout 随机样本数
+    }
+    """
+    post_data = request.get_json(silent=True) or {}
     try:
-        prediction_results = aqi_predict()
+        num_samples = int(post_data.get("samples", 50))
+    except (TypeError, ValueError):
+        num_samples = 0
+    if post_data.get("uncertainty") and not (
+        1 <= num_samples <= Config.UNCERTAINTY_MAX_SAMPLES
+    ):
+        return response_handle(request=current_app, dict_value=UniResponse.PARAM_ERR)
+
+    try:
+        model_registry: ModelRegistry = current_app.config["model_registry"]
+        forecast_store: ForecastStore = current_app.config["forecast_store"]
+        executor: InferenceExecutor = current_app.config["inference_executor"]
+
+        # 预测在新数据入库时已预计算, 这里只读取当前模型不早于数据最新 time_point 的一期
+        # 请求线程只计算版本号, 模型的加载和预热在推理线程中完成, 受并发上限约束
+        model_version = model_registry.current_version()
+        watermark = get_latest_time_point_from_db()
+        forecast = forecast_store.get_latest(model_version, min_issue_time=watermark)
+        if forecast is None:
+            # 模型刚切换、尚未预计算或预计算落后于新数据, 由一个请求计算并存储, 其余请求等待
+            forecast = FORECAST_CACHE.get_or_compute(
+                (model_version, watermark),
+                lambda: executor.run(
+                    precompute_forecast,
+                    model_registry,
+                    forecast_store,
+                    watermark,
+                    timeout=Config.INFERENCE_TIMEOUT,
+                ),
+            )
 
-        predictions_list = prediction_results.reset_index().to_dict(orient="records")
+        age_hours = (time.time() - forecast["issue_time"]) / 3600
+        if age_hours > Config.FORECAST_MAX_AGE:
+            current_app.config["app_logger"].warning(
+                f"预测起报时间 {forecast['issue_time_str']} 已过去 {age_hours:.1f} 小时, "
+                "请检查数据采集"
+            )
 
-        for record in predictions_list:
-            record["time"] = record["index"].strftime("%Y-%m-%d %H:%M:%S")
-            del record["index"]
+        predictions = forecast["predictions"]
+        if post_data.get("uncertainty"):
+            predictions = executor.run(
+                add_uncertainty,
+                model_registry,
+                forecast,
+                num_samples,
+                timeout=Config.INFERENCE_TIMEOUT,
+            )
 
         result = {
-            ResponseField.DATA: predictions_list,
+            ResponseField.DATA: predictions,
             ResponseField.INFO: ResponseReply.SUCCESS,
             ResponseField.STATUS: ResponseCode.SUCCESS,
         }
@@ -32,6 +113,10 @@ def predict():
         # 返回格式化后的结果
         return response_handle(request=current_app, dict_value=result)
 
+    except InferenceRejected:
+        return response_handle(request=current_app, dict_value=UniResponse.LIMITED_FLOW)
+    except FutureTimeoutError:
+        return response_handle(request=current_app, dict_value=UniResponse.OVERTIME)
     except Exception as e:
         result = {
             ResponseField.DATA: {},
@@ -0,0 +1,81 @@
+"""
+Created by lrh at 2026-10-18.
+Description: 多城市预测接口, 各城市窗口合并为一个batch前向
+Changelog: all notable changes to this file will be documented
+"""
+
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from flask import current_app, request
+from flask_cors import cross_origin
+
+from src.AQI_display.multi_city import MultiCityPredictor
+from src.common import (
+    ResponseCode,
+    ResponseField,
+    ResponseReply,
+    UniResponse,
+    response_handle,
+)
+from src.config import Config
+from src.utils.forecast_store import predictions_to_records
+from src.utils.inference_executor import InferenceExecutor, InferenceRejected
+
+
+@cross_origin()
+def predict_cities():
+    """多城市预测接口
+    {
+        "citycodes": ["441300", "440100"]  # 可选, 默认全部已配置城市
+    }
+    """
+
+    # 获取基本配置
+    app_logger = current_app.config["app_logger"]
+    multi_city_predictor: MultiCityPredictor = current_app.config[
+        "multi_city_predictor"
+    ]
+    executor: InferenceExecutor = current_app.config["inference_executor"]
+
+    # 获取基础数据
+    post_data = request.get_json(silent=True) or {}
+    citycodes = post_data.get("citycodes") or None
+    if citycodes is not None and (
+        not isinstance(citycodes, list)
+        or any(
+            str(citycode) not in multi_city_predictor.city_sources
+            for citycode in citycodes
+        )
+    ):
+        app_logger.error(f"API {request.path} 参数错误")
+        return response_handle(request=request, dict_value=UniResponse.PARAM_ERR)
+
+    try:
+        city_predictions = executor.run(
+            multi_city_predictor.forecast,
+            [str(citycode) for citycode in citycodes] if citycodes else None,
+            timeout=Config.INFERENCE_TIMEOUT,
+        )
+        result = {
+            ResponseField.DATA: {
+                citycode: predictions_to_records(prediction_results)
+                for citycode, prediction_results in city_predictions.items()
+            },
+            ResponseField.INFO: ResponseReply.SUCCESS,
+            ResponseField.STATUS: ResponseCode.SUCCESS,
+        }
+    except InferenceRejected:
+        app_logger.error(f"API {request.path} 推理队列已满")
+        result = UniResponse.LIMITED_FLOW
+    except FutureTimeoutError:
+        app_logger.error(f"API {request.path} 推理超时")
+        result = UniResponse.OVERTIME
+    except Exception as e:
+        app_logger.error(f"API {request.path} 预测失败: {e}")
+        result = {
+            ResponseField.DATA: {},
+            ResponseField.INFO: str(e),
+            ResponseField.STATUS: ResponseCode.UNKNOWN_ERR,
+        }
+
+    return response_handle(request=request, dict_value=result)
@@ -15,7 +15,8 @@ from src.collector.env_huizhou_bak import (
     merge_data,
 )
 from src.common import ResponseCode, ResponseField, ResponseReply, response_handle
-from src.utils.data_export import data2json
+from src.utils.data_export import data2columns
+from src.utils.forecast_store import precompute_forecast
 
 
 @cross_origin()
@@ -61,9 +62,21 @@ def spider():
         app_logger.info("开始存储数据到 MongoDB...")
         env_data2mongodb(unique_data)
 
-        # 获取数据后同步到预测模型
-        data2json()
-        app_logger.info("数据已导出到 JSON 文件")
+        # 获取数据后把新数据增量追加到列式存储, 耗时与新增数据量成正比;
+        # 模型训练、测试和 PREDICT_SOURCE=file 的预测都优先读取列式存储
+        exported_rows = data2columns()
+        app_logger.info(f"{exported_rows} 条数据已导出到列式存储")
+
+        # 新数据入库后预计算最新一期预测, 失败不影响采集结果
+        try:
+            current_app.config["inference_executor"].run(
+                precompute_forecast,
+                current_app.config["model_registry"],
+                current_app.config["forecast_store"],
+                enforce_limit=False,
+            )
+        except Exception as e:
+            app_logger.error(f"预测预计算失败：{e}")
 
         # 返回成功结果
         app_logger.info("爬虫执行成功！")